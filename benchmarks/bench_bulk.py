@@ -0,0 +1,57 @@
+"""Benchmark: bulk report rendering vs. looping over the single-city report builder.
+
+Builds digests for many cities from WeatherAPI-shaped payloads (see
+`multi_tool_agent.testing.fake_current_weather`) in both unit systems, and
+checks that the vectorized reports are identical to `_build_report()`'s.
+"Load" is turning the payloads into columns, done once per digest run and
+shared by both unit systems.
+
+Usage:
+    python -m benchmarks.bench_bulk [cities ...]
+"""
+import sys
+import time
+
+from multi_tool_agent.bulk_reports import load_columns, render_reports
+from multi_tool_agent.testing import fake_current_weather
+from multi_tool_agent.tools import _build_report
+
+CITY_COUNTS = [100, 1000, 10000]
+UNITS = ["Celsius", "Fahrenheit"]
+
+
+def _best_of(repeats: int, func) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    counts = [int(arg) for arg in sys.argv[1:]] or CITY_COUNTS
+    print(f"{'cities':>7} | {'scalar ms':>10} | {'load ms':>8} | {'render ms':>10} | {'speedup':>8}")
+    for count in counts:
+        cities = [f"city {index}" for index in range(count)]
+        payloads = [fake_current_weather(city)["current"] for city in cities]
+        repeats = max(1, 20000 // count)
+
+        scalar = {unit: [_build_report(city, payload, unit) for city, payload in zip(cities, payloads)] for unit in UNITS}
+        columns = load_columns(payloads)
+        for unit in UNITS:
+            if render_reports(cities, columns, unit) != scalar[unit]:
+                sys.exit(f"Bulk {unit} reports differ from _build_report for {count} cities")
+
+        scalar_seconds = _best_of(repeats, lambda: [
+            [_build_report(city, payload, unit) for city, payload in zip(cities, payloads)] for unit in UNITS
+        ])
+        load_seconds = _best_of(repeats, lambda: load_columns(payloads))
+        render_seconds = _best_of(repeats, lambda: [render_reports(cities, columns, unit) for unit in UNITS])
+        speedup = scalar_seconds / (load_seconds + render_seconds)
+        print(f"{count:>7} | {scalar_seconds * 1000:>10.2f} | {load_seconds * 1000:>8.2f} | "
+              f"{render_seconds * 1000:>10.2f} | {speedup:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
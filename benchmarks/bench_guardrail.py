@@ -0,0 +1,78 @@
+"""Microbenchmark: guardrail matching cost as the rule set grows.
+
+Compares the compiled rule set (Aho-Corasick keywords + one combined regex)
+against a naive per-rule scan. The compiled per-call cost should stay roughly
+flat as the number of rules grows; the naive scan grows linearly.
+
+Usage:
+    python -m benchmarks.bench_guardrail
+"""
+import random
+import re
+import string
+import timeit
+
+from multi_tool_agent.guardrail_rules import GuardrailRule, GuardrailRuleSet
+
+MESSAGES = [
+    "What is the weather in London?",
+    "Could you tell me the humidity and wind speed in San Francisco right now please?",
+    "Hello again",
+    "Compare the temperature in Paris, Berlin, Madrid and Rome for my weekend trip planning.",
+]
+RULE_COUNTS = [1, 10, 100, 1000, 5000]
+CALLS = 2000
+
+
+def _random_word(rng: random.Random) -> str:
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(6, 12)))
+
+
+def _make_rules(count: int, rng: random.Random) -> list:
+    rules = [GuardrailRule("block-keyword", "keyword", "BLOCK")]
+    for index in range(count - 1):
+        if index % 10 == 0:
+            rules.append(GuardrailRule(f"regex-{index}", "regex", rf"\b{_random_word(rng)}\d+\b"))
+        else:
+            rules.append(GuardrailRule(f"keyword-{index}", "keyword", _random_word(rng)))
+    return rules
+
+
+def _naive_match(rules: list, text: str):
+    upper = text.upper()
+    for rule in rules:
+        if rule.kind == "keyword":
+            if rule.pattern.upper() in upper:
+                return rule
+        elif rule.compiled.search(text):
+            return rule
+    return None
+
+
+class _NaiveRule:
+    def __init__(self, rule: GuardrailRule):
+        self.kind = rule.kind
+        self.pattern = rule.pattern
+        self.compiled = re.compile(rule.pattern, re.IGNORECASE) if rule.kind == "regex" else None
+
+
+def main() -> None:
+    rng = random.Random(42)
+    print(f"{'rules':>6} | {'compiled us/call':>16} | {'naive us/call':>13}")
+    for count in RULE_COUNTS:
+        rules = _make_rules(count, rng)
+        rule_set = GuardrailRuleSet(rules)
+        naive_rules = [_NaiveRule(rule) for rule in rules]
+
+        compiled_seconds = timeit.timeit(
+            lambda: [rule_set.match(message) for message in MESSAGES], number=CALLS
+        )
+        naive_seconds = timeit.timeit(
+            lambda: [_naive_match(naive_rules, message) for message in MESSAGES], number=CALLS
+        )
+        calls = CALLS * len(MESSAGES)
+        print(f"{count:>6} | {compiled_seconds / calls * 1e6:>16.2f} | {naive_seconds / calls * 1e6:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Benchmark: cold-start cost of importing the package and building the Runner.
+
+Each measurement runs in a fresh interpreter so nothing is cached in
+`sys.modules`. Also checks that a plain package import pulls in no heavy
+dependencies (ADK, genai, HTTP clients) and makes no network calls.
+
+Usage:
+    python -m benchmarks.bench_import [repeats]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ["google.adk", "google.genai", "requests", "httpx"]
+
+_PROBE = """
+import json, socket, sys, time
+def _no_network(*args, **kwargs):
+    raise RuntimeError("network access during import")
+socket.socket.connect = _no_network
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+SCENARIOS = {
+    "import multi_tool_agent": "import multi_tool_agent",
+    "import multi_tool_agent.agent": "import multi_tool_agent.agent",
+    "get_runner()": "import multi_tool_agent\nmulti_tool_agent.get_runner()",
+}
+
+
+def _run(statement: str) -> dict:
+    env = dict(os.environ)
+    env.setdefault("GOOGLE_API_KEY", "benchmark-placeholder") # get_runner() needs a key to build agents
+    code = _PROBE.format(statement=statement, heavy=HEAVY_MODULES)
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True, env=env
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f"{'scenario':<32} | {'median ms':>9} | {'min ms':>7} | heavy modules loaded")
+    for name, statement in SCENARIOS.items():
+        results = [_run(statement) for _ in range(repeats)]
+        timings = [result["seconds"] * 1000 for result in results]
+        loaded = ", ".join(results[-1]["loaded"]) or "-"
+        print(f"{name:<32} | {statistics.median(timings):>9.1f} | {min(timings):>7.1f} | {loaded}")
+
+
+if __name__ == "__main__":
+    main()
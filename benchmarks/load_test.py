@@ -0,0 +1,240 @@
+"""Load test: many concurrent simulated users driving the Runner, fully offline.
+
+Gemini is replaced by `ScriptedLlm` and WeatherAPI by `StubWeatherServer`
+(both in `multi_tool_agent.testing`), so the numbers measure our own layers:
+guardrail, router, history, tools, cache, HTTP client and session store.
+
+Reports turns/sec and turn latency percentiles for the throughput run, then
+the memory retained per session (tracemalloc) in a separate, smaller run so
+allocation tracing doesn't skew the throughput numbers.
+
+Usage:
+    python -m benchmarks.load_test --users 200 --turns 8 --weather-latency-ms 50
+    python -m benchmarks.load_test --session-backend sqlite --no-cache --error-rate 0.05
+    python -m benchmarks.load_test --users 500 --dispatcher --max-concurrent-turns 64
+    python -m benchmarks.load_test --stream --chunk-delay-ms 30
+    python -m benchmarks.load_test --no-cache --api-keys 4 --key-rate 5
+"""
+import argparse
+import asyncio
+import contextlib
+import gc
+import io
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+CITIES = [
+    "London", "Paris", "Berlin", "Madrid", "Rome", "Tokyo", "New York", "Sydney", "Toronto", "Mumbai",
+    "Cairo", "Lagos", "Lima", "Seoul", "Oslo", "Dublin", "Vienna", "Prague", "Lisbon", "Athens",
+]
+# One simulated user's conversation, cycled: weather, fast-path greeting, batch, guardrail, farewell
+SCRIPT = [
+    "What is the weather in {0}?",
+    "Hello there",
+    "And how about in {1} and {2}?",
+    "Please BLOCK the forecast in {0}",
+    "Thanks, bye",
+]
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100, help="concurrent simulated users")
+    parser.add_argument("--turns", type=int, default=5, help="turns per user")
+    parser.add_argument("--weather-latency-ms", type=float, default=20.0, help="stub WeatherAPI latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of stub WeatherAPI 500s")
+    parser.add_argument("--model-latency-ms", type=float, default=0.0, help="fake model latency per call")
+    parser.add_argument("--session-backend", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument("--no-cache", action="store_true", help="disable the weather response cache")
+    parser.add_argument("--stream", action="store_true", help="stream turns and report time to first text")
+    parser.add_argument("--chunk-delay-ms", type=float, default=0.0, help="fake model delay per streamed chunk")
+    parser.add_argument("--dispatcher", action="store_true", help="submit turns through TurnDispatcher")
+    parser.add_argument("--max-concurrent-turns", type=int, default=None, help="dispatcher concurrency limit")
+    parser.add_argument("--api-keys", type=int, default=1, help="WeatherAPI keys in the key pool")
+    parser.add_argument("--key-rate", type=float, default=1000.0, help="requests/sec allowed per key")
+    parser.add_argument("--memory-sessions", type=int, default=100, help="sessions in the memory run (0 skips it)")
+    return parser.parse_args()
+
+
+def _api_keys(args: argparse.Namespace) -> list:
+    return [f"load-test-{index}" for index in range(1, args.api_keys + 1)]
+
+
+def _configure_environment(args: argparse.Namespace, base_url: str) -> None:
+    """Points the package at the stubs. Must run before multi_tool_agent.tools is imported."""
+    os.environ["WEATHER_API_BASE_URL"] = base_url
+    os.environ["WEATHER_API_KEYS"] = ",".join(_api_keys(args))
+    os.environ["WEATHER_KEY_RATE_PER_SECOND"] = str(args.key_rate)
+    os.environ["WEATHER_KEY_BURST"] = str(max(1.0, args.key_rate))
+    os.environ.setdefault("GOOGLE_API_KEY", "load-test") # never used: the model is local
+    os.environ["SESSION_BACKEND"] = args.session_backend
+    if args.session_backend == "sqlite":
+        os.environ["SESSION_DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="load_test_"), "sessions.db")
+    if args.no_cache:
+        os.environ["WEATHER_CACHE_TTL_SECONDS"] = "0"
+        os.environ["WEATHER_CACHE_STALE_SECONDS"] = "0"
+
+
+def _build_runner(llm):
+    from google.adk.runners import Runner
+    from multi_tool_agent.agents import create_root_agent
+    from multi_tool_agent.config import APP_NAME
+    from multi_tool_agent.session_service import create_session_service
+
+    return Runner(
+        agent=create_root_agent(model=llm),
+        app_name=APP_NAME,
+        session_service=create_session_service(),
+        auto_create_session=True,
+    )
+
+
+async def _run_one_turn(runner, dispatcher, stream: bool, query: str, user_id: str, session_id: str):
+    """Runs a turn the configured way; returns the time to first text when streaming."""
+    from multi_tool_agent.agent import call_agent_async, stream_turn
+
+    if not stream:
+        if dispatcher is None:
+            await call_agent_async(query, runner, user_id, session_id)
+        else:
+            await dispatcher.submit(query, user_id, session_id)
+        return None
+    updates = stream_turn(query, runner, user_id, session_id) if dispatcher is None else dispatcher.stream(query, user_id, session_id)
+    async for update in updates:
+        if update["type"] == "final":
+            return update["first_text_seconds"]
+    return None
+
+
+async def _simulate_user(runner, dispatcher, stream: bool, user_index: int, turns: int, results: dict) -> None:
+    from multi_tool_agent.dispatcher import DispatcherOverloaded
+
+    cities = [CITIES[(user_index + offset) % len(CITIES)] for offset in range(3)]
+    user_id, session_id = f"load_user_{user_index}", f"load_session_{user_index}"
+    for turn in range(turns):
+        query = SCRIPT[turn % len(SCRIPT)].format(*cities)
+        start = time.perf_counter()
+        try:
+            first_text_seconds = await _run_one_turn(runner, dispatcher, stream, query, user_id, session_id)
+        except DispatcherOverloaded:
+            continue # shed: not counted as a completed turn
+        results["latencies"].append(time.perf_counter() - start)
+        if first_text_seconds is not None:
+            results["first_text"].append(first_text_seconds)
+
+
+async def _run_users(runner, dispatcher, stream: bool, users: int, turns: int, first_user: int = 0) -> dict:
+    results = {"latencies": [], "first_text": []}
+    await asyncio.gather(
+        *(_simulate_user(runner, dispatcher, stream, first_user + index, turns, results) for index in range(users))
+    )
+    return results
+
+
+def _percentile(sorted_values: list, fraction: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def _main(args: argparse.Namespace, stub) -> None:
+    from multi_tool_agent.http_client import aclose_async_client
+    from multi_tool_agent.testing import ScriptedLlm
+
+    llm = ScriptedLlm(latency_seconds=args.model_latency_ms / 1000, chunk_delay_seconds=args.chunk_delay_ms / 1000)
+    runner = _build_runner(llm)
+    dispatcher = None
+    if args.dispatcher:
+        from multi_tool_agent.dispatcher import TurnDispatcher
+
+        limits = {"max_concurrent_turns": args.max_concurrent_turns} if args.max_concurrent_turns else {}
+        dispatcher = TurnDispatcher(runner, **limits)
+
+    # Every layer prints its progress, so stdout is swallowed outside the report.
+    # Warm-up: first-call imports, client pool and session store setup
+    with contextlib.redirect_stdout(io.StringIO()):
+        await _run_users(runner, dispatcher, args.stream, users=1, turns=len(SCRIPT), first_user=10**6)
+    stub_requests_before, stub_errors_before, llm_calls_before = stub.request_count, stub.error_count, llm.calls
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        results = await _run_users(runner, dispatcher, args.stream, args.users, args.turns)
+        elapsed = time.perf_counter() - start
+    latencies = sorted(results["latencies"])
+
+    print(f"backend={args.session_backend} cache={'off' if args.no_cache else 'on'} "
+          f"weather_latency={args.weather_latency_ms:g}ms error_rate={args.error_rate:g} "
+          f"model_latency={args.model_latency_ms:g}ms")
+    print(f"users={args.users} turns/user={args.turns} total turns={len(latencies)} wall={elapsed:.2f}s")
+    print(f"throughput:        {len(latencies) / elapsed:10.1f} turns/s")
+    print(f"turn latency (ms): p50={_percentile(latencies, 0.50) * 1000:.1f} "
+          f"p95={_percentile(latencies, 0.95) * 1000:.1f} p99={_percentile(latencies, 0.99) * 1000:.1f} "
+          f"max={latencies[-1] * 1000:.1f} mean={statistics.fmean(latencies) * 1000:.1f}")
+    if results["first_text"]:
+        first_text = sorted(results["first_text"])
+        print(f"first text (ms):   p50={_percentile(first_text, 0.50) * 1000:.1f} "
+              f"p95={_percentile(first_text, 0.95) * 1000:.1f} p99={_percentile(first_text, 0.99) * 1000:.1f}")
+    print(f"upstream calls:    {stub.request_count - stub_requests_before} WeatherAPI requests "
+          f"({stub.error_count - stub_errors_before} injected errors), {llm.calls - llm_calls_before} model calls")
+    from multi_tool_agent.response_cache import response_cache
+    from multi_tool_agent.tools import prefetcher, weather_key_pool, weather_upstream_async
+
+    upstream = weather_upstream_async.stats()
+    print(f"resilience:        retries={upstream['retries']} hedges={upstream['hedges']} "
+          f"(won {upstream['hedge_wins']}) circuit={upstream['circuit_state']} opened={upstream['circuit_opened']}")
+    answers = response_cache.stats()
+    print(f"response cache:    hit_rate={answers['hit_rate']:.2f} hits={answers['hits']} "
+          f"invalidations={answers['invalidations']}")
+    prefetch = prefetcher.stats()
+    print(f"prefetch:          refreshed={prefetch['refreshed']} deferred={prefetch['deferred']} "
+          f"hot={[key for key, _ in prefetch['hot'][:5]]}")
+    keys = weather_key_pool.stats()
+    print(f"key pool:          {keys['active']}/{keys['keys']} keys, waits={keys['waits']} timeouts={keys['timeouts']} "
+          f"per key={[usage['requests'] for usage in keys['per_key']]}")
+    if dispatcher is not None:
+        stats = dispatcher.stats()
+        print(f"dispatcher:        max_concurrent={stats['max_concurrent_turns']} "
+              f"completed={stats['completed']} rejected={stats['rejected']}")
+
+    if args.memory_sessions > 0:
+        gc.collect()
+        tracemalloc.start()
+        baseline, _ = tracemalloc.get_traced_memory()
+        with contextlib.redirect_stdout(io.StringIO()):
+            await _run_users(runner, dispatcher, args.stream, args.memory_sessions, args.turns, first_user=args.users)
+        if hasattr(runner.session_service, "flush"):
+            await runner.session_service.flush()
+        gc.collect()
+        retained, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        per_session = (retained - baseline) / args.memory_sessions
+        print(f"memory/session:    {per_session / 1024:10.1f} KiB retained "
+              f"(peak {(peak - baseline) / 1024 / 1024:.1f} MiB over {args.memory_sessions} sessions)")
+
+    await prefetcher.stop()
+    await aclose_async_client()
+
+
+def main() -> None:
+    args = _parse_args()
+    warnings.filterwarnings("ignore")
+    logging.disable(logging.WARNING)
+
+    from multi_tool_agent.testing import StubWeatherServer
+
+    with StubWeatherServer(
+        latency_seconds=args.weather_latency_ms / 1000, error_rate=args.error_rate, api_key=_api_keys(args), seed=0
+    ) as stub:
+        _configure_environment(args, stub.base_url)
+        if "multi_tool_agent.tools" in sys.modules:
+            sys.exit("multi_tool_agent.tools was imported before the stub URL was configured")
+        asyncio.run(_main(args, stub))
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,25 @@
-from . import agent
\ No newline at end of file
+"""Weather multi-tool agent.
+
+Importing the package is side-effect free: agents, the Runner and the session
+service are built on first use through `get_root_agent()`, `get_runner()` and
+`get_session_service()`. The `agent` submodule (used by `adk web`/`adk run`)
+is also loaded lazily.
+"""
+import importlib
+
+__all__ = ["agent", "get_root_agent", "get_runner", "get_session_service", "TurnDispatcher"]
+
+_LAZY_ATTRIBUTES = {
+    "get_root_agent": ".agents",
+    "get_runner": ".agent",
+    "get_session_service": ".session_service",
+    "TurnDispatcher": ".dispatcher",
+}
+
+
+def __getattr__(name: str):
+    if name == "agent":
+        return importlib.import_module(".agent", __name__)
+    if name in _LAZY_ATTRIBUTES:
+        return getattr(importlib.import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
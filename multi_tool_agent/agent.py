@@ -1,80 +1,259 @@
 import asyncio
+import contextlib
 import logging
-from google.adk.runners import Runner
-from google.genai import types
-
-# Import components from other modules
-from .session_service import session_service_stateful, APP_NAME, USER_ID_STATEFUL, SESSION_ID_STATEFUL
-from .agents import root_agent # Import the main agent
-
+import time
 import warnings
-warnings.filterwarnings("ignore")
 
-logging.basicConfig(level=logging.INFO)
+# Import components from other modules (cheap: heavy ADK imports happen on first use)
+from .config import APP_NAME, USER_ID_STATEFUL, SESSION_ID_STATEFUL, TRACING_ENABLED, TRACING_EXPORT_PATH
+from .agents import get_root_agent
+from .session_service import get_session_service, ensure_session
+
 # --- Runner Definition --- #
-runner = None
-if root_agent and session_service_stateful:
-    try:
-        runner = Runner(
-            agent=root_agent, # Use the imported root agent
-            app_name=APP_NAME, # Use the imported app name
-            session_service=session_service_stateful # Use the imported service
-        )
-        print(f"✅ Runner created for agent '{runner.agent.name}' using stateful session service.")
-    except Exception as e:
-        print(f"❌ Failed to create Runner. Error: {e}")
-else:
+_runner = None
+
+
+def get_runner():
+    """Returns the process-wide Runner, building the agents and session service on first use.
+
+    Returns None (after printing why) if the root agent or session service can't be created.
+    """
+    global _runner
+    if _runner is not None:
+        return _runner
+
+    root_agent = get_root_agent()
+    session_service_stateful = get_session_service()
     if not root_agent:
         print("❌ Cannot create Runner because root_agent is not defined or failed initialization.")
+        return None
     if not session_service_stateful:
         print("❌ Cannot create Runner because session_service_stateful is not defined.")
+        return None
+
+    if TRACING_ENABLED:
+        from .tracing import setup_tracing
+        setup_tracing(TRACING_EXPORT_PATH)
+
+    from google.adk.runners import Runner
+    try:
+        _runner = Runner(
+            agent=root_agent, # Use the root agent
+            app_name=APP_NAME, # Use the configured app name
+            session_service=session_service_stateful, # Use the shared service
+            auto_create_session=True, # New (user_id, session_id) pairs start with default state
+        )
+        print(f"✅ Runner created for agent '{_runner.agent.name}' using stateful session service.")
+    except Exception as e:
+        print(f"❌ Failed to create Runner. Error: {e}")
+    return _runner
+
+
+def __getattr__(name: str):
+    # Backwards-compatible module attributes, resolved lazily (`adk web` looks up `root_agent`)
+    if name == "runner":
+        return get_runner()
+    if name == "root_agent":
+        return get_root_agent()
+    if name == "session_service_stateful":
+        return get_session_service()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # --- Async Execution Logic --- #
 
-async def call_agent_async(query: str, runner_instance, user_id, session_id):
-    """Sends a query to the agent and prints the final response."""
-    if not runner_instance:
-        print("Error: Runner is not initialized. Cannot call agent.")
-        return
+async def run_turn(query: str, runner_instance, user_id, session_id) -> str:
+    """Runs one turn through the Runner and returns the agent's final response text.
 
-    print(f"\n>>> User Query: {query}")
+    Errors during the run are logged and reported as a generic error text, so
+    callers always get a response back.
+    """
+    from google.genai import types
+    from .tracing import PHASE_ATTRIBUTE, tracer
 
     # Prepare the user's message in ADK format
     content = types.Content(role='user', parts=[types.Part(text=query)])
 
     final_response_text = "Agent did not produce a final response." # Default
 
+    # One span per turn; the guardrail, model, tool, HTTP and session spans nest under it
+    with tracer.start_as_current_span("turn", attributes={PHASE_ATTRIBUTE: "turn", "session.id": session_id}) as turn_span:
+        try:
+            # Key Concept: run_async executes the agent logic and yields Events.
+            # We iterate through events to find the final answer.
+            # aclosing() finishes the run (and its spans) inside the turn when we break early
+            events = runner_instance.run_async(user_id=user_id, session_id=session_id, new_message=content)
+            async with contextlib.aclosing(events):
+                async for event in events:
+                    # You can uncomment the line below to see *all* events during execution
+                    # print(f"  [Event] Author: {event.author}, Type: {type(event).__name__}, Final: {event.is_final_response()}, Content: {event.content}")
+                    turn_span.add_event("adk.event", {"author": event.author or "", "final": event.is_final_response()})
+
+                    # Key Concept: is_final_response() marks the concluding message for the turn.
+                    if event.is_final_response():
+                        if event.content and event.content.parts:
+                           # Assuming text response in the first part
+                           final_response_text = event.content.parts[0].text
+                        elif event.actions and event.actions.escalate: # Handle potential errors/escalations
+                           final_response_text = f"Agent escalated: {event.error_message or 'No specific message.'}"
+                        # Add more checks here if needed (e.g., specific error codes)
+                        break # Stop processing events once the final response is found
+        except Exception as e:
+            print(f"\n--- Error during agent execution: {e} ---")
+            logging.exception("Error in runner.run_async")
+            final_response_text = "An error occurred during agent processing."
+            turn_span.record_exception(e)
+
+    return final_response_text
+
+
+async def stream_turn(query: str, runner_instance, user_id, session_id):
+    """Runs one turn with SSE streaming and yields progress as it happens.
+
+    Yields dicts, in order of arrival:
+        {"type": "text_delta", "author", "text"}: a chunk of response text.
+        {"type": "tool_call", "author", "name", "args"}: the agent called a tool.
+        {"type": "tool_result", "author", "name", "status"}: a tool returned.
+        {"type": "final", "author", "text", "tool_calls", "first_text_seconds", "elapsed_seconds"}:
+            always last; `text` is the full final response.
+
+    Models that don't stream (or responses answered by a callback) produce a
+    single `text_delta` with the whole text, so front ends only need to render
+    deltas. Errors are reported like `run_turn` does, in the final event.
+
+    The turn runs in its own task and hands updates over through a queue, so
+    its span is entered and exited in that task's context, however (and from
+    whichever task) the caller resumes this generator.
+    """
+    updates: asyncio.Queue = asyncio.Queue()
+
+    async def produce():
+        async with contextlib.aclosing(_turn_updates(query, runner_instance, user_id, session_id)) as turn:
+            async for update in turn:
+                updates.put_nowait(update)
+
+    producer = asyncio.create_task(produce())
+    producer.add_done_callback(lambda _: updates.put_nowait(None))
     try:
-        # Key Concept: run_async executes the agent logic and yields Events.
-        # We iterate through events to find the final answer.
-        async for event in runner_instance.run_async(user_id=user_id, session_id=session_id, new_message=content):
-            # You can uncomment the line below to see *all* events during execution
-            # print(f"  [Event] Author: {event.author}, Type: {type(event).__name__}, Final: {event.is_final_response()}, Content: {event.content}")
-
-            # Key Concept: is_final_response() marks the concluding message for the turn.
-            if event.is_final_response():
-                if event.content and event.content.parts:
-                   # Assuming text response in the first part
-                   final_response_text = event.content.parts[0].text
-                elif event.actions and event.actions.escalate: # Handle potential errors/escalations
-                   final_response_text = f"Agent escalated: {event.error_message or 'No specific message.'}"
-                # Add more checks here if needed (e.g., specific error codes)
-                break # Stop processing events once the final response is found
-    except Exception as e:
-        print(f"\n--- Error during agent execution: {e} ---")
-        logging.exception("Error in runner.run_async")
-        final_response_text = "An error occurred during agent processing."
+        while (update := await updates.get()) is not None:
+            yield update
+        await producer # Re-raises anything the turn itself didn't handle
+    finally:
+        if not producer.done(): # The caller stopped early (e.g. the client disconnected)
+            producer.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await producer
+
+
+async def _turn_updates(query: str, runner_instance, user_id, session_id):
+    """The body of `stream_turn`, run in the producer task."""
+    from google.adk.agents.run_config import RunConfig, StreamingMode
+    from google.genai import types
+    from .tracing import PHASE_ATTRIBUTE, record_latency, tracer
+
+    content = types.Content(role='user', parts=[types.Part(text=query)])
+    run_config = RunConfig(streaming_mode=StreamingMode.SSE)
+
+    final = {"type": "final", "author": None, "text": "Agent did not produce a final response.", "tool_calls": 0}
+    start = time.perf_counter()
+    first_text_at = None
+    streamed_text = False # text_delta chunks seen for the response being generated
+
+    with tracer.start_as_current_span("turn", attributes={PHASE_ATTRIBUTE: "turn", "session.id": session_id, "turn.streaming": True}) as turn_span:
+        try:
+            events = runner_instance.run_async(
+                user_id=user_id, session_id=session_id, new_message=content, run_config=run_config
+            )
+            async with contextlib.aclosing(events):
+                async for event in events:
+                    turn_span.add_event("adk.event", {"author": event.author or "", "final": event.is_final_response()})
+                    text = "".join(
+                        part.text for part in (event.content.parts if event.content and event.content.parts else [])
+                        if part.text and not part.thought
+                    )
+
+                    if event.partial:
+                        if text:
+                            if first_text_at is None:
+                                first_text_at = time.perf_counter()
+                            streamed_text = True
+                            yield {"type": "text_delta", "author": event.author, "text": text}
+                        continue
+
+                    for call in event.get_function_calls():
+                        final["tool_calls"] += 1
+                        yield {"type": "tool_call", "author": event.author, "name": call.name, "args": dict(call.args or {})}
+                    for response in event.get_function_responses():
+                        status = (response.response or {}).get("status")
+                        yield {"type": "tool_result", "author": event.author, "name": response.name, "status": status}
+
+                    if event.is_final_response():
+                        if text:
+                            if not streamed_text:
+                                if first_text_at is None:
+                                    first_text_at = time.perf_counter()
+                                yield {"type": "text_delta", "author": event.author, "text": text}
+                            final["text"] = text
+                        elif event.actions and event.actions.escalate:
+                            final["text"] = f"Agent escalated: {event.error_message or 'No specific message.'}"
+                        final["author"] = event.author
+                        break
+                    # The aggregated copy of streamed text closes out that response
+                    streamed_text = False
+        except Exception as e:
+            print(f"\n--- Error during agent execution: {e} ---")
+            logging.exception("Error in runner.run_async")
+            final["text"] = "An error occurred during agent processing."
+            turn_span.record_exception(e)
+
+        if first_text_at is not None and turn_span.is_recording():
+            record_latency("first_text", first_text_at - start)
 
-    print(f"<<< Agent Response: {final_response_text}")
+    final["first_text_seconds"] = (first_text_at - start) if first_text_at is not None else None
+    final["elapsed_seconds"] = time.perf_counter() - start
+    yield final
+
+
+async def call_agent_async(query: str, runner_instance, user_id, session_id, stream: bool = False):
+    """Sends a query to the agent and prints the final response.
+
+    With `stream=True` the response text is printed as it arrives, along with
+    tool calls and results.
+    """
+    if not runner_instance:
+        print("Error: Runner is not initialized. Cannot call agent.")
+        return
+
+    print(f"\n>>> User Query: {query}")
+    if not stream:
+        final_response_text = await run_turn(query, runner_instance, user_id, session_id)
+        print(f"<<< Agent Response: {final_response_text}")
+        return
+
+    print("<<< Agent Response: ", end="", flush=True)
+    async for update in stream_turn(query, runner_instance, user_id, session_id):
+        if update["type"] == "text_delta":
+            print(update["text"], end="", flush=True)
+        elif update["type"] == "tool_call":
+            print(f"\n  [Tool call] {update['name']}({update['args']})", flush=True)
+        elif update["type"] == "tool_result":
+            print(f"  [Tool result] {update['name']}: {update['status']}", flush=True)
+        else:
+            print(f"\n  [Done in {update['elapsed_seconds']:.2f}s]")
 
 
 async def run_conversation(): # Renamed for clarity
     """Runs a predefined conversation flow for testing."""
+    runner = get_runner()
     if not runner:
         print("Error: Runner not available. Cannot run conversation.")
         return
 
+    from .http_client import aclose_async_client
+
+    # Make sure the stateful demo session exists with its initial state
+    await ensure_session(runner.session_service, USER_ID_STATEFUL, SESSION_ID_STATEFUL)
+
     print("\n--- Running Test Conversation ---")
 
     # Use the runner for the agent with the callback and the existing stateful session ID
@@ -96,13 +275,24 @@ async def run_conversation(): # Renamed for clarity
     print("\n--- Turn 3: Sending a greeting --- ")
     await interaction_func("Hello again")
 
+    # Release pooled WeatherAPI connections before the event loop closes
+    await aclose_async_client()
+
+    if TRACING_ENABLED:
+        from .tracing import dump_latency_summary
+        print("\n--- Latency per phase (ms) ---")
+        print(dump_latency_summary())
+
 # --- Main Execution Block --- #
 if __name__ == "__main__":
-    if runner: # Only attempt to run if the runner was successfully created
+    warnings.filterwarnings("ignore")
+    logging.basicConfig(level=logging.INFO)
+
+    if get_runner(): # Only attempt to run if the runner was successfully created
         try:
             asyncio.run(run_conversation())
         except Exception as e:
             print(f"An error occurred during conversation execution: {e}")
             logging.exception("Error running conversation")
     else:
-        print("Execution skipped because the Runner could not be initialized.")
\ No newline at end of file
+        print("Execution skipped because the Runner could not be initialized.")
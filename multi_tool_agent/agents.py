@@ -1,77 +1,137 @@
-import os
-import logging
-# from dotenv import load_dotenv # Removed
-from google.adk.agents import Agent
-from .tools import get_weather, say_hello, say_goodbye # Relative imports
-from .guardrails import block_keyword_guardrail # Relative import
-from .config import AGENT_MODEL_NAME # Import from config
+from typing import TYPE_CHECKING, Union
 
-# load_dotenv() # Removed
+from .config import AGENT_MODEL_NAME, check_config # Import from config
+
+if TYPE_CHECKING:
+    from google.adk.models.base_llm import BaseLlm
+
+# Agents are built on first use (get_root_agent) rather than at import, so importing
+# this module stays cheap and never touches ADK or the network.
+
+ROOT_AGENT_INSTRUCTION = "You are a weather assistant. Your primary goal is to answer the user's specific question concisely. \
+                        **FIRST**, determine if the user is asking for a specific weather detail (like temperature, wind, humidity) or general weather ('how is the weather?'). \
+                        **SECOND**, use the 'get_weather_async' tool ONLY to get the necessary data for the requested city. \
+                        For a specific detail, pass `fields` with just what was asked (e.g. ['temperature'] or ['wind']); the tool then returns only those values in a compact `data` object. \
+                        For a general question, omit `fields` and the tool returns a *very detailed report*. \
+                        If the user asks about or compares SEVERAL cities, call 'get_weather_batch' ONCE with all of the cities (and the same optional `fields`) instead of calling 'get_weather_async' repeatedly; it returns one result (or error) per city. \
+                        **THIRD**, answer with ONLY the information the user asked for (e.g., 'The temperature in London is X°C.', 'The wind in Paris is blowing from the X at Y kph.'). \
+                        **EXCEPTION:** If the user asked a general question like 'What's the weather like?', then and ONLY then should you provide the full, detailed report from the tool. \
+                        Also delegate simple greetings to 'greeting_agent' and farewells to 'farewell_agent'."
+
+_root_agent = None
 
-# Get Model Name (used by all agents defined here) # Removed
-# AGENT_MODEL_NAME = os.environ.get("MODEL_GEMINI_2_0_FLASH", "gemini-1.5-flash-latest") # Removed
-# if not os.environ.get("MODEL_GEMINI_2_0_FLASH"): # Removed
-#     logging.warning(f"Warning: MODEL_GEMINI_2_0_FLASH env var not set in agents.py. Defaulting to '{AGENT_MODEL_NAME}'") # Removed
 
 # --- Sub Agents --- #
 
-# --- Greeting Agent --- #
-greeting_agent = None
-try:
-    greeting_agent = Agent(
-        model=AGENT_MODEL_NAME,
-        name="greeting_agent",
-        instruction="You are the Greeting Agent. Your ONLY task is to provide a friendly greeting using the 'say_hello' tool. Do nothing else.",
-        description="Handles simple greetings and hellos using the 'say_hello' tool.",
-        tools=[say_hello],
-    )
-    print(f"✅ Sub-Agent '{greeting_agent.name}' defined.")
-except Exception as e:
-    print(f"❌ Could not define Greeting agent. Check Model/API Key ({AGENT_MODEL_NAME}). Error: {e}")
-    greeting_agent = None # Ensure it's None if failed
-
-# --- Farewell Agent --- #
-farewell_agent = None
-try:
-    farewell_agent = Agent(
-        model=AGENT_MODEL_NAME,
-        name="farewell_agent",
-        instruction="You are the Farewell Agent. Your ONLY task is to provide a polite goodbye message using the 'say_goodbye' tool. Do not perform any other actions.",
-        description="Handles simple farewells and goodbyes using the 'say_goodbye' tool.",
-        tools=[say_goodbye],
-    )
-    print(f"✅ Sub-Agent '{farewell_agent.name}' defined.")
-except Exception as e:
-    print(f"❌ Could not define Farewell agent. Check Model/API Key ({AGENT_MODEL_NAME}). Error: {e}")
-    farewell_agent = None # Ensure it's None if failed
+def create_greeting_agent(model: Union[str, "BaseLlm"] = AGENT_MODEL_NAME):
+    """Builds the greeting sub-agent (None if it can't be defined)."""
+    from google.adk.agents import Agent
+    from .tools import say_hello
+    from .history import compact_history
+
+    try:
+        greeting_agent = Agent(
+            model=model,
+            name="greeting_agent",
+            instruction="You are the Greeting Agent. Your ONLY task is to provide a friendly greeting using the 'say_hello' tool. Do nothing else.",
+            description="Handles simple greetings and hellos using the 'say_hello' tool.",
+            tools=[say_hello],
+            before_model_callback=compact_history,
+        )
+        print(f"✅ Sub-Agent '{greeting_agent.name}' defined.")
+        return greeting_agent
+    except Exception as e:
+        print(f"❌ Could not define Greeting agent. Check Model/API Key ({model}). Error: {e}")
+        return None
+
+
+def create_farewell_agent(model: Union[str, "BaseLlm"] = AGENT_MODEL_NAME):
+    """Builds the farewell sub-agent (None if it can't be defined)."""
+    from google.adk.agents import Agent
+    from .tools import say_goodbye
+    from .history import compact_history
+
+    try:
+        farewell_agent = Agent(
+            model=model,
+            name="farewell_agent",
+            instruction="You are the Farewell Agent. Your ONLY task is to provide a polite goodbye message using the 'say_goodbye' tool. Do not perform any other actions.",
+            description="Handles simple farewells and goodbyes using the 'say_goodbye' tool.",
+            tools=[say_goodbye],
+            before_model_callback=compact_history,
+        )
+        print(f"✅ Sub-Agent '{farewell_agent.name}' defined.")
+        return farewell_agent
+    except Exception as e:
+        print(f"❌ Could not define Farewell agent. Check Model/API Key ({model}). Error: {e}")
+        return None
+
 
 # --- Root Agent --- #
-root_agent = None
 
-# Check prerequisites before creating the root agent
-if greeting_agent and farewell_agent:
+def create_root_agent(model: Union[str, "BaseLlm"] = AGENT_MODEL_NAME):
+    """Builds the root weather agent with its sub-agents.
+
+    Args:
+        model: A Gemini model name, or any ADK `BaseLlm` instance (e.g. a local
+            fake for benchmarks). Defaults to AGENT_MODEL_NAME.
+
+    Returns:
+        The root agent, or None if it (or a sub-agent) couldn't be defined.
+    """
+    from google.adk.agents import Agent
+    from .tools import get_weather_async, get_weather_batch # Relative imports
+    from .guardrails import block_keyword_guardrail # Relative import
+    from .router import fast_path_router, restore_weather_report
+    from .response_cache import serve_cached_response, store_final_response
+    from .history import compact_history
+    from .log import configure_logging
+
+    configure_logging() # Tool and callback logs go through the background writer from here on
+    greeting_agent = create_greeting_agent(model)
+    farewell_agent = create_farewell_agent(model)
+
+    # Check prerequisites before creating the root agent
+    if not (greeting_agent and farewell_agent):
+        print("❌ Cannot define root agent. One or more sub-agents (greeting_agent, farewell_agent) failed initialization.")
+        return None
+
     try:
         root_agent = Agent(
             name="weather_agent_v5_model_guardrail",
-            model=AGENT_MODEL_NAME,
+            model=model,
             description="Main agent: Handles weather, delegates greetings/farewells, includes input keyword guardrail.",
-            instruction="You are a weather assistant. Your primary goal is to answer the user's specific question concisely. \
-                        **FIRST**, determine if the user is asking for a specific weather detail (like temperature, wind, humidity) or general weather ('how is the weather?'). \
-                        **SECOND**, use the 'get_weather' tool ONLY to get the necessary data for the requested city. This tool returns a *very detailed report*. \
-                        **THIRD**, look at the user's original question again. \
-                        **FOURTH**, from the detailed tool report, extract ONLY the specific piece of information the user asked for. \
-                        **FIFTH**, present ONLY that single piece of information in your answer (e.g., 'The temperature in London is X°C.', 'The wind in Paris is blowing from the X at Y kph.'). \
-                        **EXCEPTION:** If the user asked a general question like 'What's the weather like?', then and ONLY then should you provide the full, detailed report from the tool. \
-                        Also delegate simple greetings to 'greeting_agent' and farewells to 'farewell_agent'.",
-            tools=[get_weather], # Use the imported tool
-            sub_agents=[agent for agent in [greeting_agent, farewell_agent] if agent is not None], # Filter out None agents
+            instruction=ROOT_AGENT_INSTRUCTION,
+            tools=[get_weather_async, get_weather_batch], # Non-blocking variants: run on the Runner's event loop
+            sub_agents=[greeting_agent, farewell_agent],
             output_key="last_weather_report",
-            before_model_callback=block_keyword_guardrail # Use the imported guardrail
+            # Guardrail first, then the local greeting/farewell fast path and the answer cache;
+            # the first non-None response wins. compact_history only trims the request, so it
+            # runs last, just before the LLM call.
+            before_model_callback=[block_keyword_guardrail, fast_path_router, serve_cached_response, compact_history],
+            after_model_callback=store_final_response,
+            after_agent_callback=restore_weather_report, # Fast-path replies aren't weather reports
         )
-        print(f"✅ Root Agent '{root_agent.name}' defined with before_model_callback.")
+        print(f"✅ Root Agent '{root_agent.name}' defined with before_model_callbacks.")
+        return root_agent
     except Exception as e:
         print(f"❌ Could not define Root agent. Error: {e}")
-        root_agent = None # Ensure it's None if failed
+        return None
+
+
+def get_root_agent():
+    """Returns the process-wide root agent, building it on first use (None if that fails)."""
+    global _root_agent
+    if _root_agent is None and check_config():
+        _root_agent = create_root_agent()
+    return _root_agent
+
 
-else:
-    print("❌ Cannot define root agent. One or more sub-agents (greeting_agent, farewell_agent) failed initialization.")
+def __getattr__(name: str):
+    # Backwards-compatible module attributes, resolved lazily
+    if name == "root_agent":
+        return get_root_agent()
+    if name in ("greeting_agent", "farewell_agent"):
+        root_agent = get_root_agent()
+        return root_agent.find_sub_agent(name) if root_agent else None
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
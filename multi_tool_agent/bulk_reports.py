@@ -0,0 +1,233 @@
+"""Bulk rendering of detailed weather reports (e.g. nightly digests for many cities).
+
+`load_columns()` turns many cached WeatherAPI `current` payloads into columnar
+NumPy arrays once; `render_reports()` then picks the Celsius or Fahrenheit
+column per row, applies the wind-chill/heat-index heuristics as array masks
+and fills one report template per row shape. The text is identical to
+`tools._build_report()` for each city (`benchmarks/bench_bulk.py` checks it).
+
+Numbers are formatted once per distinct value (weather readings repeat a lot
+across cities) with the same format specs as the single-city report, so
+rounding matches exactly. NumPy is optional: without it `build_reports()`
+falls back to calling `_build_report()` per city.
+"""
+import logging
+from typing import Dict, List, Sequence, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError: # Optional: only needed for the vectorized path
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Payload fields loaded as float64 columns (missing values become NaN)
+NUMERIC_FIELDS = (
+    "temp_c", "temp_f", "feelslike_c", "feelslike_f", "wind_kph", "wind_mph",
+    "pressure_mb", "pressure_in", "precip_mm", "precip_in", "vis_km", "vis_miles",
+    "gust_kph", "gust_mph", "windchill_c", "windchill_f", "heatindex_c", "heatindex_f",
+    "dewpoint_c", "dewpoint_f",
+)
+# Fields rendered as-is (`str()` of the raw value): loaded as text plus a "has_<field>" mask.
+# The report checks the first two against None and the others for truthiness.
+RAW_FIELDS = ("humidity", "uv", "wind_dir", "last_updated")
+_TRUTHY_FIELDS = ("wind_dir", "last_updated")
+
+# (Celsius field, Fahrenheit field) per report quantity
+_UNIT_FIELDS = {
+    "temp": ("temp_c", "temp_f"),
+    "feels_like": ("feelslike_c", "feelslike_f"),
+    "wind": ("wind_kph", "wind_mph"),
+    "pressure": ("pressure_mb", "pressure_in"),
+    "precip": ("precip_mm", "precip_in"),
+    "visibility": ("vis_km", "vis_miles"),
+    "gust": ("gust_kph", "gust_mph"),
+    "wind_chill": ("windchill_c", "windchill_f"),
+    "heat_index": ("heatindex_c", "heatindex_f"),
+    "dew_point": ("dewpoint_c", "dewpoint_f"),
+}
+# (Celsius unit, Fahrenheit unit) labels
+_UNIT_LABELS = {
+    "temp": ("°C", "°F"),
+    "wind": ("kph", "mph"),
+    "pressure": ("mb", "inHg"),
+    "precip": ("mm", "in"),
+    "visibility": ("km", "miles"),
+}
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise ImportError("Bulk report rendering needs NumPy: pip install numpy")
+
+
+def load_columns(payloads: Sequence[dict]) -> Dict[str, "np.ndarray"]:
+    """Loads WeatherAPI `current` payloads into one array per field.
+
+    Unit-independent text (humidity, UV, wind direction, update time) is
+    rendered here, once for all unit systems.
+
+    Raises:
+        KeyError: If a payload has no "condition" (as `_build_report` does).
+    """
+    _require_numpy()
+    columns = {
+        name: np.array([payload.get(name) for payload in payloads], dtype=np.float64)
+        for name in NUMERIC_FIELDS
+    }
+    for name in RAW_FIELDS:
+        raw = [payload.get(name) for payload in payloads]
+        if name in _TRUTHY_FIELDS:
+            present = np.array([bool(value) for value in raw], dtype=bool)
+        else:
+            present = np.array([value is not None for value in raw], dtype=bool)
+        columns[name] = _as_text(raw, present)
+        columns[f"has_{name}"] = present
+    description = np.empty(len(payloads), dtype=object)
+    description[:] = [payload["condition"].get("text", "N/A") for payload in payloads]
+    columns["description"] = description
+    return columns
+
+
+def _format_numbers(values: "np.ndarray", present: "np.ndarray", spec: str) -> "np.ndarray":
+    """Formats the present values with `spec`, once per distinct value; absent rows get ""."""
+    out = np.full(len(values), "", dtype=object)
+    if present.any():
+        # Unique on the bit pattern, so -0.0 and 0.0 keep their own text
+        distinct, inverse = np.unique(values[present].view(np.int64), return_inverse=True)
+        texts = np.array([format(value, spec) for value in distinct.view(np.float64).tolist()], dtype=object)
+        out[present] = texts[inverse]
+    return out
+
+
+def _as_text(values: list, present: "np.ndarray") -> "np.ndarray":
+    """`str()` of each present value (as the report's f-strings do); absent rows get ""."""
+    out = np.empty(len(values), dtype=object)
+    out[:] = [str(value) if keep else "" for value, keep in zip(values, present.tolist())]
+    return out
+
+
+# Report sentences in order: (%-template with {unit label} slots, names of the columns filling its %s)
+_SENTENCES = (
+    ("The weather in %s is %s with a temperature of %s{temp}.", ("name", "description", "temp")),
+    ("The weather in %s is %s.", ("name", "description")),
+    ("It feels like %s{temp}.", ("feels_like",)),
+    ("Humidity is at %s%%.", ("humidity",)),
+    ("Wind is blowing from the %s at %s {wind}.", ("wind_dir", "wind")),
+    ("Wind speed is %s {wind}.", ("wind",)),
+    ("The UV index is %s.", ("uv",)),
+    ("Pressure is %s {pressure}.", ("pressure",)),
+    ("Precipitation is %s {precip}.", ("precip",)),
+    ("Visibility is %s {visibility}.", ("visibility",)),
+    ("Wind gusts up to %s {wind}.", ("gust",)),
+    ("Dew point is %s{temp}.", ("dew_point",)),
+    ("Wind chill makes it feel like %s{temp}.", ("wind_chill",)),
+    ("Heat index makes it feel like %s{temp}.", ("heat_index",)),
+    ("(Last updated: %s)", ("last_updated",)),
+)
+
+
+def _template(shape: int, fahrenheit: bool) -> Tuple[str, List[str]]:
+    """The %-template and its argument columns for rows containing the sentences in bitmask `shape`."""
+    labels = {quantity: pair[fahrenheit] for quantity, pair in _UNIT_LABELS.items()}
+    parts, arguments = [], []
+    for index, (template, names) in enumerate(_SENTENCES):
+        if shape >> index & 1:
+            parts.append(template.format(**labels))
+            arguments.extend(names)
+    return " ".join(parts), arguments
+
+
+def render_reports(
+    cities: Sequence[str],
+    columns: Dict[str, "np.ndarray"],
+    preferred_units: Union[str, Sequence[str]] = "Celsius",
+) -> List[str]:
+    """Renders the detailed report for every row of `columns` (see `load_columns`).
+
+    Rows are grouped by their shape (which sentences they have, and the unit
+    system); each group gets one %-template, filled per row from columns of
+    pre-formatted values.
+
+    Args:
+        cities (sequence of str): The city name per row, as passed to the weather tool.
+        columns (dict): The columns from `load_columns()`.
+        preferred_units: "Celsius"/"Fahrenheit" for every row, or one per row.
+
+    Returns:
+        list of str: The same text `_build_report()` produces for each row.
+    """
+    _require_numpy()
+    rows = len(cities)
+    fahrenheit = np.asarray(preferred_units, dtype=object) == "Fahrenheit"
+    if fahrenheit.ndim == 0:
+        fahrenheit = np.full(rows, bool(fahrenheit))
+
+    # Pick the Celsius or Fahrenheit column per row
+    values = {
+        quantity: np.where(fahrenheit, columns[fahrenheit_field], columns[celsius_field])
+        for quantity, (celsius_field, fahrenheit_field) in _UNIT_FIELDS.items()
+    }
+    present = {quantity: ~np.isnan(column) for quantity, column in values.items()}
+    has_wind_dir = columns["has_wind_dir"]
+
+    # The wind-chill/heat-index heuristics (only shown when clearly off the feels-like temperature)
+    feels_like = values["feels_like"]
+    with np.errstate(invalid="ignore"):
+        show_wind_chill = present["wind_chill"] & present["feels_like"] & (values["wind_chill"] < feels_like - 1)
+        show_heat_index = present["heat_index"] & present["feels_like"] & (values["heat_index"] > feels_like + 1)
+
+    has_temp = present["temp"]
+    missing_temp = int(rows - has_temp.sum())
+    if missing_temp:
+        logger.warning("Temperature data (temp_c/temp_f) missing in %d API responses", missing_temp)
+
+    sentence_present = (
+        has_temp, ~has_temp, present["feels_like"], columns["has_humidity"],
+        present["wind"] & has_wind_dir, present["wind"] & ~has_wind_dir, columns["has_uv"],
+        present["pressure"], present["precip"], present["visibility"], present["gust"],
+        present["dew_point"], show_wind_chill, show_heat_index, columns["has_last_updated"],
+    )
+    shapes = np.zeros(rows, dtype=np.int64)
+    for index, mask in enumerate(sentence_present):
+        shapes |= mask.astype(np.int64) << index
+    shapes |= fahrenheit.astype(np.int64) << len(_SENTENCES)
+
+    texts = {
+        "name": np.array([city.capitalize() for city in cities], dtype=object),
+        **{name: columns[name] for name in ("description", *RAW_FIELDS)},
+    }
+    for quantity in _UNIT_FIELDS:
+        spec = ".2f" if quantity in ("pressure", "precip") else ".1f"
+        texts[quantity] = _format_numbers(values[quantity], present[quantity], spec)
+
+    reports = np.empty(rows, dtype=object)
+    distinct_shapes, group = np.unique(shapes, return_inverse=True)
+    order = np.argsort(group, kind="stable")
+    bounds = np.cumsum(np.bincount(group, minlength=len(distinct_shapes)))
+    for shape, members in zip(distinct_shapes.tolist(), np.split(order, bounds[:-1])):
+        template, arguments = _template(shape, bool(shape >> len(_SENTENCES) & 1))
+        argument_rows = zip(*(texts[name][members].tolist() for name in arguments))
+        reports[members] = [template % row for row in argument_rows]
+    return reports.tolist()
+
+
+def build_reports(
+    cities: Sequence[str],
+    payloads: Sequence[dict],
+    preferred_units: Union[str, Sequence[str]] = "Celsius",
+) -> List[str]:
+    """Renders detailed reports for many `(city, payload)` pairs; same text as `_build_report`.
+
+    Uses the vectorized path when NumPy is installed, else the single-city
+    report builder in a loop.
+    """
+    if len(cities) != len(payloads):
+        raise ValueError("cities and payloads must have the same length.")
+    if np is not None:
+        return render_reports(cities, load_columns(payloads), preferred_units)
+
+    from .tools import _build_report
+
+    units = [preferred_units] * len(cities) if isinstance(preferred_units, str) else list(preferred_units)
+    return [_build_report(city, payload, unit) for city, payload, unit in zip(cities, payloads, units)]
@@ -0,0 +1,157 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+
+def normalize_city(city: str) -> str:
+    """Normalizes a city name into a cache key ('  New   York ' -> 'new york')."""
+    return " ".join(city.split()).lower()
+
+
+class TTLCache:
+    """A bounded, thread-safe LRU cache whose entries expire after a TTL.
+
+    Entries younger than `ttl_seconds` are fresh. Entries older than that but
+    still within `ttl_seconds + stale_seconds` are returned flagged as stale so
+    the caller can serve them immediately and revalidate in the background
+    (stale-while-revalidate). Anything older is counted as a miss; it is kept
+    for a further `fallback_seconds` so `peek()` can still serve it when the
+    origin is down (stale-if-error), then dropped.
+
+    Args:
+        max_entries (int): Maximum number of entries kept before the least
+            recently used one is evicted.
+        ttl_seconds (float): How long an entry is considered fresh.
+        stale_seconds (float): Extra window during which an expired entry may
+            still be served as stale. 0 disables stale-while-revalidate.
+        fallback_seconds (float): Extra window during which an expired entry is
+            kept for `peek()`. 0 disables stale-if-error.
+        clock (Callable[[], float], optional): Monotonic time source.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl_seconds: float = 300.0,
+        stale_seconds: float = 0.0,
+        fallback_seconds: float = 0.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1.")
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.fallback_seconds = fallback_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.fallback_hits = 0
+
+    def get(self, key: Hashable) -> Tuple[Optional[Any], bool]:
+        """Looks up `key`.
+
+        Returns:
+            tuple: `(value, is_stale)`. On a miss the value is None.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, False
+
+            value, stored_at = entry
+            age = self._clock() - stored_at
+            if age > self.ttl_seconds + self.stale_seconds:
+                if age > self.ttl_seconds + self.stale_seconds + self.fallback_seconds:
+                    del self._entries[key]
+                    self.expirations += 1
+                self.misses += 1
+                return None, False
+
+            self._entries.move_to_end(key)
+            if age > self.ttl_seconds:
+                self.stale_hits += 1
+                return value, True
+            self.hits += 1
+            return value, False
+
+    def peek(self, key: Hashable) -> Tuple[Optional[Any], Optional[float]]:
+        """Returns `(value, age_seconds)` for `key` even if it has expired (within the fallback window).
+
+        Meant as a last resort when the origin is unavailable; counted as a
+        fallback hit rather than a hit.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, None
+            value, stored_at = entry
+            age = self._clock() - stored_at
+            if age > self.ttl_seconds + self.stale_seconds + self.fallback_seconds:
+                return None, None
+            self.fallback_hits += 1
+            return value, age
+
+    def fresh_value(self, key: Hashable) -> Optional[Any]:
+        """Returns the value of `key` if it is still fresh, else None.
+
+        Doesn't count as a lookup or affect LRU order (for dependency checks).
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._clock() - entry[1] > self.ttl_seconds:
+                return None
+            return entry[0]
+
+    def time_to_expiry(self, key: Hashable) -> Optional[float]:
+        """Seconds until `key` stops being fresh (negative once it has), or None if it isn't cached.
+
+        Doesn't count as a lookup or affect LRU order.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            return self.ttl_seconds - (self._clock() - entry[1])
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Stores `value` under `key`, evicting the least recently used entry if full."""
+        with self._lock:
+            self._entries[key] = (value, self._clock())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Drops a single entry, or the whole cache when `key` is None."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        """Returns a snapshot of the cache counters."""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "fallback_hits": self.fallback_hits,
+            }
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
@@ -1,34 +1,222 @@
 import os
-import sys
 import logging
 from dotenv import load_dotenv
 
-# Load .env file once here for all modules
+# Load .env file once here for all modules (a local file read; no other import-time work happens here)
 load_dotenv()
 
 # --- API Keys & Model --- #
 
-# Google API Key (Required)
+# Google API Key (Required for Gemini models; checked by check_config() when the agents are built)
 GOOGLE_API_KEY = os.environ.get("GOOGLE_API_KEY")
-if not GOOGLE_API_KEY:
-    print("CRITICAL ERROR: GOOGLE_API_KEY environment variable not set. Exiting.")
-    sys.exit(1)
 
 # Weather API Key (Required by tools.py)
 WEATHER_API_KEY = os.environ.get("WEATHER_API_KEY")
-if not WEATHER_API_KEY:
-    # Log a warning here, the tool itself will return an error message if called
-    logging.warning("Config Warning: WEATHER_API_KEY environment variable not set. Weather tool will fail.")
+# Optional pool of WeatherAPI keys (comma-separated) to spread calls over; defaults to WEATHER_API_KEY alone
+WEATHER_API_KEYS = [key.strip() for key in os.environ.get("WEATHER_API_KEYS", "").split(",") if key.strip()] or (
+    [WEATHER_API_KEY] if WEATHER_API_KEY else []
+)
+# WeatherAPI base URL (override to point at a local stub, e.g. multi_tool_agent.testing)
+WEATHER_API_BASE_URL = os.environ.get("WEATHER_API_BASE_URL", "http://api.weatherapi.com/v1")
 
 # Agent Model Name (Optional, has default)
 DEFAULT_MODEL = "gemini-1.5-flash-latest"
 AGENT_MODEL_NAME = os.environ.get("MODEL_GEMINI_2_0_FLASH", DEFAULT_MODEL)
-if not os.environ.get("MODEL_GEMINI_2_0_FLASH"):
-    logging.warning(f"Config Warning: MODEL_GEMINI_2_0_FLASH env var not set. Defaulting to '{AGENT_MODEL_NAME}'")
+
+
+def check_config() -> bool:
+    """Validates the configuration needed to talk to Gemini and logs warnings.
+
+    Called once when the agents are first built (not at import), so importing
+    the package never exits the process.
+
+    Returns:
+        bool: False if GOOGLE_API_KEY is missing, True otherwise.
+    """
+    if not WEATHER_API_KEYS:
+        # Log a warning here, the tool itself will return an error message if called
+        logging.warning("Config Warning: WEATHER_API_KEY environment variable not set. Weather tool will fail.")
+    if not os.environ.get("MODEL_GEMINI_2_0_FLASH"):
+        logging.warning(f"Config Warning: MODEL_GEMINI_2_0_FLASH env var not set. Defaulting to '{AGENT_MODEL_NAME}'")
+    if not GOOGLE_API_KEY:
+        print("CRITICAL ERROR: GOOGLE_API_KEY environment variable not set.")
+        return False
+    return True
+
+# --- Weather Cache Configuration --- #
+
+# How long a cached WeatherAPI "current" payload is served without refetching
+WEATHER_CACHE_TTL_SECONDS = float(os.environ.get("WEATHER_CACHE_TTL_SECONDS", "300"))
+# Extra window during which an expired payload is still served while it is refreshed in the background
+WEATHER_CACHE_STALE_SECONDS = float(os.environ.get("WEATHER_CACHE_STALE_SECONDS", "60"))
+# Maximum number of cities kept in the cache before the least recently used one is evicted
+WEATHER_CACHE_MAX_ENTRIES = int(os.environ.get("WEATHER_CACHE_MAX_ENTRIES", "256"))
+# How long past its stale window a cached payload may still be served when WeatherAPI is failing
+WEATHER_CACHE_FALLBACK_SECONDS = float(os.environ.get("WEATHER_CACHE_FALLBACK_SECONDS", "3600"))
+
+# --- Weather HTTP Client Configuration --- #
+
+# Connection pool limits for the shared WeatherAPI HTTP clients
+WEATHER_HTTP_MAX_CONNECTIONS = int(os.environ.get("WEATHER_HTTP_MAX_CONNECTIONS", "50"))
+WEATHER_HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get("WEATHER_HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+WEATHER_HTTP_KEEPALIVE_EXPIRY_SECONDS = float(os.environ.get("WEATHER_HTTP_KEEPALIVE_EXPIRY_SECONDS", "30"))
+# Per-phase timeouts (seconds) for WeatherAPI requests
+WEATHER_HTTP_CONNECT_TIMEOUT_SECONDS = float(os.environ.get("WEATHER_HTTP_CONNECT_TIMEOUT_SECONDS", "3"))
+WEATHER_HTTP_READ_TIMEOUT_SECONDS = float(os.environ.get("WEATHER_HTTP_READ_TIMEOUT_SECONDS", "10"))
+
+# --- WeatherAPI Key Pool Configuration --- #
+# These limits are enforced per process: with SERVER_WORKERS > 1 each worker has its own
+# buckets and quota counters, so set them to the account's limits divided by the worker count.
+
+# Sustained requests per second and burst allowed per key (token bucket)
+WEATHER_KEY_RATE_PER_SECOND = float(os.environ.get("WEATHER_KEY_RATE_PER_SECOND", "10"))
+WEATHER_KEY_BURST = float(os.environ.get("WEATHER_KEY_BURST", "20"))
+# Requests allowed per key per UTC day (0 = unlimited)
+WEATHER_KEY_DAILY_QUOTA = int(os.environ.get("WEATHER_KEY_DAILY_QUOTA", "0"))
+# How long a lookup may queue for rate-limit capacity before giving up
+WEATHER_KEY_WAIT_TIMEOUT_SECONDS = float(os.environ.get("WEATHER_KEY_WAIT_TIMEOUT_SECONDS", "5"))
+
+# --- Weather Resilience Configuration --- #
+
+# Adapt each request's timeout to the observed latency (WEATHER_TIMEOUT_P99_MULTIPLIER x p99,
+# at least WEATHER_TIMEOUT_MIN_SECONDS, at most the read timeout)
+WEATHER_TIMEOUT_ADAPTIVE = os.environ.get("WEATHER_TIMEOUT_ADAPTIVE", "true").lower() in ("1", "true", "yes")
+WEATHER_TIMEOUT_MIN_SECONDS = float(os.environ.get("WEATHER_TIMEOUT_MIN_SECONDS", "1"))
+WEATHER_TIMEOUT_P99_MULTIPLIER = float(os.environ.get("WEATHER_TIMEOUT_P99_MULTIPLIER", "3"))
+# Attempts per lookup (timeouts, connection errors and 429/5xx are retried with jittered backoff)
+WEATHER_RETRY_MAX_ATTEMPTS = int(os.environ.get("WEATHER_RETRY_MAX_ATTEMPTS", "3"))
+WEATHER_RETRY_BACKOFF_BASE_SECONDS = float(os.environ.get("WEATHER_RETRY_BACKOFF_BASE_SECONDS", "0.1"))
+WEATHER_RETRY_BACKOFF_MAX_SECONDS = float(os.environ.get("WEATHER_RETRY_BACKOFF_MAX_SECONDS", "1"))
+# Send a second request when an async lookup is slower than the observed p95
+WEATHER_HEDGE_ENABLED = os.environ.get("WEATHER_HEDGE_ENABLED", "true").lower() in ("1", "true", "yes")
+# Consecutive failed requests that open the circuit, and how long it stays open before a probe
+WEATHER_BREAKER_FAILURE_THRESHOLD = int(os.environ.get("WEATHER_BREAKER_FAILURE_THRESHOLD", "5"))
+WEATHER_BREAKER_RESET_SECONDS = float(os.environ.get("WEATHER_BREAKER_RESET_SECONDS", "30"))
+
+# --- Batch Weather Tool Configuration --- #
+
+# Maximum number of WeatherAPI requests get_weather_batch keeps in flight at once
+WEATHER_BATCH_MAX_CONCURRENCY = int(os.environ.get("WEATHER_BATCH_MAX_CONCURRENCY", "8"))
+# Maximum number of cities accepted in a single get_weather_batch call
+WEATHER_BATCH_MAX_CITIES = int(os.environ.get("WEATHER_BATCH_MAX_CITIES", "20"))
+
+# --- Prefetch Configuration --- #
+
+# Refresh the most requested cities in the background shortly before their cache entries expire
+PREFETCH_ENABLED = os.environ.get("PREFETCH_ENABLED", "true").lower() in ("1", "true", "yes")
+# How often the hot cities are checked, and how long before expiry they are refreshed
+PREFETCH_INTERVAL_SECONDS = float(os.environ.get("PREFETCH_INTERVAL_SECONDS", "5"))
+PREFETCH_LEAD_SECONDS = float(os.environ.get("PREFETCH_LEAD_SECONDS", "30"))
+# Upstream requests the prefetcher may spend per minute
+PREFETCH_MAX_REQUESTS_PER_MINUTE = float(os.environ.get("PREFETCH_MAX_REQUESTS_PER_MINUTE", "30"))
+# Number of hot cities tracked, and the decayed request count a city needs to be prefetched
+PREFETCH_TOP_K = int(os.environ.get("PREFETCH_TOP_K", "20"))
+PREFETCH_MIN_SCORE = float(os.environ.get("PREFETCH_MIN_SCORE", "2"))
+# Half-life (seconds) of a request's weight in the popularity counts
+PREFETCH_HALF_LIFE_SECONDS = float(os.environ.get("PREFETCH_HALF_LIFE_SECONDS", "600"))
+
+# --- Gazetteer Configuration --- #
+
+# Canonicalize city names against the bundled gazetteer before looking them up
+GAZETTEER_ENABLED = os.environ.get("GAZETTEER_ENABLED", "true").lower() in ("1", "true", "yes")
+# Reject names the gazetteer doesn't know without calling WeatherAPI and auto-correct misspellings
+# (otherwise unknown and misspelled names are passed through as typed)
+GAZETTEER_STRICT = os.environ.get("GAZETTEER_STRICT", "false").lower() in ("1", "true", "yes")
+# Tab-separated city table (defaults to the bundled cities.tsv)
+GAZETTEER_CITIES_PATH = os.environ.get(
+    "GAZETTEER_CITIES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cities.tsv")
+)
+
+# --- Response Cache Configuration --- #
+
+# Answer repeated weather questions from earlier final answers while their weather data is unchanged
+RESPONSE_CACHE_ENABLED = os.environ.get("RESPONSE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+# Upper bound on a cached answer's lifetime (it is also dropped as soon as its weather data changes)
+RESPONSE_CACHE_TTL_SECONDS = float(os.environ.get("RESPONSE_CACHE_TTL_SECONDS", "900"))
+
+# --- Fast-Path Router Configuration --- #
+
+# Answer plain greetings/farewells locally instead of calling the LLM
+FAST_PATH_ROUTER_ENABLED = os.environ.get("FAST_PATH_ROUTER_ENABLED", "true").lower() in ("1", "true", "yes")
+# Optional JSON intent model (see router.train_intent_model) consulted when no pattern matches
+FAST_PATH_MODEL_PATH = os.environ.get("FAST_PATH_MODEL_PATH")
+# Minimum classifier confidence required to skip the LLM
+FAST_PATH_MIN_CONFIDENCE = float(os.environ.get("FAST_PATH_MIN_CONFIDENCE", "0.9"))
+# Longer messages always go to the LLM
+FAST_PATH_MAX_MESSAGE_CHARS = int(os.environ.get("FAST_PATH_MAX_MESSAGE_CHARS", "60"))
+
+# --- Guardrail Configuration --- #
+
+# JSON file of blocked keywords/regexes (defaults to the bundled guardrail_rules.json)
+GUARDRAIL_RULES_PATH = os.environ.get(
+    "GUARDRAIL_RULES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "guardrail_rules.json")
+)
+# How often (seconds) the rules file is checked for changes and hot-reloaded
+GUARDRAIL_RELOAD_INTERVAL_SECONDS = float(os.environ.get("GUARDRAIL_RELOAD_INTERVAL_SECONDS", "5"))
 
 # --- Session Configuration --- #
 APP_NAME = "weather_tutorial_app"
 
+# "memory" (InMemorySessionService) or "sqlite" (persistent, shareable across worker processes)
+SESSION_BACKEND = os.environ.get("SESSION_BACKEND", "memory").lower()
+SESSION_DB_PATH = os.environ.get("SESSION_DB_PATH", "weather_sessions.db")
+# Idle sessions expire after this many seconds (0 keeps them forever)
+SESSION_TTL_SECONDS = float(os.environ.get("SESSION_TTL_SECONDS", "86400"))
+# How long appended events may sit in the SQLite write buffer (0 = write through)
+SESSION_FLUSH_INTERVAL_SECONDS = float(os.environ.get("SESSION_FLUSH_INTERVAL_SECONDS", "0.05"))
+SESSION_FLUSH_MAX_EVENTS = int(os.environ.get("SESSION_FLUSH_MAX_EVENTS", "32"))
+# Events retained per session in the SQLite store (0 = unlimited)
+SESSION_MAX_EVENTS = int(os.environ.get("SESSION_MAX_EVENTS", "200"))
+
+# --- Dispatcher Configuration --- #
+
+# Turns running at once across all sessions (each session runs one turn at a time)
+DISPATCHER_MAX_CONCURRENT_TURNS = int(os.environ.get("DISPATCHER_MAX_CONCURRENT_TURNS", "32"))
+# Turns accepted (running + queued) before new ones are rejected
+DISPATCHER_MAX_PENDING_TURNS = int(os.environ.get("DISPATCHER_MAX_PENDING_TURNS", "1000"))
+# Turns accepted per session (running + queued) before new ones are rejected
+DISPATCHER_MAX_PENDING_PER_SESSION = int(os.environ.get("DISPATCHER_MAX_PENDING_PER_SESSION", "4"))
+
+# --- Server Configuration --- #
+
+SERVER_HOST = os.environ.get("SERVER_HOST", "127.0.0.1")
+SERVER_PORT = int(os.environ.get("SERVER_PORT", "8000"))
+# Worker processes (more than one needs a shared session backend, e.g. SESSION_BACKEND=sqlite,
+# and divides the WeatherAPI key limits above between them)
+SERVER_WORKERS = int(os.environ.get("SERVER_WORKERS", "1"))
+# Seconds in-flight turns get to finish on shutdown
+SERVER_DRAIN_TIMEOUT_SECONDS = float(os.environ.get("SERVER_DRAIN_TIMEOUT_SECONDS", "30"))
+# Serve with the offline ScriptedLlm and StubWeatherServer (multi_tool_agent.testing) instead of Gemini/WeatherAPI
+SERVER_STUB_BACKENDS = os.environ.get("SERVER_STUB_BACKENDS", "false").lower() in ("1", "true", "yes")
+
+# --- Conversation History Configuration --- #
+
+# User turns sent to the model per request (0 = unlimited)
+HISTORY_MAX_TURNS = int(os.environ.get("HISTORY_MAX_TURNS", "6"))
+# Replace weather tool payloads from earlier turns with a short stub
+HISTORY_ELIDE_TOOL_PAYLOADS = os.environ.get("HISTORY_ELIDE_TOOL_PAYLOADS", "true").lower() in ("1", "true", "yes")
+# Add a short extractive summary of dropped turns to the system instruction
+HISTORY_SUMMARIZE = os.environ.get("HISTORY_SUMMARIZE", "false").lower() in ("1", "true", "yes")
+HISTORY_SUMMARY_MAX_CHARS = int(os.environ.get("HISTORY_SUMMARY_MAX_CHARS", "500"))
+
+# --- Tracing Configuration --- #
+
+# Record per-phase latency spans (turn, guardrail, model, tool, http, session)
+TRACING_ENABLED = os.environ.get("TRACING_ENABLED", "false").lower() in ("1", "true", "yes")
+# JSON Lines file to export spans to; unset keeps them in memory
+TRACING_EXPORT_PATH = os.environ.get("TRACING_EXPORT_PATH") or None
+
+# --- Logging Configuration --- #
+
+# Level for the package's loggers, plus per-module overrides ("tools=DEBUG,resilience=WARNING")
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+LOG_LEVELS = os.environ.get("LOG_LEVELS", "")
+# "text" or "json" (one JSON object per line)
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text").lower()
+# Fraction of bulky debug records (full API payloads, tool results) that are kept
+LOG_DEBUG_SAMPLE_RATE = float(os.environ.get("LOG_DEBUG_SAMPLE_RATE", "0.1"))
+
 # Example User/Session IDs (Consider making dynamic in a real application)
 USER_ID_DEFAULT = "user_1"
 SESSION_ID_DEFAULT = "session_001"
@@ -40,5 +228,3 @@ SESSION_ID_STATEFUL = "session_state_demo_001"
 initial_state = {
     "user_preference_temperature_unit": "Celsius"
 }
-
-print("Configuration loaded.") 
\ No newline at end of file
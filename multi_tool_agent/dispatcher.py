@@ -0,0 +1,160 @@
+"""Runs turns for many conversations concurrently on one Runner.
+
+`TurnDispatcher.submit()` accepts a turn for any `(user_id, session_id)` and
+returns the agent's final text. Turns of different sessions run concurrently,
+up to a global limit; turns of the same session run one at a time, in
+submission order, so they never race on that session's state or events.
+
+Queues are bounded: once too many turns are pending in total or for one
+session, `submit()` raises `DispatcherOverloaded` straight away instead of
+queueing, so callers can shed load (e.g. answer 429/503).
+"""
+import asyncio
+import contextlib
+import logging
+from typing import AsyncGenerator, Dict, Tuple
+
+from .config import (
+    DISPATCHER_MAX_CONCURRENT_TURNS,
+    DISPATCHER_MAX_PENDING_TURNS,
+    DISPATCHER_MAX_PENDING_PER_SESSION,
+)
+from .agent import run_turn, stream_turn
+
+logger = logging.getLogger(__name__)
+
+
+class DispatcherOverloaded(Exception):
+    """Raised when a turn is rejected because the dispatcher's queues are full."""
+
+
+class _SessionSlot:
+    """Serializes the turns of one session; dropped once it has nothing pending."""
+
+    __slots__ = ("lock", "pending")
+
+    def __init__(self):
+        self.lock = asyncio.Lock() # FIFO, so a session's turns run in submission order
+        self.pending = 0
+
+
+class TurnDispatcher:
+    """Dispatches turns for many sessions onto one Runner with bounded concurrency.
+
+    Args:
+        runner: The ADK Runner every turn is run on.
+        max_concurrent_turns (int): Turns running at once across all sessions.
+        max_pending_turns (int): Turns accepted (running + queued) in total.
+        max_pending_per_session (int): Turns accepted (running + queued) per session.
+        flush_sessions (bool): Flush a write-behind session store (e.g. the SQLite
+            one) after each turn, so other processes sharing it see the turn as
+            soon as it completes.
+    """
+
+    def __init__(
+        self,
+        runner,
+        max_concurrent_turns: int = DISPATCHER_MAX_CONCURRENT_TURNS,
+        max_pending_turns: int = DISPATCHER_MAX_PENDING_TURNS,
+        max_pending_per_session: int = DISPATCHER_MAX_PENDING_PER_SESSION,
+        flush_sessions: bool = False,
+    ):
+        self.runner = runner
+        self.max_concurrent_turns = max_concurrent_turns
+        self.max_pending_turns = max_pending_turns
+        self.max_pending_per_session = max_pending_per_session
+        self._flush = getattr(runner.session_service, "flush", None) if flush_sessions else None
+        self._slots: Dict[Tuple[str, str], _SessionSlot] = {}
+        self._turn_slots = asyncio.Semaphore(max_concurrent_turns)
+        self._pending = 0
+        self._running = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._accepting = True
+        self.completed = 0
+        self.rejected = 0
+
+    def _reject(self, reason: str) -> DispatcherOverloaded:
+        self.rejected += 1
+        logger.warning("Rejected turn (%s)", reason)
+        return DispatcherOverloaded(reason)
+
+    @contextlib.asynccontextmanager
+    async def _turn_slot(self, user_id: str, session_id: str):
+        """Admits a turn (or rejects it) and holds its session and global slots."""
+        if not self._accepting:
+            raise self._reject("dispatcher is shutting down")
+        if self._pending >= self.max_pending_turns:
+            raise self._reject(f"{self._pending} turns pending")
+        key = (user_id, session_id)
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = self._slots[key] = _SessionSlot()
+        elif slot.pending >= self.max_pending_per_session:
+            raise self._reject(f"{slot.pending} turns pending for session {session_id}")
+
+        slot.pending += 1
+        self._pending += 1
+        self._idle.clear()
+        try:
+            # Take the session's turn first, so a queued turn never holds a global slot
+            async with slot.lock:
+                async with self._turn_slots:
+                    self._running += 1
+                    try:
+                        yield
+                        if self._flush is not None:
+                            await self._flush()
+                    finally:
+                        self._running -= 1
+                        self.completed += 1
+        finally:
+            slot.pending -= 1
+            if slot.pending == 0:
+                del self._slots[key]
+            self._pending -= 1
+            if self._pending == 0:
+                self._idle.set()
+
+    async def submit(self, query: str, user_id: str, session_id: str) -> str:
+        """Runs one turn once a slot is free and returns the agent's final response text.
+
+        Raises:
+            DispatcherOverloaded: If the dispatcher is draining or its queues are full.
+        """
+        async with self._turn_slot(user_id, session_id):
+            return await run_turn(query, self.runner, user_id, session_id)
+
+    async def stream(self, query: str, user_id: str, session_id: str) -> AsyncGenerator[dict, None]:
+        """Like `submit()`, but yields the turn's `stream_turn()` updates as they arrive.
+
+        The slots are held until the stream finishes or is closed. Admission
+        happens when iteration starts, so a rejection is raised from the first
+        `__anext__()`.
+
+        Raises:
+            DispatcherOverloaded: If the dispatcher is draining or its queues are full.
+        """
+        async with self._turn_slot(user_id, session_id):
+            updates = stream_turn(query, self.runner, user_id, session_id)
+            async with contextlib.aclosing(updates):
+                async for update in updates:
+                    yield update
+
+    async def drain(self) -> None:
+        """Stops accepting new turns and waits for the accepted ones to finish."""
+        self._accepting = False
+        await self._idle.wait()
+
+    def stats(self) -> dict:
+        """Returns current load and lifetime counters."""
+        return {
+            "running": self._running,
+            "queued": self._pending - self._running,
+            "sessions": len(self._slots),
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "max_concurrent_turns": self.max_concurrent_turns,
+            "max_pending_turns": self.max_pending_turns,
+            "max_pending_per_session": self.max_pending_per_session,
+        }
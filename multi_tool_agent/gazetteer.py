@@ -0,0 +1,272 @@
+"""Offline city-name canonicalization against a bundled gazetteer.
+
+Maps whatever the user typed ("london", "London, UK", "LONDON ", "Londn",
+"Portland, ME", "paris france") onto one known place, so equivalent spellings
+share a cache entry and a single upstream request, and ambiguous names are
+sent to WeatherAPI as exact coordinates.
+
+Names (and alternate names) live in a character trie built from
+`cities.tsv`, which serves exact lookups, prefix completion and bounded
+Levenshtein search in a single walk. Country names/aliases come from
+`countries.tsv`.
+"""
+import functools
+import logging
+import os
+import re
+import unicodedata
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CITIES_PATH = os.path.join(_DATA_DIR, "cities.tsv")
+DEFAULT_COUNTRIES_PATH = os.path.join(_DATA_DIR, "countries.tsv")
+
+# Abbreviations expanded wherever they appear as a whole word
+_ABBREVIATIONS = {"st": "saint", "ste": "sainte", "ft": "fort", "mt": "mount"}
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+# Shortest name that fuzzy matching is attempted for, and the edit budget by length
+FUZZY_MIN_LENGTH = 4
+# Shortest name a one-edit misspelling is auto-corrected for; other near misses are only
+# suggested, since short names ("Nome", "Kent") are often real places one edit from a listed one
+AUTOCORRECT_MIN_LENGTH = 8
+
+
+def normalize_place(text: str) -> str:
+    """Normalizes a place name: strips accents, case and punctuation, expands abbreviations.
+
+    'São Paulo' -> 'sao paulo', 'St. Louis' -> 'saint louis', "Xi'an" -> 'xian'
+    """
+    decomposed = unicodedata.normalize("NFKD", text)
+    ascii_text = "".join(char for char in decomposed if not unicodedata.combining(char))
+    lowered = ascii_text.casefold().replace("'", "").replace("’", "")
+    words = _NON_ALNUM.sub(" ", lowered).split()
+    return " ".join(_ABBREVIATIONS.get(word, word) for word in words)
+
+
+def max_edit_distance(name: str) -> int:
+    """Typos tolerated for a name of this length (none for very short names)."""
+    if len(name) < FUZZY_MIN_LENGTH:
+        return 0
+    return 1 if len(name) < 8 else 2
+
+
+class Place(NamedTuple):
+    name: str
+    country_code: str
+    country: str
+    admin1: str
+    latitude: float
+    longitude: float
+    population: int
+
+    @property
+    def key(self) -> str:
+        """Canonical identity, e.g. 'portland|us|me' (used as the cache key)."""
+        return f"{normalize_place(self.name)}|{self.country_code.lower()}|{self.admin1.lower()}"
+
+    @property
+    def query(self) -> str:
+        """WeatherAPI `q` for this place: coordinates, so there is nothing left to guess."""
+        return f"{self.latitude:.2f},{self.longitude:.2f}"
+
+    @property
+    def display_name(self) -> str:
+        return f"{self.name}, {self.country}"
+
+
+class Resolution(NamedTuple):
+    """Outcome of resolving a user-typed place name.
+
+    `match` is "exact", "fuzzy" or "unknown". `alternatives` are other places
+    with the same name that lost the tie-break (by population); `suggestions`
+    are near misses offered when nothing matched.
+    """
+    place: Optional[Place]
+    match: str
+    alternatives: Tuple[Place, ...] = ()
+    suggestions: Tuple[Place, ...] = ()
+
+
+class _TrieNode:
+    __slots__ = ("children", "places")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.places: List[int] = []
+
+
+class Gazetteer:
+    """An in-memory index of places by normalized name.
+
+    Args:
+        places (list[Place]): The places to index.
+        alternate_names (dict[int, list[str]]): Extra names per place index.
+        country_aliases (dict[str, str]): Normalized country name/alias -> code.
+    """
+
+    def __init__(self, places: List[Place], alternate_names: Dict[int, List[str]], country_aliases: Dict[str, str]):
+        self.places = places
+        self.country_aliases = country_aliases
+        self._root = _TrieNode()
+        for index, place in enumerate(places):
+            for name in [place.name, *alternate_names.get(index, [])]:
+                self._insert(normalize_place(name), index)
+        self.resolve = functools.lru_cache(maxsize=4096)(self._resolve)
+
+    @classmethod
+    def from_files(cls, cities_path: str = DEFAULT_CITIES_PATH, countries_path: str = DEFAULT_COUNTRIES_PATH) -> "Gazetteer":
+        """Loads the tab-separated city and country tables (lines starting with '#' are comments)."""
+        country_names, country_aliases = {}, {}
+        for fields in _read_tsv(countries_path):
+            code, name = fields[0], fields[1]
+            country_names[code] = name
+            for alias in [code, name, *(fields[2].split("|") if len(fields) > 2 and fields[2] else [])]:
+                country_aliases[normalize_place(alias)] = code
+
+        places, alternate_names = [], {}
+        for fields in _read_tsv(cities_path):
+            name, alternates, code, admin1, latitude, longitude, population = fields
+            if alternates:
+                alternate_names[len(places)] = alternates.split("|")
+            places.append(Place(name, code, country_names.get(code, code), admin1, float(latitude), float(longitude), int(population)))
+        return cls(places, alternate_names, country_aliases)
+
+    # --- Trie --- #
+
+    def _insert(self, key: str, index: int) -> None:
+        node = self._root
+        for char in key:
+            node = node.children.setdefault(char, _TrieNode())
+        if index not in node.places:
+            node.places.append(index)
+
+    def _find(self, key: str) -> List[int]:
+        node = self._root
+        for char in key:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return node.places
+
+    def _walk(self, node: _TrieNode) -> Iterator[int]:
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            yield from node.places
+            stack.extend(node.children.values())
+
+    def _fuzzy(self, key: str, max_distance: int) -> List[Tuple[int, int]]:
+        """Returns `(distance, place index)` for names within `max_distance` edits of `key`.
+
+        Walks the trie carrying one Levenshtein DP row per node and prunes any
+        branch whose row minimum already exceeds the budget.
+        """
+        matches = []
+        first_row = list(range(len(key) + 1))
+        stack = [(child, char, first_row) for char, child in self._root.children.items()]
+        while stack:
+            node, char, previous_row = stack.pop()
+            row = [previous_row[0] + 1]
+            for column in range(1, len(key) + 1):
+                row.append(min(
+                    row[column - 1] + 1, # insertion
+                    previous_row[column] + 1, # deletion
+                    previous_row[column - 1] + (key[column - 1] != char), # substitution
+                ))
+            if row[-1] <= max_distance:
+                matches.extend((row[-1], index) for index in node.places)
+            if min(row) <= max_distance:
+                stack.extend((child, next_char, row) for next_char, child in node.children.items())
+        return matches
+
+    # --- Lookups --- #
+
+    def _by_population(self, indices) -> List[Place]:
+        unique = dict.fromkeys(indices)
+        return sorted((self.places[index] for index in unique), key=lambda place: -place.population)
+
+    def complete(self, prefix: str, limit: int = 10) -> List[Place]:
+        """Places whose name (or alternate name) starts with `prefix`, most populous first."""
+        node = self._root
+        for char in normalize_place(prefix):
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return self._by_population(self._walk(node))[:limit]
+
+    def _qualifier_filter(self, qualifier: str):
+        """Returns a predicate for places matching a country name/alias/code or admin1 code."""
+        country_code = self.country_aliases.get(qualifier)
+        return lambda place: place.country_code == country_code or place.admin1.lower() == qualifier
+
+    def _split(self, text: str) -> Tuple[str, List[str]]:
+        """Splits 'Portland, ME' / 'paris france' into a name and its qualifiers."""
+        parts = [normalize_place(part) for part in text.split(",")]
+        name, qualifiers = parts[0], [part for part in parts[1:] if part]
+        if qualifiers or not name or self._find(name):
+            return name, qualifiers
+        # No comma: peel a trailing country or admin1 code off an otherwise unknown name
+        words = name.split()
+        for size in range(min(3, len(words) - 1), 0, -1):
+            head, tail = " ".join(words[:-size]), " ".join(words[-size:])
+            if self._find(head) and any(map(self._qualifier_filter(tail), self._candidates(head))):
+                return head, [tail]
+        return name, qualifiers
+
+    def _candidates(self, name: str) -> List[Place]:
+        return self._by_population(self._find(name))
+
+    def _resolve(self, text: str) -> Resolution:
+        name, qualifiers = self._split(text)
+        if not name:
+            return Resolution(None, "unknown")
+
+        def narrow(places: List[Place]) -> List[Place]:
+            for qualifier in qualifiers:
+                places = [place for place in places if self._qualifier_filter(qualifier)(place)]
+            return places
+
+        exact = narrow(self._candidates(name))
+        if exact:
+            return Resolution(exact[0], "exact", alternatives=tuple(exact[1:]))
+
+        budget = max_edit_distance(name)
+        if budget and not (qualifiers and self._candidates(name)):
+            closest: Dict[str, Tuple[int, Place]] = {}
+            for distance, index in self._fuzzy(name, budget):
+                place = self.places[index]
+                if place.key not in closest or distance < closest[place.key][0]:
+                    closest[place.key] = (distance, place)
+            ranked = sorted(closest.values(), key=lambda match: (match[0], -match[1].population))
+            ranked = [(distance, place) for distance, place in ranked if narrow([place])]
+            if ranked:
+                best = [place for distance, place in ranked if distance == ranked[0][0]]
+                # Only auto-correct a single edit on a long name, when the closest spelling names one place name
+                if ranked[0][0] == 1 and len(name) >= AUTOCORRECT_MIN_LENGTH and len({normalize_place(place.name) for place in best}) == 1:
+                    return Resolution(best[0], "fuzzy", alternatives=tuple(best[1:]))
+                return Resolution(None, "unknown", suggestions=tuple(place for _, place in ranked[:3]))
+        return Resolution(None, "unknown", suggestions=tuple(self.complete(name, limit=3)))
+
+
+def _read_tsv(path: str) -> Iterator[List[str]]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line and not line.startswith("#"):
+                yield line.split("\t")
+
+
+_gazetteer: Optional[Gazetteer] = None
+
+
+def get_gazetteer() -> Gazetteer:
+    """Returns the process-wide gazetteer, loading the bundled tables on first use."""
+    global _gazetteer
+    if _gazetteer is None:
+        from .config import GAZETTEER_CITIES_PATH
+
+        _gazetteer = Gazetteer.from_files(GAZETTEER_CITIES_PATH, DEFAULT_COUNTRIES_PATH)
+        logger.info("Loaded %d places from %s", len(_gazetteer.places), GAZETTEER_CITIES_PATH)
+    return _gazetteer
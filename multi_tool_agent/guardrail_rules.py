@@ -0,0 +1,220 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+try: # Python 3.11+
+    from re import _constants as _regex_constants, _parser as _regex_parser
+except ImportError:
+    import sre_constants as _regex_constants, sre_parse as _regex_parser
+
+# Shortest literal worth using as a regex prefilter trigger
+MIN_TRIGGER_LENGTH = 3
+
+
+class GuardrailRule(NamedTuple):
+    """A single blocking rule loaded from the rules file."""
+    rule_id: str
+    kind: str # "keyword" (case-insensitive substring) or "regex"
+    pattern: str
+    message: Optional[str] = None
+
+
+class GuardrailMatch(NamedTuple):
+    """The rule that matched and the text it matched."""
+    rule: GuardrailRule
+    matched_text: str
+
+
+class AhoCorasick:
+    """Aho-Corasick automaton for matching many literals in one pass over the text.
+
+    Build cost is linear in the total literal length; search cost is linear in
+    the text length (plus matches), independent of how many literals there are.
+    """
+
+    def __init__(self, literals: Iterable[Tuple[str, int]]):
+        # goto[state] maps a character to the next state; out[state] lists the
+        # (payload, length) of every literal ending at that state, including those
+        # inherited through the failure chain.
+        self._goto: List[dict] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[list] = [[]]
+
+        for literal, payload in literals:
+            if not literal:
+                continue
+            state = 0
+            for char in literal:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = next_state
+            self._out[state].append((payload, len(literal)))
+
+        # Breadth-first pass to compute failure links and merge outputs
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, int]]:
+        """Yields `(payload, start, end)` for every literal occurrence, in order of end position."""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                end = position + 1
+                for payload, length in out[state]:
+                    yield payload, end - length, end
+
+
+def required_literal(pattern: str) -> Optional[str]:
+    """Returns the longest literal run every match of `pattern` must contain, if any.
+
+    Only top-level literals are considered (nothing inside groups, alternations,
+    classes or quantifiers), so the result is always a true prerequisite.
+    """
+    try:
+        parsed = _regex_parser.parse(pattern)
+    except re.error:
+        return None
+    best, run = "", []
+    for op, argument in parsed:
+        if op is _regex_constants.LITERAL:
+            run.append(chr(argument))
+            continue
+        if len(run) > len(best):
+            best = "".join(run)
+        run = []
+    if len(run) > len(best):
+        best = "".join(run)
+    return best if len(best) >= MIN_TRIGGER_LENGTH else None
+
+
+class GuardrailRuleSet:
+    """A compiled set of keyword and regex rules.
+
+    Keywords, plus a required literal "trigger" extracted from each regex, go into
+    a single case-insensitive Aho-Corasick automaton, so one pass over a message
+    finds every candidate rule no matter how many rules there are. A regex is only
+    evaluated when its trigger occurs in the text. Regexes with no extractable
+    literal fall back to one combined alternation.
+    """
+
+    def __init__(self, rules: List[GuardrailRule]):
+        self.rules = rules
+        literals = []
+        fallback_rules = []
+        self._compiled = {}
+        for index, rule in enumerate(rules):
+            if rule.kind == "keyword":
+                literals.append((rule.pattern.casefold(), index))
+                continue
+            self._compiled[index] = re.compile(rule.pattern, re.IGNORECASE)
+            trigger = required_literal(rule.pattern)
+            if trigger is not None:
+                literals.append((trigger.casefold(), index))
+            else:
+                fallback_rules.append(index)
+        self._automaton = AhoCorasick(literals)
+
+        self._fallback_indices = fallback_rules
+        self._fallback_regex = None
+        if fallback_rules:
+            self._fallback_regex = re.compile(
+                "|".join(f"(?P<r{index}>{rules[index].pattern})" for index in fallback_rules),
+                re.IGNORECASE,
+            )
+
+    @classmethod
+    def from_file(cls, path: str) -> "GuardrailRuleSet":
+        """Loads rules from a JSON file of the form `{"rules": [{"id", "type", "pattern", "message"?}]}`."""
+        with open(path, encoding="utf-8") as f:
+            raw_rules = json.load(f)["rules"]
+        rules = []
+        for raw in raw_rules:
+            kind = raw.get("type", "keyword")
+            if kind not in ("keyword", "regex"):
+                raise ValueError(f"Unknown guardrail rule type '{kind}' for rule '{raw.get('id')}'.")
+            if kind == "regex":
+                re.compile(raw["pattern"]) # Fail fast on an invalid pattern, naming the rule
+            rules.append(GuardrailRule(raw.get("id", raw["pattern"]), kind, raw["pattern"], raw.get("message")))
+        return cls(rules)
+
+    def match(self, text: str) -> Optional[GuardrailMatch]:
+        """Returns the first rule matching `text`, or None."""
+        if not text:
+            return None
+        folded = text.casefold()
+        checked = set()
+        for index, start, end in self._automaton.iter_matches(folded):
+            rule = self.rules[index]
+            if rule.kind == "keyword":
+                return GuardrailMatch(rule, folded[start:end])
+            if index not in checked:
+                checked.add(index)
+                regex_match = self._compiled[index].search(text)
+                if regex_match is not None:
+                    return GuardrailMatch(rule, regex_match.group(0))
+        if self._fallback_regex is not None:
+            regex_match = self._fallback_regex.search(text)
+            if regex_match is not None:
+                return GuardrailMatch(self.rules[int(regex_match.lastgroup[1:])], regex_match.group(0))
+        return None
+
+
+class HotReloadingRuleSet:
+    """Serves a `GuardrailRuleSet` from a file, rebuilding it when the file changes.
+
+    The file's mtime is checked at most once every `check_interval_seconds`, so
+    the per-call overhead is a clock read. If a reload fails (bad JSON, invalid
+    regex) the previous rule set stays active.
+    """
+
+    def __init__(self, path: str, check_interval_seconds: float = 5.0):
+        self.path = path
+        self.check_interval_seconds = check_interval_seconds
+        self._lock = threading.Lock()
+        self._mtime = os.stat(path).st_mtime
+        self._rule_set = GuardrailRuleSet.from_file(path)
+        self._next_check = time.monotonic() + check_interval_seconds
+
+    def get(self) -> GuardrailRuleSet:
+        now = time.monotonic()
+        if now >= self._next_check:
+            with self._lock:
+                if now >= self._next_check:
+                    self._next_check = now + self.check_interval_seconds
+                    self._maybe_reload()
+        return self._rule_set
+
+    def _maybe_reload(self) -> None:
+        try:
+            mtime = os.stat(self.path).st_mtime
+            if mtime == self._mtime:
+                return
+            self._rule_set = GuardrailRuleSet.from_file(self.path)
+            self._mtime = mtime
+            logger.info("Reloaded %d guardrail rules from %s", len(self._rule_set.rules), self.path)
+        except (OSError, ValueError, KeyError, re.error) as e:
+            logger.warning("Could not reload guardrail rules from %s: %s. Keeping previous rules.", self.path, e)
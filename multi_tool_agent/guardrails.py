@@ -1,49 +1,71 @@
+import logging
 from typing import Optional
 from google.adk.agents.callback_context import CallbackContext
 from google.adk.models.llm_request import LlmRequest
 from google.adk.models.llm_response import LlmResponse
 from google.genai import types
 
+from .config import GUARDRAIL_RULES_PATH, GUARDRAIL_RELOAD_INTERVAL_SECONDS
+from .guardrail_rules import HotReloadingRuleSet
+from .tracing import traced
+
+logger = logging.getLogger(__name__)
+
+# Compiled once at startup; picks up edits to the rules file without a restart
+guardrail_rules = HotReloadingRuleSet(GUARDRAIL_RULES_PATH, GUARDRAIL_RELOAD_INTERVAL_SECONDS)
+logger.info("Loaded %d guardrail rules from %s", len(guardrail_rules.get().rules), GUARDRAIL_RULES_PATH)
+
+@traced("guardrail")
 def block_keyword_guardrail(
     callback_context: CallbackContext, llm_request: LlmRequest
 ) -> Optional[LlmResponse]:
     """
-    Inspects the latest user message for 'BLOCK'. If found, blocks the LLM call
-    and returns a predefined LlmResponse. Otherwise, returns None to proceed.
+    Inspects the latest user message against the configured guardrail rules
+    (blocked keywords and regexes). If a rule matches, blocks the LLM call and
+    returns a predefined LlmResponse. Otherwise, returns None to proceed.
     """
     agent_name = callback_context.agent_name # Get the name of the agent whose model call is being intercepted
-    print(f"--- Callback: block_keyword_guardrail running for agent: {agent_name} ---")
+    logger.debug("block_keyword_guardrail running for agent: %s", agent_name)
 
     # Extract the text from the latest user message in the request history
     last_user_message_text = ""
     if llm_request.contents:
-        # Find the most recent message with role 'user'
+        # Find the most recent message with role 'user' that carries text
         for content in reversed(llm_request.contents):
             if content.role == 'user' and content.parts:
-                # Assuming text is in the first part for simplicity
-                if content.parts[0].text:
-                    last_user_message_text = content.parts[0].text
+                texts = [part.text for part in content.parts if part.text]
+                if texts:
+                    last_user_message_text = "\n".join(texts) # Cover every text part, not just the first
                     break # Found the last user message text
 
-    print(f"--- Callback: Inspecting last user message: '{last_user_message_text[:100]}...' ---") # Log first 100 chars
+    logger.debug("Inspecting last user message: '%.100s'", last_user_message_text) # Log first 100 chars
 
     # --- Guardrail Logic ---
-    keyword_to_block = "BLOCK"
-    if keyword_to_block in last_user_message_text.upper(): # Case-insensitive check
-        print(f"--- Callback: Found '{keyword_to_block}'. Blocking LLM call! ---")
+    match = guardrail_rules.get().match(last_user_message_text) # Single pass over the text per rule kind
+    if match is not None:
+        rule = match.rule
+        logger.info("Rule '%s' matched '%s'. Blocking LLM call!", rule.rule_id, match.matched_text)
         # Optionally, set a flag in state to record the block event
         callback_context.state["guardrail_block_keyword_triggered"] = True
-        print(f"--- Callback: Set state 'guardrail_block_keyword_triggered': True ---")
+        callback_context.state["guardrail_matched_rule"] = rule.rule_id
+        logger.debug("Set state 'guardrail_block_keyword_triggered': True, 'guardrail_matched_rule': %s", rule.rule_id)
+
+        if rule.message:
+            message = rule.message
+        elif rule.kind == "keyword":
+            message = f"I cannot process this request because it contains the blocked keyword '{rule.pattern}'."
+        else:
+            message = "I cannot process this request because it contains blocked content."
 
         # Construct and return an LlmResponse to stop the flow and send this back instead
         return LlmResponse(
             content=types.Content(
                 role="model", # Mimic a response from the agent's perspective
-                parts=[types.Part(text=f"I cannot process this request because it contains the blocked keyword '{keyword_to_block}'.")],
+                parts=[types.Part(text=message)],
             )
             # Note: You could also set an error_message field here if needed
         )
     else:
-        # Keyword not found, allow the request to proceed to the LLM
-        print(f"--- Callback: Keyword not found. Allowing LLM call for {agent_name}. ---")
+        # No rule matched, allow the request to proceed to the LLM
+        logger.debug("No guardrail rule matched. Allowing LLM call for %s", agent_name)
         return None # Returning None signals ADK to continue normally
@@ -0,0 +1,119 @@
+import logging
+from typing import List, Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from .config import (
+    HISTORY_MAX_TURNS,
+    HISTORY_ELIDE_TOOL_PAYLOADS,
+    HISTORY_SUMMARIZE,
+    HISTORY_SUMMARY_MAX_CHARS,
+)
+from .tracing import traced
+
+logger = logging.getLogger(__name__)
+
+# Tools whose old results are safe to drop: weather data goes stale anyway
+WEATHER_TOOL_NAMES = {"get_weather", "get_weather_async", "get_weather_batch"}
+ELIDED_PAYLOAD_NOTE = "Earlier weather data elided from history; call the tool again for current conditions."
+# ADK relays other agents' messages and tool calls as role 'user' text starting with this
+RELAYED_CONTEXT_PREFIX = "For context:"
+
+
+def _is_user_turn_start(content: types.Content) -> bool:
+    """True for a user message with text.
+
+    Function responses and ADK's relayed sub-agent context ("For context: [greeting_agent] said: ...")
+    also use role 'user', but don't start a turn.
+    """
+    if content.role != "user" or not content.parts or any(part.function_response for part in content.parts):
+        return False
+    texts = [part.text for part in content.parts if part.text]
+    return bool(texts) and not texts[0].lstrip().startswith(RELAYED_CONTEXT_PREFIX)
+
+
+def _elide_tool_payloads(content: types.Content) -> types.Content:
+    """Returns `content` with old weather tool responses replaced by a short stub."""
+    if not content.parts or not any(
+        part.function_response and part.function_response.name in WEATHER_TOOL_NAMES for part in content.parts
+    ):
+        return content
+    parts = []
+    for part in content.parts:
+        response = part.function_response
+        if response and response.name in WEATHER_TOOL_NAMES:
+            status = (response.response or {}).get("status")
+            part = types.Part(
+                function_response=types.FunctionResponse(
+                    id=response.id,
+                    name=response.name,
+                    response={"status": status, "note": ELIDED_PAYLOAD_NOTE},
+                )
+            )
+        parts.append(part)
+    # Build a new Content rather than mutating the one shared with the session's events
+    return types.Content(role=content.role, parts=parts)
+
+
+def _summarize(contents: List[types.Content]) -> str:
+    """Builds a cheap extractive summary of dropped turns (their text parts, truncated)."""
+    lines = []
+    for content in contents:
+        text = " ".join(part.text.strip() for part in content.parts or [] if part.text and not part.thought)
+        if text:
+            speaker = "User" if content.role == "user" else "Assistant"
+            lines.append(f"{speaker}: {text}")
+    summary = "\n".join(lines)
+    if len(summary) > HISTORY_SUMMARY_MAX_CHARS:
+        summary = "..." + summary[-HISTORY_SUMMARY_MAX_CHARS:]
+    return summary
+
+
+@traced("history")
+def compact_history(
+    callback_context: CallbackContext, llm_request: LlmRequest
+) -> Optional[LlmResponse]:
+    """
+    Bounds the conversation history sent to the model, whatever the session length.
+
+    Keeps only the last HISTORY_MAX_TURNS user turns, replaces weather tool
+    payloads from earlier turns with a short stub (they are stale and large),
+    and, if HISTORY_SUMMARIZE is on, adds a short summary of the dropped turns to
+    the system instruction. Always returns None so the LLM call proceeds.
+    """
+    contents = llm_request.contents
+    if not contents:
+        return None
+
+    turn_starts = [index for index, content in enumerate(contents) if _is_user_turn_start(content)]
+    if not turn_starts:
+        return None
+
+    # Anything before the first user message (e.g. a half turn left over from
+    # event retention in the session store) is dropped along with the old turns
+    keep_from = turn_starts[0]
+    if HISTORY_MAX_TURNS > 0 and len(turn_starts) > HISTORY_MAX_TURNS:
+        keep_from = turn_starts[-HISTORY_MAX_TURNS]
+    dropped = contents[:keep_from]
+    if keep_from:
+        contents = contents[keep_from:]
+        turn_starts = [index - keep_from for index in turn_starts if index >= keep_from]
+
+    if HISTORY_ELIDE_TOOL_PAYLOADS:
+        current_turn_start = turn_starts[-1]
+        contents = [
+            _elide_tool_payloads(content) if index < current_turn_start else content
+            for index, content in enumerate(contents)
+        ]
+
+    llm_request.contents = contents
+    if dropped:
+        logger.debug("compact_history dropped %d old contents for agent: %s", len(dropped), callback_context.agent_name)
+        if HISTORY_SUMMARIZE:
+            summary = _summarize(dropped)
+            if summary:
+                llm_request.append_instructions([f"Summary of the earlier conversation:\n{summary}"])
+    return None
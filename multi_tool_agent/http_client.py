@@ -0,0 +1,79 @@
+import asyncio
+from typing import Optional
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from .config import (
+    WEATHER_HTTP_MAX_CONNECTIONS,
+    WEATHER_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    WEATHER_HTTP_KEEPALIVE_EXPIRY_SECONDS,
+    WEATHER_HTTP_CONNECT_TIMEOUT_SECONDS,
+    WEATHER_HTTP_READ_TIMEOUT_SECONDS,
+)
+
+_sync_session: Optional[requests.Session] = None
+_async_client: Optional[httpx.AsyncClient] = None
+_async_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def sync_timeout(read_seconds: float) -> tuple:
+    """`(connect, read)` timeout tuple for `requests`, with a per-request read timeout."""
+    return (WEATHER_HTTP_CONNECT_TIMEOUT_SECONDS, read_seconds)
+
+
+def async_timeout(read_seconds: float) -> httpx.Timeout:
+    """`httpx` timeout with the configured connect timeout and a per-request read/write timeout."""
+    return httpx.Timeout(read_seconds, connect=WEATHER_HTTP_CONNECT_TIMEOUT_SECONDS, pool=WEATHER_HTTP_CONNECT_TIMEOUT_SECONDS)
+
+
+def get_sync_session() -> requests.Session:
+    """Returns the process-wide `requests.Session` with a keep-alive connection pool."""
+    global _sync_session
+    if _sync_session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=WEATHER_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            pool_maxsize=WEATHER_HTTP_MAX_CONNECTIONS,
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        _sync_session = session
+    return _sync_session
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Returns the shared `httpx.AsyncClient` for the running event loop.
+
+    The client keeps a pool of keep-alive connections, so concurrent tool calls
+    on the same loop reuse connections instead of opening a new one per lookup.
+    A fresh client is created if the previous one was bound to another loop.
+    """
+    global _async_client, _async_client_loop
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client.is_closed or _async_client_loop is not loop:
+        _async_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=WEATHER_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=WEATHER_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=WEATHER_HTTP_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+            timeout=httpx.Timeout(
+                connect=WEATHER_HTTP_CONNECT_TIMEOUT_SECONDS,
+                read=WEATHER_HTTP_READ_TIMEOUT_SECONDS,
+                write=WEATHER_HTTP_READ_TIMEOUT_SECONDS,
+                pool=WEATHER_HTTP_CONNECT_TIMEOUT_SECONDS,
+            ),
+        )
+        _async_client_loop = loop
+    return _async_client
+
+
+async def aclose_async_client() -> None:
+    """Closes the shared async client (call once on shutdown)."""
+    global _async_client, _async_client_loop
+    if _async_client is not None:
+        await _async_client.aclose()
+    _async_client = None
+    _async_client_loop = None
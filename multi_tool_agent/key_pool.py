@@ -0,0 +1,277 @@
+"""Spreads WeatherAPI calls over a pool of API keys, each with its own rate limit.
+
+Every key has a token bucket (a sustained rate plus a burst) and an optional
+daily request quota. A call takes a token from the key with the most tokens
+left, so load spreads evenly and total throughput grows with the number of
+keys. Keys that WeatherAPI rejects (401/403) are taken out of the pool.
+
+When no key has a token, callers wait in one FIFO queue shared by threads
+and event loops: only the caller at the head may take the next token, so a
+burst of new calls can't starve the ones already waiting.
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ApiKeyUnavailable(Exception):
+    """Raised when no key can be used: all are disabled or out of quota, or the wait timed out."""
+
+
+class _KeyState:
+    __slots__ = ("key", "tokens", "refilled_at", "day", "used_today", "requests", "disabled")
+
+    def __init__(self, key: str, tokens: float, now: float, day: int):
+        self.key = key
+        self.tokens = tokens
+        self.refilled_at = now
+        self.day = day
+        self.used_today = 0
+        self.requests = 0
+        self.disabled: Optional[str] = None
+
+
+class _Waiter:
+    """A queued caller; `wake()` may be called from any thread."""
+
+    __slots__ = ("_event", "_loop")
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self._loop = loop
+        self._event = asyncio.Event() if loop is not None else threading.Event()
+
+    def wake(self) -> None:
+        if self._loop is None:
+            self._event.set()
+        elif not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._event.set)
+
+    def clear(self) -> None:
+        self._event.clear()
+
+    def wait(self, timeout: float) -> None:
+        self._event.wait(timeout)
+
+    async def wait_async(self, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+def _mask(key: str) -> str:
+    return f"...{key[-4:]}" if len(key) > 8 else "..."
+
+
+class ApiKeyPool:
+    """A thread-safe pool of API keys with per-key token buckets and daily quotas.
+
+    Args:
+        keys (iterable of str): The API keys (duplicates and blanks are dropped).
+        rate_per_second (float): Sustained requests per second allowed per key.
+        burst (float): Token bucket capacity per key.
+        daily_quota (int): Requests per key per UTC day (0 = unlimited).
+        clock (Callable[[], float], optional): Monotonic time source.
+        wall_clock (Callable[[], float], optional): Epoch time source (for the quota day).
+    """
+
+    def __init__(
+        self,
+        keys: Iterable[str],
+        rate_per_second: float = 10.0,
+        burst: float = 20.0,
+        daily_quota: int = 0,
+        clock: Callable[[], float] = time.monotonic,
+        wall_clock: Callable[[], float] = time.time,
+    ):
+        self.rate_per_second = rate_per_second
+        self.burst = max(1.0, burst)
+        self.daily_quota = daily_quota
+        self._clock = clock
+        self._wall_clock = wall_clock
+        now, day = clock(), self._day()
+        self._keys: Dict[str, _KeyState] = {
+            key: _KeyState(key, self.burst, now, day) for key in dict.fromkeys(key.strip() for key in keys) if key
+        }
+        self._lock = threading.Lock()
+        self._waiters: "deque[_Waiter]" = deque()
+        self.waits = 0
+        self.timeouts = 0
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _day(self) -> int:
+        return int(self._wall_clock() // 86400)
+
+    def _grab(self) -> Tuple[Optional[str], float]:
+        """Takes a token (lock held). Returns `(key, 0)`, or `(None, seconds until a token is due)`.
+
+        Raises:
+            ApiKeyUnavailable: If every key is disabled or out of today's quota.
+        """
+        now, day = self._clock(), self._day()
+        best, wait = None, None
+        for state in self._keys.values():
+            if state.disabled:
+                continue
+            if state.day != day:
+                state.day, state.used_today = day, 0
+            if self.daily_quota and state.used_today >= self.daily_quota:
+                continue
+            state.tokens = min(self.burst, state.tokens + (now - state.refilled_at) * self.rate_per_second)
+            state.refilled_at = now
+            if state.tokens >= 1:
+                if best is None or state.tokens > best.tokens:
+                    best = state
+            else:
+                due = (1 - state.tokens) / self.rate_per_second
+                wait = due if wait is None else min(wait, due)
+        if best is not None:
+            best.tokens -= 1
+            best.used_today += 1
+            best.requests += 1
+            return best.key, 0.0
+        if wait is None:
+            raise ApiKeyUnavailable("No WeatherAPI key is usable (all are disabled or out of today's quota).")
+        return None, wait
+
+    def _leave(self, waiter: _Waiter) -> None:
+        """Removes `waiter` from the queue (lock held) and wakes the new head."""
+        was_head = bool(self._waiters) and self._waiters[0] is waiter
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+        if was_head and self._waiters:
+            self._waiters[0].wake()
+
+    def _enqueue(self, waiter: _Waiter) -> Optional[str]:
+        """Takes a token right away if nobody is queued, else queues `waiter` (returns None)."""
+        with self._lock:
+            if not self._waiters:
+                key, _ = self._grab()
+                if key is not None:
+                    return key
+            self._waiters.append(waiter)
+            self.waits += 1
+            return None
+
+    def _poll(self, waiter: _Waiter) -> Tuple[Optional[str], Optional[float]]:
+        """Takes a token if `waiter` is at the head; else returns how long to sleep (None: until woken)."""
+        with self._lock:
+            if self._waiters[0] is not waiter:
+                return None, None
+            try:
+                key, wait = self._grab()
+            except ApiKeyUnavailable:
+                self._leave(waiter)
+                raise
+            if key is None:
+                return None, wait
+            self._leave(waiter)
+            return key, None
+
+    def _timed_out(self, waiter: _Waiter) -> ApiKeyUnavailable:
+        with self._lock:
+            self._leave(waiter)
+        self.timeouts += 1
+        return ApiKeyUnavailable("Timed out waiting for WeatherAPI rate-limit capacity.")
+
+    def acquire(self, timeout: float) -> str:
+        """Returns a key to use for one request, blocking (FIFO) for up to `timeout` seconds.
+
+        Raises:
+            ApiKeyUnavailable: If no key is usable or none frees up in time.
+        """
+        waiter = _Waiter()
+        key = self._enqueue(waiter)
+        deadline = self._clock() + timeout
+        try:
+            while key is None:
+                waiter.clear()
+                key, wait = self._poll(waiter)
+                if key is not None:
+                    break
+                remaining = deadline - self._clock()
+                if remaining <= 0:
+                    raise self._timed_out(waiter)
+                waiter.wait(remaining if wait is None else min(wait, remaining))
+        except BaseException:
+            with self._lock:
+                self._leave(waiter)
+            raise
+        return key
+
+    async def acquire_async(self, timeout: float) -> str:
+        """Async counterpart of `acquire()`; waits without blocking the event loop."""
+        waiter = _Waiter(asyncio.get_running_loop())
+        key = self._enqueue(waiter)
+        deadline = self._clock() + timeout
+        try:
+            while key is None:
+                waiter.clear()
+                key, wait = self._poll(waiter)
+                if key is not None:
+                    break
+                remaining = deadline - self._clock()
+                if remaining <= 0:
+                    raise self._timed_out(waiter)
+                await waiter.wait_async(remaining if wait is None else min(wait, remaining))
+        except BaseException:
+            with self._lock:
+                self._leave(waiter)
+            raise
+        return key
+
+    def release(self, key: str) -> None:
+        """Gives back the token of a key that was acquired but never used for a request."""
+        with self._lock:
+            state = self._keys.get(key)
+            if state is None:
+                return
+            state.tokens = min(self.burst, state.tokens + 1)
+            state.requests -= 1
+            if state.day == self._day() and state.used_today:
+                state.used_today -= 1
+            if self._waiters:
+                self._waiters[0].wake()
+
+    def report(self, key: str, status_code: int) -> bool:
+        """Feeds a response status back; a 401/403 disables the key. Returns True if it was disabled."""
+        if status_code not in (401, 403):
+            return False
+        with self._lock:
+            state = self._keys.get(key)
+            if state is None or state.disabled:
+                return False
+            state.disabled = f"HTTP {status_code}"
+            active = sum(1 for other in self._keys.values() if not other.disabled)
+            if self._waiters:
+                self._waiters[0].wake() # The head may now need to give up
+        logger.warning("Disabled WeatherAPI key %s after HTTP %s (%d key(s) left)", _mask(key), status_code, active)
+        return True
+
+    def has_usable_keys(self) -> bool:
+        with self._lock:
+            return any(not state.disabled for state in self._keys.values())
+
+    def stats(self) -> dict:
+        """Returns per-key usage (keys masked) and the queue counters."""
+        with self._lock:
+            return {
+                "keys": len(self._keys),
+                "active": sum(1 for state in self._keys.values() if not state.disabled),
+                "waiting": len(self._waiters),
+                "waits": self.waits,
+                "timeouts": self.timeouts,
+                "per_key": [
+                    {"key": _mask(state.key), "requests": state.requests, "used_today": state.used_today, "disabled": state.disabled}
+                    for state in self._keys.values()
+                ],
+            }
@@ -0,0 +1,168 @@
+"""Structured, non-blocking logging for the `multi_tool_agent` package.
+
+Modules log through `logging.getLogger(__name__)` with %-style arguments, so a
+disabled level costs one `isEnabledFor` check and no string formatting.
+`configure_logging()` puts a `QueueHandler` on the package logger: callers
+only enqueue the record, and a `QueueListener` thread formats (text or JSON
+Lines), redacts and writes it to stderr, so stdout I/O never blocks a turn.
+
+Levels are set per module (LOG_LEVEL plus LOG_LEVELS overrides), and debug
+records flagged with `extra=SAMPLED` (full API payloads and the like) are only
+kept for a LOG_DEBUG_SAMPLE_RATE fraction of calls. Every record is scrubbed
+of the configured API keys and of `key=` query parameters before it is
+written.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import threading
+from typing import Dict, Iterable, Optional
+
+from .config import LOG_DEBUG_SAMPLE_RATE, LOG_FORMAT, LOG_LEVEL, LOG_LEVELS
+
+PACKAGE_LOGGER = "multi_tool_agent"
+# Pass as `extra=SAMPLED` on bulky debug records so only a sample of them is kept
+SAMPLED = {"sampled": True}
+
+_KEY_PARAMETER = re.compile(r"((?:[?&\s]|^)(?:key|api_key)=)[^&\s'\"]+", re.IGNORECASE)
+# LogRecord attributes that aren't user-supplied `extra` fields
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "sampled"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_configure_lock = threading.Lock()
+
+
+def parse_levels(spec: str) -> Dict[str, int]:
+    """Parses per-module levels ("tools=DEBUG,resilience=WARNING") into `{logger name: level}`.
+
+    Names without a dot are taken relative to the package.
+    """
+    levels = {}
+    for item in spec.split(","):
+        name, _, level = item.partition("=")
+        name, level = name.strip(), level.strip().upper()
+        if not name or not level:
+            continue
+        if "." not in name and name != PACKAGE_LOGGER:
+            name = f"{PACKAGE_LOGGER}.{name}"
+        levels[name] = logging.getLevelName(level) if not level.isdigit() else int(level)
+    return {name: level for name, level in levels.items() if isinstance(level, int)}
+
+
+class Redactor:
+    """Replaces secrets (the configured API keys and `key=` query parameters) in log text."""
+
+    def __init__(self, secrets: Iterable[str]):
+        # Longest first, so a key that contains another is masked whole
+        self._secrets = sorted({secret for secret in secrets if secret and len(secret) >= 4}, key=len, reverse=True)
+
+    def __call__(self, text: str) -> str:
+        for secret in self._secrets:
+            if secret in text:
+                text = text.replace(secret, "***")
+        return _KEY_PARAMETER.sub(r"\1***", text)
+
+
+class DebugSampler(logging.Filter):
+    """Keeps only a `rate` fraction of debug records marked with `extra=SAMPLED`."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or not getattr(record, "sampled", False):
+            return True
+        return self.rate >= 1 or random.random() < self.rate
+
+
+class _RedactingFormatter(logging.Formatter):
+    def __init__(self, redact: Redactor, fmt: Optional[str] = None):
+        super().__init__(fmt)
+        self.redact = redact
+
+    def format(self, record: logging.LogRecord) -> str:
+        return self.redact(super().format(record))
+
+
+class JsonFormatter(_RedactingFormatter):
+    """Formats a record as one JSON object per line; `extra` fields become top-level keys."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for name, value in vars(record).items():
+            if name not in _RECORD_ATTRIBUTES:
+                entry[name] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return self.redact(json.dumps(entry, default=str, ensure_ascii=False))
+
+
+def _secrets() -> list:
+    from .config import GOOGLE_API_KEY, WEATHER_API_KEYS
+
+    return [*WEATHER_API_KEYS, GOOGLE_API_KEY or "", os.environ.get("WEATHER_API_KEY") or ""]
+
+
+def configure_logging(force: bool = False) -> None:
+    """Routes the package's logs through a background queue writer (idempotent).
+
+    Applies LOG_LEVEL / LOG_LEVELS to the package's loggers, and LOG_FORMAT
+    ("text" or "json") and LOG_DEBUG_SAMPLE_RATE to its output.
+    """
+    global _listener
+    with _configure_lock:
+        if _listener is not None and not force:
+            return
+        if _listener is not None:
+            _listener.stop()
+
+        redact = Redactor(_secrets())
+        if LOG_FORMAT == "json":
+            formatter: logging.Formatter = JsonFormatter(redact)
+        else:
+            formatter = _RedactingFormatter(redact, "%(asctime)s %(levelname)s %(name)s: %(message)s")
+        writer = logging.StreamHandler()
+        writer.setFormatter(formatter)
+
+        records: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        # The message is merged with its arguments when queued (they may change once the caller
+        # moves on); formatting, redaction and the write happen on the listener thread
+        handler = logging.handlers.QueueHandler(records)
+        handler.addFilter(DebugSampler(LOG_DEBUG_SAMPLE_RATE))
+
+        package_logger = logging.getLogger(PACKAGE_LOGGER)
+        for existing in [h for h in package_logger.handlers if isinstance(h, logging.handlers.QueueHandler)]:
+            package_logger.removeHandler(existing)
+        package_logger.addHandler(handler)
+        package_logger.propagate = False
+        package_logger.setLevel(logging.getLevelName(LOG_LEVEL.upper()))
+        for name, level in parse_levels(LOG_LEVELS).items():
+            logging.getLogger(name).setLevel(level)
+
+        _listener = logging.handlers.QueueListener(records, writer, respect_handler_level=True)
+        _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Writes out any queued records and stops the background writer."""
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,205 @@
+"""Keeps the most requested cities warm in the weather cache.
+
+`DecayedFrequencySketch` counts lookups per cache key in a count-min sketch
+whose counts decay exponentially (a request from an hour ago counts far less
+than one from a minute ago) and keeps the current top-K keys. Memory is fixed
+no matter how many distinct cities are asked for.
+
+`PrefetchScheduler` is an asyncio task that periodically refreshes the hot
+keys whose cache entries are about to expire, spending at most a fixed number
+of upstream requests per minute, so hot-city lookups keep hitting a warm cache.
+"""
+import asyncio
+import contextlib
+import logging
+import math
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class DecayedFrequencySketch:
+    """A count-min sketch with exponential decay and a top-K table.
+
+    Decay uses forward weighting: each new sample is added with weight
+    `exp(rate * (now - epoch))` instead of shrinking every counter over time;
+    everything is rescaled once the weights grow large.
+
+    Args:
+        width (int): Counters per row (more means fewer collisions).
+        depth (int): Rows, i.e. independent hashes per key.
+        half_life_seconds (float): Time for a sample's weight to halve.
+        top_k (int): How many of the hottest keys are tracked.
+        clock (Callable[[], float], optional): Monotonic time source.
+    """
+
+    _RESCALE_AT = 1e12
+
+    def __init__(self, width: int = 1024, depth: int = 4, half_life_seconds: float = 600.0, top_k: int = 20, clock: Callable[[], float] = time.monotonic):
+        self.width = width
+        self.top_k = top_k
+        self._rows = [[0.0] * width for _ in range(depth)]
+        self._rate = math.log(2) / half_life_seconds
+        self._clock = clock
+        self._epoch = clock()
+        self._top: Dict[Hashable, Tuple[float, Any]] = {} # key -> (scaled estimate, label)
+        self._lock = threading.Lock()
+
+    def _weight(self, now: float) -> float:
+        return math.exp(self._rate * (now - self._epoch))
+
+    def _rescale(self, now: float) -> None:
+        factor = self._weight(now)
+        for row in self._rows:
+            for index in range(self.width):
+                row[index] /= factor
+        self._top = {key: (estimate / factor, label) for key, (estimate, label) in self._top.items()}
+        self._epoch = now
+
+    def _slots(self, key: Hashable) -> List[int]:
+        return [hash((seed, key)) % self.width for seed in range(len(self._rows))]
+
+    def add(self, key: Hashable, label: Any = None) -> None:
+        """Counts one request for `key`; `label` is kept alongside it while it is in the top-K."""
+        now = self._clock()
+        with self._lock:
+            weight = self._weight(now)
+            if weight > self._RESCALE_AT:
+                self._rescale(now)
+                weight = 1.0
+            estimate = math.inf
+            for row, index in zip(self._rows, self._slots(key)):
+                row[index] += weight
+                estimate = min(estimate, row[index])
+
+            if key in self._top or len(self._top) < self.top_k:
+                self._top[key] = (estimate, label)
+                return
+            coldest = min(self._top, key=lambda other: self._top[other][0])
+            if estimate > self._top[coldest][0]:
+                del self._top[coldest]
+                self._top[key] = (estimate, label)
+
+    def estimate(self, key: Hashable) -> float:
+        """Decayed request count for `key` (an overestimate only through hash collisions)."""
+        with self._lock:
+            weight = self._weight(self._clock())
+            return min(row[index] for row, index in zip(self._rows, self._slots(key))) / weight
+
+    def top(self) -> List[Tuple[Hashable, float, Any]]:
+        """Returns `(key, decayed count, label)` for the tracked keys, hottest first."""
+        with self._lock:
+            weight = self._weight(self._clock())
+            ranked = sorted(self._top.items(), key=lambda item: -item[1][0])
+            return [(key, estimate / weight, label) for key, (estimate, label) in ranked]
+
+
+class PrefetchScheduler:
+    """Refreshes hot cache keys shortly before they expire, within a request budget.
+
+    Args:
+        sketch (DecayedFrequencySketch): Where the hot keys come from.
+        time_to_expiry (Callable): `key -> seconds` until the cached entry
+            expires (negative once expired), or None if it isn't cached.
+        refresh (Callable): `async (key, label) -> None` refetching one key
+            (the label recorded with the key is passed back).
+        interval_seconds (float): How often the hot keys are checked.
+        lead_seconds (float): Refresh entries expiring within this many seconds.
+        max_requests_per_minute (float): Upstream request budget (token bucket).
+        min_score (float): Decayed request count a key needs to be prefetched.
+    """
+
+    def __init__(
+        self,
+        sketch: DecayedFrequencySketch,
+        time_to_expiry: Callable[[Hashable], Optional[float]],
+        refresh: Callable[[Hashable, Any], Awaitable[None]],
+        interval_seconds: float = 5.0,
+        lead_seconds: float = 30.0,
+        max_requests_per_minute: float = 30.0,
+        min_score: float = 2.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.sketch = sketch
+        self.time_to_expiry = time_to_expiry
+        self.refresh = refresh
+        self.interval_seconds = interval_seconds
+        self.lead_seconds = lead_seconds
+        self.max_requests_per_minute = max_requests_per_minute
+        self.min_score = min_score
+        self._clock = clock
+        self._tokens = max_requests_per_minute
+        self._refilled_at = clock()
+        self._task: Optional[asyncio.Task] = None
+        self.ticks = 0
+        self.refreshed = 0
+        self.deferred = 0
+
+    def ensure_started(self) -> None:
+        """Starts the scheduler on the running event loop (no-op if it is already running there)."""
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._task.get_loop() is loop:
+            return
+        self._task = loop.create_task(self._run(), name="weather-prefetch")
+        logger.info("Scheduler started (every %gs, budget %g requests/min)", self.interval_seconds, self.max_requests_per_minute)
+
+    async def stop(self) -> None:
+        """Cancels the scheduler task and waits for it to finish."""
+        task, self._task = self._task, None
+        if task is not None and not task.done():
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await self.tick()
+            except Exception:
+                logger.exception("Weather prefetch tick failed")
+
+    def _take_tokens(self, wanted: int) -> int:
+        now = self._clock()
+        self._tokens = min(
+            self.max_requests_per_minute,
+            self._tokens + (now - self._refilled_at) * self.max_requests_per_minute / 60,
+        )
+        self._refilled_at = now
+        granted = min(wanted, int(self._tokens))
+        self._tokens -= granted
+        return granted
+
+    async def tick(self) -> int:
+        """Refreshes the hot keys that are due (within budget); returns how many were refreshed."""
+        self.ticks += 1
+        due = []
+        for key, score, label in self.sketch.top():
+            if score < self.min_score:
+                break
+            expires_in = self.time_to_expiry(key)
+            # Keys that aren't cached (never fetched successfully, or evicted) are left alone
+            if expires_in is not None and expires_in <= self.lead_seconds:
+                due.append((key, label))
+        if not due:
+            return 0
+
+        granted = self._take_tokens(len(due))
+        self.deferred += len(due) - granted
+        if granted:
+            logger.debug("Refreshing %d hot cities (%d deferred by the budget)", granted, len(due) - granted)
+            await asyncio.gather(*(self.refresh(key, label) for key, label in due[:granted]))
+            self.refreshed += granted
+        return granted
+
+    def stats(self) -> dict:
+        """Returns the scheduler counters and the current hot keys."""
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "ticks": self.ticks,
+            "refreshed": self.refreshed,
+            "deferred": self.deferred,
+            "hot": [(key, round(score, 2)) for key, score, _ in self.sketch.top()],
+        }
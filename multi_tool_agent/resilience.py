@@ -0,0 +1,314 @@
+"""Timeouts, retries, hedging and circuit breaking around the WeatherAPI call.
+
+`ResilientCaller` wraps a `send(timeout)` callable that performs one HTTP GET
+and returns its response (anything with a `status_code`):
+
+- Adaptive timeout: each attempt gets a multiple of the recently observed p99
+  latency, bounded by a floor and by the configured read timeout, so a hung
+  upstream costs about a second instead of the full read timeout.
+- Retries: timeouts, connection errors and 429/5xx responses are retried with
+  full-jitter exponential backoff. Only idempotent reads go through here.
+- Hedging (async only): if an attempt is still running after the observed
+  p95, a second identical request is sent and the first good answer wins.
+- Circuit breaker: after consecutive failures the caller fails fast with
+  `CircuitOpenError` for a cool-down period, then lets one probe through.
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Optional, Tuple, Type
+
+logger = logging.getLogger(__name__)
+
+# Statuses that indicate an unhealthy upstream (and are safe to retry for a GET)
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the upstream while the circuit breaker is open."""
+
+
+class AdaptiveTimeout:
+    """Derives per-attempt timeouts and the hedge delay from recent latencies.
+
+    Args:
+        default_seconds (float): Timeout used until enough samples are seen;
+            also the upper bound.
+        min_seconds (float): Lower bound for the adaptive timeout.
+        p99_multiplier (float): Timeout as a multiple of the observed p99.
+        window (int): Number of recent samples the percentiles are taken over.
+        min_samples (int): Samples needed before adapting (and hedging).
+        adaptive (bool): If False, every attempt gets `default_seconds` (the
+            hedge delay is still derived from the samples).
+    """
+
+    def __init__(self, default_seconds: float, min_seconds: float = 1.0, p99_multiplier: float = 3.0, window: int = 200, min_samples: int = 20, adaptive: bool = True):
+        self.default_seconds = default_seconds
+        self.adaptive = adaptive
+        self.min_seconds = min(min_seconds, default_seconds)
+        self.p99_multiplier = p99_multiplier
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def _percentile(self, fraction: float) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def timeout(self) -> float:
+        """Seconds the next attempt may take."""
+        p99 = self._percentile(0.99) if self.adaptive else None
+        if p99 is None:
+            return self.default_seconds
+        return max(self.min_seconds, min(self.default_seconds, p99 * self.p99_multiplier))
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds after which a hedged request is sent (None: not enough data yet)."""
+        return self._percentile(0.95)
+
+
+class CircuitBreaker:
+    """A consecutive-failure circuit breaker (closed -> open -> half-open -> closed).
+
+    Args:
+        failure_threshold (int): Consecutive failures that open the circuit.
+        reset_seconds (float): How long the circuit stays open before a probe.
+        clock (Callable[[], float], optional): Monotonic time source.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._probing or self._clock() - self._opened_at >= self.reset_seconds:
+                return "half_open"
+            return "open"
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now (claims the probe slot when half-open)."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._probing or self._clock() - self._opened_at < self.reset_seconds:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info("Upstream recovered; circuit closed")
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def release_probe(self) -> None:
+        """Gives back a claimed probe slot when the request ended without an upstream outcome."""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or (self._opened_at is None and self._failures >= self.failure_threshold):
+                if self._opened_at is None:
+                    self.opened += 1
+                logger.warning("Circuit open after %d consecutive failures", self._failures)
+                self._opened_at = self._clock()
+                self._probing = False
+
+
+class ResilientCaller:
+    """Runs an idempotent upstream request with adaptive timeouts, retries, hedging and a breaker.
+
+    Args:
+        timeouts (AdaptiveTimeout): Latency tracker providing timeouts and the hedge delay.
+        breaker (CircuitBreaker): Shared breaker for the upstream.
+        retry_exceptions (tuple): Exception types treated as transient failures
+            (e.g. connection errors and timeouts of the HTTP client in use).
+        max_attempts (int): Attempts per call, including the first.
+        backoff_base_seconds (float): Backoff cap before the first retry; doubles per retry.
+        backoff_max_seconds (float): Upper bound for the backoff cap.
+        hedge (bool): Send a hedged request when an async attempt exceeds the observed p95.
+    """
+
+    def __init__(
+        self,
+        timeouts: AdaptiveTimeout,
+        breaker: CircuitBreaker,
+        retry_exceptions: Tuple[Type[BaseException], ...],
+        max_attempts: int = 3,
+        backoff_base_seconds: float = 0.1,
+        backoff_max_seconds: float = 1.0,
+        hedge: bool = True,
+    ):
+        self.timeouts = timeouts
+        self.breaker = breaker
+        self.retry_exceptions = retry_exceptions
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.hedge = hedge
+        self.calls = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.rejected = 0
+
+    def _backoff(self, retry: int) -> float:
+        """Full jitter: uniform between 0 and the capped exponential delay."""
+        return random.uniform(0, min(self.backoff_max_seconds, self.backoff_base_seconds * 2 ** (retry - 1)))
+
+    def _admit(self) -> None:
+        if not self.breaker.allow():
+            self.rejected += 1
+            raise CircuitOpenError("The weather service is temporarily unavailable.")
+
+    def _settle(self, outcome: Any, error: Optional[BaseException], attempt: int) -> bool:
+        """Records an attempt's outcome on the breaker; returns True if it should be retried."""
+        failed = error is not None or outcome.status_code in RETRYABLE_STATUSES
+        if not failed:
+            self.breaker.record_success()
+            return False
+        self.breaker.record_failure()
+        logger.info("Attempt %d/%d failed (%s)", attempt, self.max_attempts, repr(error) if error is not None else f"status {outcome.status_code}")
+        if attempt < self.max_attempts:
+            self.retries += 1
+            return True
+        return False
+
+    def _timed(self, send: Callable[[float], Any], timeout: float) -> Any:
+        start = time.perf_counter()
+        try:
+            response = send(timeout)
+        except self.retry_exceptions:
+            self.timeouts.observe(min(time.perf_counter() - start, timeout))
+            raise
+        self.timeouts.observe(time.perf_counter() - start)
+        return response
+
+    async def _timed_async(self, send: Callable[[float], Awaitable[Any]], timeout: float) -> Any:
+        start = time.perf_counter()
+        try:
+            response = await send(timeout)
+        except self.retry_exceptions:
+            self.timeouts.observe(min(time.perf_counter() - start, timeout))
+            raise
+        self.timeouts.observe(time.perf_counter() - start)
+        return response
+
+    def call(self, send: Callable[[float], Any]) -> Any:
+        """Calls `send(timeout)` until it succeeds or attempts run out.
+
+        Returns the last response (possibly a retryable error status once the
+        attempts are exhausted). Raises the last transient exception, or
+        `CircuitOpenError` if the breaker refuses the first attempt.
+        """
+        self.calls += 1
+        self._admit()
+        for attempt in range(1, self.max_attempts + 1):
+            if attempt > 1:
+                time.sleep(self._backoff(attempt - 1))
+                if not self.breaker.allow():
+                    break # The circuit opened meanwhile: give up with the last failure
+            response, error = None, None
+            try:
+                response = self._timed(send, self.timeouts.timeout())
+            except self.retry_exceptions as e:
+                error = e
+            except BaseException:
+                self.breaker.release_probe() # Never reached the upstream (e.g. no API key was free)
+                raise
+            if not self._settle(response, error, attempt):
+                break
+        if error is not None:
+            raise error
+        return response
+
+    async def call_async(self, send: Callable[[float], Awaitable[Any]]) -> Any:
+        """Async counterpart of `call()`; each attempt may be hedged."""
+        self.calls += 1
+        self._admit()
+        for attempt in range(1, self.max_attempts + 1):
+            if attempt > 1:
+                await asyncio.sleep(self._backoff(attempt - 1))
+                if not self.breaker.allow():
+                    break # The circuit opened meanwhile: give up with the last failure
+            response, error = None, None
+            try:
+                response = await self._hedged_attempt(send, self.timeouts.timeout())
+            except self.retry_exceptions as e:
+                error = e
+            except BaseException:
+                self.breaker.release_probe() # Never reached the upstream (e.g. no API key was free)
+                raise
+            if not self._settle(response, error, attempt):
+                break
+        if error is not None:
+            raise error
+        return response
+
+    async def _hedged_attempt(self, send: Callable[[float], Awaitable[Any]], timeout: float) -> Any:
+        """One attempt; sends a second request if the first is slower than the observed p95."""
+        first = asyncio.ensure_future(self._timed_async(send, timeout))
+        pending = {first}
+        try:
+            hedge_delay = self.timeouts.hedge_delay() if self.hedge else None
+            if hedge_delay is None or hedge_delay >= timeout:
+                return await first
+            done, pending = await asyncio.wait(pending, timeout=hedge_delay)
+            if done:
+                return first.result()
+
+            self.hedges += 1
+            logger.debug("No response after %.0fms (p95); sending a hedged request", hedge_delay * 1000)
+            hedge = asyncio.ensure_future(self._timed_async(send, timeout))
+            pending = {first, hedge}
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = next((task for task in done if task.exception() is None and task.result().status_code not in RETRYABLE_STATUSES), None)
+                if winner is not None:
+                    if winner is hedge:
+                        self.hedge_wins += 1
+                    return winner.result()
+                if not pending:
+                    return done.pop().result() # Both failed: surface one of the failures
+        finally:
+            for task in pending:
+                task.cancel() # The losing request (or all of them, if the caller was cancelled)
+
+    def stats(self) -> dict:
+        """Returns the caller's counters, breaker state and current timeout."""
+        hedge_delay = self.timeouts.hedge_delay()
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "rejected": self.rejected,
+            "circuit_state": self.breaker.state,
+            "circuit_opened": self.breaker.opened,
+            "timeout_seconds": self.timeouts.timeout(),
+            "hedge_delay_seconds": hedge_delay,
+        }
@@ -0,0 +1,227 @@
+"""Final-answer cache: repeats of an answered weather question skip the LLM.
+
+A turn's final answer is cached under the normalized user message and the
+user's temperature unit, together with the weather snapshots it was built
+from: the `last_updated` stamp of each city the weather tools looked up in
+that turn. A later turn with the same message and unit gets the cached
+answer from a before-model callback, which is only valid while every
+snapshot is still the fresh entry in the weather cache. Once WeatherAPI data
+is refreshed with a newer `last_updated`, or the entry expires, the cached
+answer is dropped and the turn goes to the model again.
+
+Only turns that successfully looked up weather are cached; anything else
+(greetings, failed lookups, questions the model answered without data) is
+always sent to the model. The cache is shared by all sessions, so a turn is
+only cached when every city it looked up is named in the message itself:
+follow-ups that lean on the conversation ("And the wind?", "What about
+tomorrow there?") mean different things in different sessions.
+"""
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Set, Tuple
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from .cache import TTLCache
+from .config import RESPONSE_CACHE_ENABLED, RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_TTL_SECONDS
+from .tracing import traced
+
+logger = logging.getLogger(__name__)
+
+_PUNCTUATION = re.compile(r"[^\w\s°']+")
+# Turns whose lookups are still being collected; bounded in case a turn dies before its answer
+_MAX_OPEN_TURNS = 4096
+
+
+def normalize_query(text: str) -> str:
+    """Normalizes a user message for cache lookups ("What's the weather in  London?" -> "what's the weather in london")."""
+    return " ".join(_PUNCTUATION.sub(" ", text.casefold()).split())
+
+
+def _names_all(query: str, cities) -> bool:
+    """True if every city name (the part before any comma) appears as whole words in the normalized query."""
+    padded = f" {query} "
+    for city in cities:
+        name = normalize_query(city.split(",")[0])
+        if not name or f" {name} " not in padded:
+            return False
+    return True
+
+
+class CachedAnswer(NamedTuple):
+    text: str
+    snapshots: Tuple[Tuple[str, str], ...] # (weather cache key, last_updated) the answer was built from
+    last_city_checked: Optional[str]
+
+
+class _TurnLookups:
+    __slots__ = ("snapshots", "cities", "last_city", "cacheable")
+
+    def __init__(self):
+        self.snapshots: Dict[str, str] = {}
+        self.cities: Set[str] = set() # The names the tools were called with
+        self.last_city: Optional[str] = None
+        self.cacheable = True
+
+
+class ResponseCache:
+    """Caches final answers keyed by query and unit, validated against weather snapshots.
+
+    Args:
+        max_entries (int): Answers kept before the least recently used is evicted.
+        ttl_seconds (float): Upper bound on an answer's lifetime, whatever its snapshots.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 900.0):
+        self._answers = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self._turns: "OrderedDict[str, _TurnLookups]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.stores = 0
+
+    # --- Recording a turn's weather lookups --- #
+
+    def note_lookup(
+        self,
+        invocation_id: str,
+        cache_key: str,
+        last_updated: Optional[str],
+        city: str,
+        last_city: Optional[str] = None,
+    ) -> None:
+        """Records that this turn used weather snapshot `last_updated` of `cache_key`, looked up as `city`.
+
+        A lookup without data (`last_updated` None, e.g. an error) makes the turn uncacheable.
+        `last_city` is what the turn leaves in `last_city_checked`, if it sets it.
+        """
+        with self._lock:
+            turn = self._turns.get(invocation_id)
+            if turn is None:
+                turn = self._turns[invocation_id] = _TurnLookups()
+                while len(self._turns) > _MAX_OPEN_TURNS:
+                    self._turns.popitem(last=False)
+            if last_updated is None:
+                turn.cacheable = False
+                return
+            turn.snapshots[cache_key] = last_updated
+            turn.cities.add(city)
+            if last_city is not None:
+                turn.last_city = last_city
+
+    def _pop_turn(self, invocation_id: str) -> Optional[_TurnLookups]:
+        with self._lock:
+            return self._turns.pop(invocation_id, None)
+
+    # --- Lookups --- #
+
+    def get(self, query: str, unit: str, weather_cache: TTLCache) -> Optional[CachedAnswer]:
+        """Returns the cached answer if all of its weather snapshots are still current."""
+        key = (normalize_query(query), unit)
+        answer, _ = self._answers.get(key)
+        if answer is None:
+            self.misses += 1
+            return None
+        for cache_key, last_updated in answer.snapshots:
+            current = weather_cache.fresh_value(cache_key)
+            if current is None or current.get("last_updated") != last_updated:
+                # The data behind this answer was refreshed (or expired) upstream
+                self._answers.invalidate(key)
+                self.invalidations += 1
+                self.misses += 1
+                return None
+        self.hits += 1
+        return answer
+
+    def store(self, invocation_id: str, query: str, unit: str, text: str) -> bool:
+        """Caches `text` as the answer to `query` if the turn looked up weather successfully.
+
+        Answers that depend on the conversation (a city looked up but not named in `query`) aren't cached.
+        """
+        turn = self._pop_turn(invocation_id)
+        if turn is None or not turn.cacheable or not turn.snapshots or not text.strip():
+            return False
+        normalized = normalize_query(query)
+        if not _names_all(normalized, turn.cities):
+            return False
+        answer = CachedAnswer(text, tuple(sorted(turn.snapshots.items())), turn.last_city)
+        self._answers.set((normalized, unit), answer)
+        self.stores += 1
+        return True
+
+    def discard_turn(self, invocation_id: str) -> None:
+        self._pop_turn(invocation_id)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._answers),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "stores": self.stores,
+        }
+
+
+response_cache = ResponseCache(max_entries=RESPONSE_CACHE_MAX_ENTRIES, ttl_seconds=RESPONSE_CACHE_TTL_SECONDS)
+
+
+def _user_text(content: Optional[types.Content]) -> str:
+    if content is None or not content.parts:
+        return ""
+    return " ".join(part.text for part in content.parts if part.text).strip()
+
+
+def _unit(callback_context: CallbackContext) -> str:
+    return callback_context.state.get("user_preference_temperature_unit", "Celsius")
+
+
+@traced("response_cache")
+def serve_cached_response(callback_context: CallbackContext, llm_request: LlmRequest) -> Optional[LlmResponse]:
+    """
+    Answers a repeated weather question from the response cache instead of calling the LLM.
+
+    Only runs at the start of a turn (the latest content is the user's own
+    text). On a hit it restores `last_city_checked` as the weather tool would
+    have; `last_weather_report` is set from the answer through the agent's
+    `output_key`.
+    """
+    if not RESPONSE_CACHE_ENABLED or not llm_request.contents:
+        return None
+    latest = llm_request.contents[-1]
+    if latest.role != "user" or not latest.parts or any(part.function_response for part in latest.parts):
+        return None
+    query = _user_text(latest)
+    if not query:
+        return None
+
+    from .tools import weather_cache
+
+    answer = response_cache.get(query, _unit(callback_context), weather_cache)
+    if answer is None:
+        return None
+    logger.debug("serve_cached_response answering from the response cache for agent: %s", callback_context.agent_name)
+    response_cache.discard_turn(callback_context.invocation_id)
+    if answer.last_city_checked is not None:
+        callback_context.state["last_city_checked"] = answer.last_city_checked
+    return LlmResponse(content=types.Content(role="model", parts=[types.Part(text=answer.text)]))
+
+
+def store_final_response(callback_context: CallbackContext, llm_response: LlmResponse) -> Optional[LlmResponse]:
+    """After-model callback: caches the turn's final answer if it was built from weather lookups."""
+    if not RESPONSE_CACHE_ENABLED or llm_response.partial or llm_response.content is None or not llm_response.content.parts:
+        return None
+    if any(part.function_call for part in llm_response.content.parts):
+        return None # Mid-turn: the model is calling a tool
+    text = _user_text(llm_response.content)
+    query = _user_text(callback_context.user_content)
+    if query and response_cache.store(callback_context.invocation_id, query, _unit(callback_context), text):
+        logger.debug("store_final_response cached the answer for agent: %s", callback_context.agent_name)
+    return None
@@ -0,0 +1,222 @@
+import json
+import logging
+import math
+import re
+from collections import Counter
+from typing import Iterable, Optional, Tuple
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from .config import (
+    FAST_PATH_ROUTER_ENABLED,
+    FAST_PATH_MODEL_PATH,
+    FAST_PATH_MIN_CONFIDENCE,
+    FAST_PATH_MAX_MESSAGE_CHARS,
+)
+from .tools import say_hello, say_goodbye
+from .tracing import traced
+
+logger = logging.getLogger(__name__)
+
+# Per-invocation stash of the `last_weather_report` a fast-path reply displaces (temp: keys aren't persisted)
+_DISPLACED_REPORT_KEY = "temp:fast_path_displaced_report"
+
+# --- Compiled Intent Patterns --- #
+# Only whole-message matches count, so "hello, what's the weather in Paris?" is
+# still routed to the LLM.
+GREETING_PATTERN = re.compile(
+    r"^\s*(?:hi|hello|hey|hiya|howdy|greetings|yo|good\s+(?:morning|afternoon|evening))"
+    r"(?:[\s,!.]+(?:there|again|all|everyone|friend|agent|bot))?"
+    r"(?:[\s,!.]+(?:i'?m|i\s+am|my\s+name\s+is|this\s+is)\s+(?P<name>[a-z][\w'-]{0,30}))?"
+    r"[\s!.,:)]*$",
+    re.IGNORECASE,
+)
+FAREWELL_PATTERN = re.compile(
+    r"^\s*(?:(?:ok(?:ay)?|thanks|thank\s+you)[\s,!.]+){0,2}"
+    r"(?:bye|bye[\s-]bye|goodbye|good\s+bye|farewell|cya|see\s+(?:you|ya)(?:\s+(?:later|soon|tomorrow))?"
+    r"|later|take\s+care|good\s*night|that'?s\s+all)"
+    r"(?:\s+for\s+now)?(?:[\s,!.]+(?:and\s+)?(?:thanks|thank\s+you))?[\s!.,:)]*$",
+    re.IGNORECASE,
+)
+_TOKEN_PATTERN = re.compile(r"[a-z']+")
+# Words that follow "I'm" / "this is" but describe a state rather than name someone
+_NOT_NAMES = frozenset({
+    "afraid", "angry", "annoyed", "back", "bored", "busy", "cold", "confused", "curious", "done", "excited",
+    "fine", "free", "going", "good", "great", "happy", "here", "hot", "hungry", "just", "leaving", "looking",
+    "lost", "new", "not", "off", "ok", "okay", "planning", "ready", "sad", "sick", "sorry", "still", "stuck",
+    "sure", "tired", "trying", "urgent", "wondering", "worried",
+})
+
+
+def tokenize(text: str) -> list:
+    """Lowercases `text` and splits it into word tokens."""
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+class IntentModel:
+    """A tiny multinomial naive Bayes intent model stored as JSON.
+
+    The file holds, per class, a log prior, per-token log likelihoods and a
+    log likelihood for unseen tokens. Build one with `train_intent_model`.
+    """
+
+    def __init__(self, classes: dict):
+        self.classes = classes
+
+    @classmethod
+    def load(cls, path: str) -> "IntentModel":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f)["classes"])
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """Returns `(intent, probability)` for the most likely class."""
+        tokens = tokenize(text)
+        scores = {}
+        for intent, params in self.classes.items():
+            token_logp = params["token_logp"]
+            unknown_logp = params["unknown_logp"]
+            scores[intent] = params["prior_logp"] + sum(token_logp.get(token, unknown_logp) for token in tokens)
+        best_score = max(scores.values())
+        total = sum(math.exp(score - best_score) for score in scores.values())
+        intent = max(scores, key=scores.get)
+        return intent, 1.0 / total
+
+
+def train_intent_model(examples: Iterable[Tuple[str, str]], path: str, smoothing: float = 1.0) -> IntentModel:
+    """Trains an `IntentModel` from `(text, intent)` pairs and writes it to `path`.
+
+    Include an "other" intent with ordinary weather questions so the model
+    learns when *not* to take the fast path.
+    """
+    token_counts = {}
+    doc_counts = Counter()
+    vocabulary = set()
+    for text, intent in examples:
+        tokens = tokenize(text)
+        doc_counts[intent] += 1
+        token_counts.setdefault(intent, Counter()).update(tokens)
+        vocabulary.update(tokens)
+
+    total_docs = sum(doc_counts.values())
+    vocab_size = len(vocabulary) + 1 # +1 for unseen tokens
+    classes = {}
+    for intent, counts in token_counts.items():
+        denominator = sum(counts.values()) + smoothing * vocab_size
+        classes[intent] = {
+            "prior_logp": math.log(doc_counts[intent] / total_docs),
+            "token_logp": {token: math.log((count + smoothing) / denominator) for token, count in counts.items()},
+            "unknown_logp": math.log(smoothing / denominator),
+        }
+
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"classes": classes}, f)
+    return IntentModel(classes)
+
+
+_intent_model: Optional[IntentModel] = None
+if FAST_PATH_MODEL_PATH:
+    try:
+        _intent_model = IntentModel.load(FAST_PATH_MODEL_PATH)
+        logger.info("Loaded intent model from %s", FAST_PATH_MODEL_PATH)
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning("Could not load intent model from %s: %s. Using patterns only.", FAST_PATH_MODEL_PATH, e)
+
+
+def _looks_like_name(word: str) -> bool:
+    """True for a capitalized word that isn't a common adjective or state ("Alice", not "confused" or "Lost")."""
+    return word[:1].isupper() and word.casefold() not in _NOT_NAMES
+
+
+def classify_intent(text: str) -> Tuple[Optional[str], float, Optional[str]]:
+    """Classifies a message as 'greeting', 'farewell' or neither.
+
+    Returns:
+        tuple: `(intent, confidence, name)`. `intent` is None when the message
+        isn't a trivial greeting/farewell; `name` is the name the user gave, if any.
+    """
+    if len(text) > FAST_PATH_MAX_MESSAGE_CHARS:
+        return None, 0.0, None
+
+    match = GREETING_PATTERN.match(text)
+    if match:
+        name = match.group("name")
+        if name is not None and not _looks_like_name(name):
+            # "Hi, I am confused" / "hello, this is urgent": not a plain greeting, let the LLM answer
+            return None, 0.0, None
+        return "greeting", 1.0, name
+    if FAREWELL_PATTERN.match(text):
+        return "farewell", 1.0, None
+
+    if _intent_model is not None:
+        intent, confidence = _intent_model.predict(text)
+        if intent in ("greeting", "farewell"):
+            return intent, confidence, None
+    return None, 0.0, None
+
+
+@traced("router")
+def fast_path_router(
+    callback_context: CallbackContext, llm_request: LlmRequest
+) -> Optional[LlmResponse]:
+    """
+    Answers plain greetings and farewells locally instead of calling the LLM.
+
+    Runs after the keyword guardrail. When the latest user message confidently
+    classifies as a greeting or farewell, returns the same text `say_hello` /
+    `say_goodbye` would produce, skipping both the root agent's delegation call
+    and the sub-agent's call. Anything else returns None and proceeds to the LLM.
+
+    `fast_path_intent` in state records the intent of the current turn (None
+    when it went to the LLM). The root agent's `output_key` would also save the
+    greeting as `last_weather_report`; the previous report is stashed here and
+    put back by `restore_weather_report`.
+    """
+    if not FAST_PATH_ROUTER_ENABLED or not llm_request.contents:
+        return None
+
+    # Only route at the start of a turn: the latest content must be the user's own text
+    # (not a function response coming back mid-turn).
+    latest = llm_request.contents[-1]
+    if latest.role != "user" or not latest.parts or any(part.function_response for part in latest.parts):
+        return None
+    text = " ".join(part.text for part in latest.parts if part.text).strip()
+    if not text:
+        return None
+
+    intent, confidence, name = classify_intent(text)
+    if intent is None or confidence < FAST_PATH_MIN_CONFIDENCE:
+        if callback_context.state.get("fast_path_intent") is not None:
+            callback_context.state["fast_path_intent"] = None # Left over from an earlier turn
+        return None
+
+    logger.debug("fast_path_router answering '%s' locally (confidence %.2f) for agent: %s", intent, confidence, callback_context.agent_name)
+    callback_context.state["fast_path_intent"] = intent
+    callback_context.state[_DISPLACED_REPORT_KEY] = {
+        "invocation_id": callback_context.invocation_id,
+        "report": callback_context.state.get("last_weather_report"),
+    }
+    if intent == "greeting":
+        reply = say_hello(name) if name else say_hello()
+    else:
+        reply = say_goodbye()
+    return LlmResponse(
+        content=types.Content(
+            role="model",
+            parts=[types.Part(text=reply)],
+        )
+    )
+
+
+def restore_weather_report(callback_context: CallbackContext) -> Optional[types.Content]:
+    """
+    After-agent callback: undoes the `output_key` overwrite of `last_weather_report`
+    when this turn was answered by `fast_path_router`, so a greeting or farewell
+    never replaces the last weather report.
+    """
+    displaced = callback_context.state.get(_DISPLACED_REPORT_KEY)
+    if displaced and displaced["invocation_id"] == callback_context.invocation_id:
+        callback_context.state["last_weather_report"] = displaced["report"]
+    return None
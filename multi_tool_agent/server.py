@@ -0,0 +1,222 @@
+"""HTTP server for the weather agent (FastAPI + uvicorn).
+
+Endpoints:
+    POST /v1/turn         {"user_id", "session_id", "message"} -> {"response", ...}
+    POST /v1/turn/stream  same body; Server-Sent Events with the `stream_turn()` updates
+    GET  /healthz         liveness
+    GET  /readyz          readiness (503 until the Runner is built and while draining)
+    GET  /metrics         dispatcher, WeatherAPI resilience, key pool and cache gauges and, with TRACING_ENABLED, phase latencies
+
+Each worker process runs one Runner behind a `TurnDispatcher`; a full
+dispatcher answers 503 with `Retry-After`. With several workers, sessions are
+shared through the session backend, so use SESSION_BACKEND=sqlite (a session's
+turns are only serialized within one worker, so clients should send them one
+at a time). On shutdown, workers stop taking turns, let in-flight turns finish
+(up to SERVER_DRAIN_TIMEOUT_SECONDS) and flush the session store.
+
+Usage:
+    python -m multi_tool_agent.server --workers 4
+    python -m multi_tool_agent.server --stub-backends   # offline: ScriptedLlm + StubWeatherServer
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import sys
+
+# Config and the agent modules are imported inside functions: `--stub-backends`
+# has to point WEATHER_API_BASE_URL at the stub before config is first read.
+
+
+class _ServerState:
+    """Per-worker state shared by the request handlers."""
+
+    def __init__(self):
+        self.runner = None
+        self.dispatcher = None
+        self.draining = False
+
+
+def _build_runner():
+    from .config import APP_NAME, SERVER_STUB_BACKENDS
+    from .agent import get_runner
+
+    if not SERVER_STUB_BACKENDS:
+        return get_runner()
+
+    from google.adk.runners import Runner
+    from .agents import create_root_agent
+    from .session_service import get_session_service
+    from .testing import ScriptedLlm
+
+    print("--- Server: Using the offline ScriptedLlm model ---")
+    return Runner(
+        agent=create_root_agent(model=ScriptedLlm()),
+        app_name=APP_NAME,
+        session_service=get_session_service(),
+        auto_create_session=True,
+    )
+
+
+def _sse(update: dict) -> str:
+    return f"event: {update['type']}\ndata: {json.dumps(update)}\n\n"
+
+
+def create_app():
+    """Builds the FastAPI app (uvicorn factory: `multi_tool_agent.server:create_app`)."""
+    from fastapi import FastAPI
+    from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+    from pydantic import BaseModel, Field
+
+    from .config import SERVER_DRAIN_TIMEOUT_SECONDS, TRACING_ENABLED, TRACING_EXPORT_PATH
+    from .dispatcher import DispatcherOverloaded, TurnDispatcher
+    from .http_client import aclose_async_client
+    from .tracing import render_prometheus, setup_tracing
+
+    class TurnRequest(BaseModel):
+        user_id: str = Field(min_length=1, max_length=128)
+        session_id: str = Field(min_length=1, max_length=128)
+        message: str = Field(min_length=1, max_length=4000)
+
+    state = _ServerState()
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        if TRACING_ENABLED:
+            setup_tracing(TRACING_EXPORT_PATH)
+        state.runner = _build_runner()
+        if state.runner is None:
+            raise RuntimeError("Runner could not be initialized; see the log above.")
+        # Flushing after each turn lets the next turn land on any worker
+        state.dispatcher = TurnDispatcher(state.runner, flush_sessions=True)
+        print(f"✅ Server worker {os.getpid()} ready.")
+        yield
+
+        # Graceful drain: refuse new turns, finish the accepted ones, flush sessions
+        state.draining = True
+        try:
+            await asyncio.wait_for(state.dispatcher.drain(), SERVER_DRAIN_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            print(f"❌ Server worker {os.getpid()}: turns still running after {SERVER_DRAIN_TIMEOUT_SECONDS}s drain timeout.")
+        from .tools import prefetcher
+
+        await prefetcher.stop()
+        session_service = state.runner.session_service
+        if hasattr(session_service, "flush"):
+            await session_service.flush()
+        await aclose_async_client()
+        print(f"--- Server: Worker {os.getpid()} drained ({state.dispatcher.stats()['completed']} turns served) ---")
+
+    app = FastAPI(title="Weather Agent", lifespan=lifespan)
+
+    def _overloaded(error: Exception) -> JSONResponse:
+        return JSONResponse({"error": "overloaded", "detail": str(error)}, status_code=503, headers={"Retry-After": "1"})
+
+    @app.post("/v1/turn")
+    async def turn(request: TurnRequest):
+        try:
+            response = await state.dispatcher.submit(request.message, request.user_id, request.session_id)
+        except DispatcherOverloaded as e:
+            return _overloaded(e)
+        return {"user_id": request.user_id, "session_id": request.session_id, "response": response}
+
+    @app.post("/v1/turn/stream")
+    async def turn_stream(request: TurnRequest):
+        updates = state.dispatcher.stream(request.message, request.user_id, request.session_id)
+        try:
+            # Admission happens on the first update, so overload can still be a plain 503
+            first = await updates.__anext__()
+        except DispatcherOverloaded as e:
+            return _overloaded(e)
+
+        async def body():
+            async with contextlib.aclosing(updates):
+                yield _sse(first)
+                async for update in updates:
+                    yield _sse(update)
+
+        return StreamingResponse(body(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+    @app.get("/healthz")
+    async def healthz():
+        return {"status": "ok"}
+
+    @app.get("/readyz")
+    async def readyz():
+        if state.dispatcher is None or state.draining:
+            return JSONResponse({"status": "draining" if state.draining else "starting"}, status_code=503)
+        return {"status": "ready", "dispatcher": state.dispatcher.stats()}
+
+    @app.get("/metrics")
+    async def metrics():
+        lines = []
+        if state.dispatcher is not None:
+            for name, value in state.dispatcher.stats().items():
+                lines.append(f"weather_agent_dispatcher_{name} {value}")
+        from .response_cache import response_cache
+        from .tools import prefetcher, weather_key_pool, weather_upstream_async
+
+        upstream = weather_upstream_async.stats()
+        upstream["circuit_open"] = int(upstream.pop("circuit_state") != "closed")
+        for name, value in upstream.items():
+            if value is not None:
+                lines.append(f"weather_agent_upstream_{name} {value}")
+        keys = weather_key_pool.stats()
+        for name in ("keys", "active", "waiting", "waits", "timeouts"):
+            lines.append(f"weather_agent_key_pool_{name} {keys[name]}")
+        for name, value in response_cache.stats().items():
+            lines.append(f"weather_agent_response_cache_{name} {value}")
+        prefetch = prefetcher.stats()
+        for name in ("ticks", "refreshed", "deferred"):
+            lines.append(f"weather_agent_prefetch_{name} {prefetch[name]}")
+        return PlainTextResponse("\n".join(lines) + "\n" + render_prometheus())
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve the weather agent over HTTP.")
+    parser.add_argument("--host", help="bind address (default: SERVER_HOST)")
+    parser.add_argument("--port", type=int, help="bind port (default: SERVER_PORT)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: SERVER_WORKERS)")
+    parser.add_argument("--stub-backends", action="store_true", help="serve offline against ScriptedLlm and a local StubWeatherServer")
+    parser.add_argument("--stub-weather-latency-ms", type=float, default=20.0, help="StubWeatherServer latency")
+    args = parser.parse_args()
+
+    stub = None
+    if args.stub_backends:
+        from .testing import StubWeatherServer
+
+        # Started once here; the workers inherit its URL through the environment
+        stub = StubWeatherServer(latency_seconds=args.stub_weather_latency_ms / 1000).start()
+        os.environ["SERVER_STUB_BACKENDS"] = "true"
+        os.environ["WEATHER_API_BASE_URL"] = stub.base_url
+        os.environ.setdefault("WEATHER_API_KEY", "stub")
+        os.environ.setdefault("GOOGLE_API_KEY", "stub") # never used: the model is local
+        print(f"--- Server: Stub WeatherAPI listening on {stub.base_url} ---")
+
+    from .config import SERVER_HOST, SERVER_PORT, SERVER_WORKERS, SERVER_DRAIN_TIMEOUT_SECONDS, SESSION_BACKEND
+
+    workers = args.workers or SERVER_WORKERS
+    if workers > 1 and SESSION_BACKEND == "memory":
+        sys.exit("❌ Several workers need a shared session backend; set SESSION_BACKEND=sqlite or use --workers 1.")
+
+    import uvicorn
+
+    try:
+        uvicorn.run(
+            "multi_tool_agent.server:create_app",
+            factory=True,
+            host=args.host or SERVER_HOST,
+            port=args.port or SERVER_PORT,
+            workers=workers,
+            timeout_graceful_shutdown=int(SERVER_DRAIN_TIMEOUT_SECONDS),
+        )
+    finally:
+        if stub is not None:
+            stub.stop()
+
+
+if __name__ == "__main__":
+    main()
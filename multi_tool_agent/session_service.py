@@ -1,19 +1,69 @@
-from google.adk.sessions import InMemorySessionService
 # Import constants from config
 from .config import (
     APP_NAME,
     USER_ID_STATEFUL,
     SESSION_ID_STATEFUL,
-    initial_state
+    initial_state,
+    SESSION_BACKEND,
+    SESSION_DB_PATH,
+    SESSION_TTL_SECONDS,
+    SESSION_FLUSH_INTERVAL_SECONDS,
+    SESSION_FLUSH_MAX_EVENTS,
+    SESSION_MAX_EVENTS,
 )
-# Create the stateful session service instance
-session_service_stateful = InMemorySessionService()
-
-# Initialize the specific stateful session (optional, can be done on first use)
-session_stateful = session_service_stateful.create_session(
-    app_name=APP_NAME,
-    user_id=USER_ID_STATEFUL,
-    session_id=SESSION_ID_STATEFUL,
-    state=initial_state
-)
-print(f"Stateful Session created/initialized: App='{APP_NAME}', User='{USER_ID_STATEFUL}', Session='{SESSION_ID_STATEFUL}'")
+
+_session_service = None
+
+
+def create_session_service():
+    """Builds the session service selected by SESSION_BACKEND."""
+    if SESSION_BACKEND == "sqlite":
+        from .sqlite_session_service import SqliteSessionService
+
+        # Persistent sessions: survive restarts and can be shared by several worker processes
+        return SqliteSessionService(
+            SESSION_DB_PATH,
+            ttl_seconds=SESSION_TTL_SECONDS,
+            flush_interval_seconds=SESSION_FLUSH_INTERVAL_SECONDS,
+            flush_max_events=SESSION_FLUSH_MAX_EVENTS,
+            max_events_per_session=SESSION_MAX_EVENTS,
+        )
+
+    from google.adk.sessions import InMemorySessionService
+    return InMemorySessionService()
+
+
+def get_session_service():
+    """Returns the process-wide session service, creating it on first use."""
+    global _session_service
+    if _session_service is None:
+        _session_service = create_session_service()
+        print(f"Session service created ({SESSION_BACKEND}) for App='{APP_NAME}'")
+    return _session_service
+
+
+async def ensure_session(
+    session_service=None,
+    user_id: str = USER_ID_STATEFUL,
+    session_id: str = SESSION_ID_STATEFUL,
+    state: dict = initial_state,
+):
+    """Returns the given session, creating it with `state` if it doesn't exist yet."""
+    session_service = session_service or get_session_service()
+    session = await session_service.get_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+    if session is None:
+        session = await session_service.create_session(
+            app_name=APP_NAME,
+            user_id=user_id,
+            session_id=session_id,
+            state=dict(state),
+        )
+        print(f"Stateful Session created/initialized: App='{APP_NAME}', User='{user_id}', Session='{session_id}'")
+    return session
+
+
+def __getattr__(name: str):
+    # Backwards-compatible module attribute, resolved lazily
+    if name == "session_service_stateful":
+        return get_session_service()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
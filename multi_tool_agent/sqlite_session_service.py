@@ -0,0 +1,480 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional, Tuple
+
+from google.adk.errors.already_exists_error import AlreadyExistsError
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, Session
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+from google.adk.sessions.state import State
+
+from .tracing import traced
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    create_time REAL NOT NULL,
+    update_time REAL NOT NULL,
+    PRIMARY KEY (app_name, user_id, id)
+);
+CREATE INDEX IF NOT EXISTS sessions_by_update_time ON sessions (update_time);
+CREATE TABLE IF NOT EXISTS events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_by_session ON events (app_name, user_id, session_id, seq);
+CREATE TABLE IF NOT EXISTS app_states (
+    app_name TEXT PRIMARY KEY,
+    state TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS user_states (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    PRIMARY KEY (app_name, user_id)
+);
+"""
+
+
+def _split_state_delta(delta: Dict[str, Any]) -> Tuple[dict, dict, dict]:
+    """Splits a state delta into (app, user, session) scopes, dropping temp keys."""
+    app_delta, user_delta, session_delta = {}, {}, {}
+    for key, value in delta.items():
+        if key.startswith(State.APP_PREFIX):
+            app_delta[key[len(State.APP_PREFIX):]] = value
+        elif key.startswith(State.USER_PREFIX):
+            user_delta[key[len(State.USER_PREFIX):]] = value
+        elif not key.startswith(State.TEMP_PREFIX):
+            session_delta[key] = value
+    return app_delta, user_delta, session_delta
+
+
+class SqliteSessionService(BaseSessionService):
+    """A `BaseSessionService` persisted to a local SQLite database in WAL mode.
+
+    Drop-in replacement for `InMemorySessionService` that survives restarts and
+    can be shared by several worker processes on the same machine:
+
+    * Events are appended as individual rows; a session is never rewritten whole.
+    * Appends are buffered briefly (write-behind) and flushed in one
+      `BEGIN IMMEDIATE` transaction, with the state deltas of all buffered
+      events coalesced into a single read-merge-write per state row. Any read
+      from this process flushes first, so it always sees its own writes.
+    * Sessions idle for longer than `ttl_seconds` expire and are purged, and
+      each session keeps at most `max_events_per_session` events.
+
+    Args:
+        db_path (str): Path of the SQLite database file.
+        ttl_seconds (float, optional): Idle time after which a session expires.
+            None or 0 keeps sessions forever.
+        flush_interval_seconds (float): How long appended events may wait in
+            the write buffer. 0 writes every event through immediately.
+        flush_max_events (int): Flush as soon as this many events are buffered.
+        max_events_per_session (int, optional): Keep only this many of the most
+            recent events per session; older ones are deleted on flush.
+        busy_timeout_ms (int): How long to wait for another process's write lock.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        ttl_seconds: Optional[float] = None,
+        flush_interval_seconds: float = 0.05,
+        flush_max_events: int = 32,
+        max_events_per_session: Optional[int] = None,
+        busy_timeout_ms: int = 5000,
+    ):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds or None
+        self.flush_interval_seconds = flush_interval_seconds
+        self.flush_max_events = flush_max_events
+        self.max_events_per_session = max_events_per_session or None
+
+        self._db_lock = threading.Lock() # Serializes use of the connection (and buffer flushes)
+        self._buffer_lock = threading.Lock() # Guards the write buffer below
+        self._conn = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+        self._conn.executescript(_SCHEMA)
+
+        self._reset_buffer()
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_tasks = set()
+        self._next_purge = 0.0
+
+    # --- Write buffer --- #
+
+    def _reset_buffer(self) -> None:
+        self._pending_events = [] # (app_name, user_id, session_id, timestamp, event_json)
+        self._pending_session_deltas: Dict[Tuple[str, str, str], dict] = {}
+        self._pending_user_deltas: Dict[Tuple[str, str], dict] = {}
+        self._pending_app_deltas: Dict[str, dict] = {}
+        self._pending_touches: Dict[Tuple[str, str, str], float] = {}
+
+    def _restore_buffer_locked(self, events, session_deltas, user_deltas, app_deltas, touches) -> None:
+        """Puts a batch that failed to write back in front of anything buffered since. Caller holds `_buffer_lock`."""
+        self._pending_events = events + self._pending_events
+        for pending, failed in (
+            (self._pending_session_deltas, session_deltas),
+            (self._pending_user_deltas, user_deltas),
+            (self._pending_app_deltas, app_deltas),
+        ):
+            for key, delta in failed.items():
+                pending[key] = {**delta, **pending.get(key, {})} # Newer deltas win
+        self._pending_touches = {**touches, **self._pending_touches}
+
+    @traced("session", name="session.flush")
+    def _flush_locked(self) -> None:
+        """Writes the buffered events and coalesced state deltas. Caller holds `_db_lock`.
+
+        If the transaction fails (e.g. "database is locked" after `busy_timeout_ms`),
+        the batch goes back into the buffer so the next flush retries it.
+        """
+        with self._buffer_lock:
+            events = self._pending_events
+            session_deltas = self._pending_session_deltas
+            user_deltas = self._pending_user_deltas
+            app_deltas = self._pending_app_deltas
+            touches = self._pending_touches
+            self._reset_buffer()
+        if not events:
+            return
+
+        conn = self._conn
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT INTO events (app_name, user_id, session_id, timestamp, data) VALUES (?, ?, ?, ?, ?)",
+                events,
+            )
+            if self.max_events_per_session is not None:
+                for session_key in touches:
+                    conn.execute(
+                        "DELETE FROM events WHERE app_name = ? AND user_id = ? AND session_id = ? AND seq <= "
+                        "(SELECT seq FROM events WHERE app_name = ? AND user_id = ? AND session_id = ? "
+                        "ORDER BY seq DESC LIMIT 1 OFFSET ?)",
+                        (*session_key, *session_key, self.max_events_per_session),
+                    )
+            for (app_name, user_id, session_id), update_time in touches.items():
+                delta = session_deltas.get((app_name, user_id, session_id))
+                if delta:
+                    row = conn.execute(
+                        "SELECT state FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?",
+                        (app_name, user_id, session_id),
+                    ).fetchone()
+                    state = {**json.loads(row[0]), **delta} if row else delta
+                    conn.execute(
+                        "UPDATE sessions SET state = ?, update_time = ? WHERE app_name = ? AND user_id = ? AND id = ?",
+                        (json.dumps(state), update_time, app_name, user_id, session_id),
+                    )
+                else:
+                    conn.execute(
+                        "UPDATE sessions SET update_time = ? WHERE app_name = ? AND user_id = ? AND id = ?",
+                        (update_time, app_name, user_id, session_id),
+                    )
+            for (app_name, user_id), delta in user_deltas.items():
+                self._merge_state_row_locked("user_states", {"app_name": app_name, "user_id": user_id}, delta)
+            for app_name, delta in app_deltas.items():
+                self._merge_state_row_locked("app_states", {"app_name": app_name}, delta)
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            with self._buffer_lock:
+                self._restore_buffer_locked(events, session_deltas, user_deltas, app_deltas, touches)
+            raise
+
+    def _merge_state_row_locked(self, table: str, keys: Dict[str, str], delta: dict) -> None:
+        where = " AND ".join(f"{column} = ?" for column in keys)
+        row = self._conn.execute(f"SELECT state FROM {table} WHERE {where}", tuple(keys.values())).fetchone()
+        state = {**json.loads(row[0]), **delta} if row else dict(delta)
+        columns = ", ".join([*keys, "state"])
+        placeholders = ", ".join("?" for _ in range(len(keys) + 1))
+        self._conn.execute(
+            f"INSERT OR REPLACE INTO {table} ({columns}) VALUES ({placeholders})",
+            (*keys.values(), json.dumps(state)),
+        )
+
+    def flush_sync(self) -> None:
+        """Writes any buffered events to the database."""
+        with self._db_lock:
+            self._flush_locked()
+
+    async def flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        await asyncio.to_thread(self.flush_sync)
+
+    def _schedule_flush(self) -> None:
+        self._flush_handle = None
+        task = asyncio.get_running_loop().create_task(asyncio.to_thread(self.flush_sync))
+        self._flush_tasks.add(task) # Keep a reference so the task isn't garbage collected
+        task.add_done_callback(self._flush_tasks.discard)
+        task.add_done_callback(self._log_flush_failure)
+
+    @staticmethod
+    def _log_flush_failure(task: "asyncio.Task") -> None:
+        # Nobody awaits a scheduled flush; the batch stays buffered for the next flush
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Scheduled session flush failed; keeping the events buffered", exc_info=task.exception())
+
+    # --- Reads --- #
+
+    def _is_expired(self, update_time: float, now: float) -> bool:
+        return self.ttl_seconds is not None and update_time < now - self.ttl_seconds
+
+    def _purge_expired_locked(self, now: float) -> None:
+        """Deletes expired sessions, at most once every ttl/10 seconds."""
+        if self.ttl_seconds is None or now < self._next_purge:
+            return
+        self._next_purge = now + self.ttl_seconds / 10
+        cutoff = now - self.ttl_seconds
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "DELETE FROM events WHERE (app_name, user_id, session_id) IN "
+                "(SELECT app_name, user_id, id FROM sessions WHERE update_time < ?)",
+                (cutoff,),
+            )
+            conn.execute("DELETE FROM sessions WHERE update_time < ?", (cutoff,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _merged_state_locked(self, app_name: str, user_id: str, session_state: dict) -> dict:
+        state = dict(session_state)
+        row = self._conn.execute("SELECT state FROM app_states WHERE app_name = ?", (app_name,)).fetchone()
+        if row:
+            for key, value in json.loads(row[0]).items():
+                state[State.APP_PREFIX + key] = value
+        row = self._conn.execute(
+            "SELECT state FROM user_states WHERE app_name = ? AND user_id = ?", (app_name, user_id)
+        ).fetchone()
+        if row:
+            for key, value in json.loads(row[0]).items():
+                state[State.USER_PREFIX + key] = value
+        return state
+
+    # --- Sync implementations (run on a worker thread by the async API) --- #
+
+    def create_session_sync(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        session_id = session_id.strip() if session_id else str(uuid.uuid4())
+        app_delta, user_delta, session_state = _split_state_delta(state or {})
+        now = time.time()
+        with self._db_lock:
+            self._flush_locked()
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT update_time FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?",
+                    (app_name, user_id, session_id),
+                ).fetchone()
+                if row and not self._is_expired(row[0], now):
+                    raise AlreadyExistsError(f"Session with id {session_id} already exists.")
+                if row: # Expired: replace it
+                    conn.execute(
+                        "DELETE FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?",
+                        (app_name, user_id, session_id),
+                    )
+                conn.execute(
+                    "INSERT OR REPLACE INTO sessions (app_name, user_id, id, state, create_time, update_time) VALUES (?, ?, ?, ?, ?, ?)",
+                    (app_name, user_id, session_id, json.dumps(session_state), now, now),
+                )
+                if user_delta:
+                    self._merge_state_row_locked("user_states", {"app_name": app_name, "user_id": user_id}, user_delta)
+                if app_delta:
+                    self._merge_state_row_locked("app_states", {"app_name": app_name}, app_delta)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            merged_state = self._merged_state_locked(app_name, user_id, session_state)
+        return Session(app_name=app_name, user_id=user_id, id=session_id, state=merged_state, last_update_time=now)
+
+    @traced("session", name="session.get")
+    def get_session_sync(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        now = time.time()
+        with self._db_lock:
+            self._flush_locked()
+            self._purge_expired_locked(now)
+            row = self._conn.execute(
+                "SELECT state, update_time FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?",
+                (app_name, user_id, session_id),
+            ).fetchone()
+            if row is None or self._is_expired(row[1], now):
+                return None
+
+            query = "SELECT data FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?"
+            params = [app_name, user_id, session_id]
+            if config and config.after_timestamp is not None:
+                query += " AND timestamp >= ?"
+                params.append(config.after_timestamp)
+            query += " ORDER BY seq DESC"
+            if config and config.num_recent_events is not None:
+                query += " LIMIT ?"
+                params.append(config.num_recent_events)
+            event_rows = self._conn.execute(query, params).fetchall()
+            merged_state = self._merged_state_locked(app_name, user_id, json.loads(row[0]))
+
+        events = [Event.model_validate_json(data) for (data,) in reversed(event_rows)]
+        return Session(
+            app_name=app_name,
+            user_id=user_id,
+            id=session_id,
+            state=merged_state,
+            events=events,
+            last_update_time=row[1],
+        )
+
+    def list_sessions_sync(self, *, app_name: str, user_id: Optional[str] = None) -> ListSessionsResponse:
+        now = time.time()
+        query = "SELECT user_id, id, state, update_time FROM sessions WHERE app_name = ?"
+        params = [app_name]
+        if user_id is not None:
+            query += " AND user_id = ?"
+            params.append(user_id)
+        query += " ORDER BY update_time, user_id, id"
+        sessions = []
+        with self._db_lock:
+            self._flush_locked()
+            for row_user_id, row_id, state, update_time in self._conn.execute(query, params).fetchall():
+                if self._is_expired(update_time, now):
+                    continue
+                sessions.append(Session(
+                    app_name=app_name,
+                    user_id=row_user_id,
+                    id=row_id,
+                    state=self._merged_state_locked(app_name, row_user_id, json.loads(state)),
+                    last_update_time=update_time,
+                ))
+        return ListSessionsResponse(sessions=sessions)
+
+    def delete_session_sync(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        with self._db_lock:
+            self._flush_locked()
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "DELETE FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?",
+                    (app_name, user_id, session_id),
+                )
+                conn.execute(
+                    "DELETE FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?",
+                    (app_name, user_id, session_id),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def get_user_state_sync(self, *, app_name: str, user_id: str) -> Dict[str, Any]:
+        with self._db_lock:
+            self._flush_locked()
+            row = self._conn.execute(
+                "SELECT state FROM user_states WHERE app_name = ? AND user_id = ?", (app_name, user_id)
+            ).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def close(self) -> None:
+        """Flushes the write buffer and closes the database connection."""
+        with self._db_lock:
+            self._flush_locked()
+            self._conn.close()
+
+    # --- BaseSessionService API --- #
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        return await asyncio.to_thread(
+            self.create_session_sync, app_name=app_name, user_id=user_id, state=state, session_id=session_id
+        )
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        return await asyncio.to_thread(
+            self.get_session_sync, app_name=app_name, user_id=user_id, session_id=session_id, config=config
+        )
+
+    async def list_sessions(self, *, app_name: str, user_id: Optional[str] = None) -> ListSessionsResponse:
+        return await asyncio.to_thread(self.list_sessions_sync, app_name=app_name, user_id=user_id)
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        await asyncio.to_thread(self.delete_session_sync, app_name=app_name, user_id=user_id, session_id=session_id)
+
+    async def get_user_state(self, *, app_name: str, user_id: str) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.get_user_state_sync, app_name=app_name, user_id=user_id)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+
+        # Update the caller's in-memory session (applies the delta, drops temp: keys)
+        event = await super().append_event(session=session, event=event)
+        session.last_update_time = event.timestamp
+
+        session_key = (session.app_name, session.user_id, session.id)
+        app_delta, user_delta, session_delta = _split_state_delta(
+            event.actions.state_delta if event.actions and event.actions.state_delta else {}
+        )
+        with self._buffer_lock:
+            self._pending_events.append((*session_key, event.timestamp, event.model_dump_json(exclude_none=True)))
+            self._pending_touches[session_key] = event.timestamp
+            if session_delta:
+                self._pending_session_deltas.setdefault(session_key, {}).update(session_delta)
+            if user_delta:
+                self._pending_user_deltas.setdefault(session_key[:2], {}).update(user_delta)
+            if app_delta:
+                self._pending_app_deltas.setdefault(session.app_name, {}).update(app_delta)
+            buffered = len(self._pending_events)
+
+        if self.flush_interval_seconds <= 0 or buffered >= self.flush_max_events:
+            await self.flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.flush_interval_seconds, self._schedule_flush)
+        return event
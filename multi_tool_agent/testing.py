@@ -0,0 +1,263 @@
+"""Local stand-ins for Gemini and WeatherAPI, for offline benchmarks and load tests.
+
+- `ScriptedLlm`: an ADK `BaseLlm` that answers weather questions with scripted
+  `get_weather_async` / `get_weather_batch` calls and summarizes the results,
+  without any network access.
+- `StubWeatherServer`: a local HTTP server mimicking WeatherAPI's
+  `/v1/current.json`, with configurable latency and error rate. Point the agent
+  at it with `WEATHER_API_BASE_URL=server.base_url` (set before importing tools).
+
+Neither is used by the agent itself; import this module only from harnesses.
+"""
+import asyncio
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import AsyncGenerator, Dict, Iterable, Optional, Union
+from urllib.parse import parse_qs, urlparse
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+_CITIES_PATTERN = re.compile(r"\bin\s+(.+?)[?.!]*$", re.IGNORECASE)
+_CITY_SEPARATOR = re.compile(r"\s*(?:,|\band\b)\s*", re.IGNORECASE)
+
+
+# --- Fake Model --- #
+
+class ScriptedLlm(BaseLlm):
+    """A deterministic offline model for driving the Runner.
+
+    - "... weather in London?" -> `get_weather_async(city="London")`
+    - "... in Paris, Berlin and Rome" -> `get_weather_batch(cities=[...])`
+    - a function response -> a text answer built from the tool result
+    - anything else -> a short canned text answer
+
+    With `stream=True` (SSE streaming), text answers are sent as partial
+    word chunks followed by the complete response, like Gemini does.
+    """
+
+    model: str = "scripted"
+    # Simulated model latency per call, in seconds
+    latency_seconds: float = 0.0
+    # Simulated generation time per streamed chunk, in seconds
+    chunk_delay_seconds: float = 0.0
+    calls: int = 0
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        self.calls += 1
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+
+        last = llm_request.contents[-1] if llm_request.contents else None
+        parts = (last.parts or []) if last else []
+        responses = [part.function_response for part in parts if part.function_response]
+        if responses:
+            answer = " ".join(_describe_tool_result(response.response or {}) for response in responses)
+            async for response in self._text(answer, stream):
+                yield response
+            return
+
+        text = " ".join(part.text for part in parts if part.text).strip()
+        match = _CITIES_PATTERN.search(text)
+        if not match:
+            async for response in self._text("I can look up the current weather for any city. Which one?", stream):
+                yield response
+            return
+
+        cities = [city for city in _CITY_SEPARATOR.split(match.group(1)) if city]
+        if len(cities) > 1:
+            call = types.FunctionCall(name="get_weather_batch", args={"cities": cities})
+        else:
+            call = types.FunctionCall(name="get_weather_async", args={"city": cities[0]})
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(function_call=call)]))
+
+    async def _text(self, text: str, stream: bool) -> AsyncGenerator[LlmResponse, None]:
+        for response in _text_responses(text, stream):
+            if response.partial and self.chunk_delay_seconds:
+                await asyncio.sleep(self.chunk_delay_seconds)
+            yield response
+
+
+def _text_response(text: str, partial: Optional[bool] = None) -> LlmResponse:
+    return LlmResponse(content=types.Content(role="model", parts=[types.Part(text=text)]), partial=partial)
+
+
+def _text_responses(text: str, stream: bool) -> list:
+    """The complete text response, preceded by partial chunks of a few words when streaming."""
+    if not stream:
+        return [_text_response(text)]
+    words = text.split(" ")
+    chunks = [" ".join(words[index:index + 4]) for index in range(0, len(words), 4)]
+    partials = [_text_response(chunk if index == 0 else " " + chunk, partial=True) for index, chunk in enumerate(chunks)]
+    return partials + [_text_response(text, partial=False)]
+
+
+def _describe_tool_result(result: dict) -> str:
+    if "results" in result: # get_weather_batch
+        return " ".join(_describe_tool_result(item) for item in result["results"])
+    if result.get("status") != "success":
+        return result.get("error_message", "The weather lookup failed.")
+    if "report" in result:
+        return result["report"]
+    readings = ", ".join(f"{field} {value}" for field, value in result.get("data", {}).items())
+    return f"Weather in {result.get('city')}: {readings}."
+
+
+# --- Stub WeatherAPI --- #
+
+def fake_current_weather(city: str) -> dict:
+    """Builds a WeatherAPI-shaped `current.json` payload, deterministic per city."""
+    seed = int(hashlib.sha1(city.lower().encode("utf-8")).hexdigest()[:8], 16)
+    rng = random.Random(seed)
+    temp_c = round(rng.uniform(-10, 35), 1)
+    feels_c = round(temp_c - rng.uniform(0, 3), 1)
+    wind_kph = round(rng.uniform(0, 40), 1)
+    gust_kph = round(wind_kph * 1.4, 1)
+    pressure_mb = round(rng.uniform(990, 1030), 1)
+    precip_mm = round(rng.uniform(0, 5), 1)
+    vis_km = round(rng.uniform(2, 10), 1)
+    dewpoint_c = round(temp_c - rng.uniform(1, 8), 1)
+
+    def to_f(celsius: float) -> float:
+        return round(celsius * 9 / 5 + 32, 1)
+
+    return {
+        "location": {"name": city.title(), "country": "Stubland"},
+        "current": {
+            "last_updated": "2026-01-01 12:00",
+            "temp_c": temp_c, "temp_f": to_f(temp_c),
+            "condition": {"text": rng.choice(["Sunny", "Partly cloudy", "Overcast", "Light rain", "Mist"])},
+            "wind_kph": wind_kph, "wind_mph": round(wind_kph / 1.609, 1),
+            "wind_dir": rng.choice(["N", "NE", "E", "SE", "S", "SW", "W", "NW"]),
+            "pressure_mb": pressure_mb, "pressure_in": round(pressure_mb * 0.02953, 2),
+            "precip_mm": precip_mm, "precip_in": round(precip_mm / 25.4, 2),
+            "humidity": rng.randint(20, 100),
+            "feelslike_c": feels_c, "feelslike_f": to_f(feels_c),
+            "windchill_c": feels_c, "windchill_f": to_f(feels_c),
+            "heatindex_c": temp_c, "heatindex_f": to_f(temp_c),
+            "dewpoint_c": dewpoint_c, "dewpoint_f": to_f(dewpoint_c),
+            "vis_km": vis_km, "vis_miles": round(vis_km / 1.609, 1),
+            "uv": round(rng.uniform(0, 9), 1),
+            "gust_kph": gust_kph, "gust_mph": round(gust_kph / 1.609, 1),
+        },
+    }
+
+
+class StubWeatherServer:
+    """A local WeatherAPI stand-in serving `GET /v1/current.json` on a background thread.
+
+    Args:
+        latency_seconds (float): Delay added to every response.
+        error_rate (float): Fraction of requests answered with a 500 error.
+        api_key (str or iterable of str, optional): If set, other keys get
+            WeatherAPI's 401 response.
+        unknown_cities (iterable of str): Cities answered with WeatherAPI's
+            "No matching location found." (400, code 1006).
+        seed (int, optional): Seed for the error injection.
+
+    Use as a context manager, or call `start()` / `stop()`.
+    """
+
+    def __init__(
+        self,
+        latency_seconds: float = 0.0,
+        error_rate: float = 0.0,
+        api_key: Optional[Union[str, Iterable[str]]] = None,
+        unknown_cities: Iterable[str] = ("nowhere",),
+        seed: Optional[int] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.latency_seconds = latency_seconds
+        self.error_rate = error_rate
+        self.api_keys = None if api_key is None else ({api_key} if isinstance(api_key, str) else set(api_key))
+        self.unknown_cities = {city.lower() for city in unknown_cities}
+        self.request_count = 0
+        self.error_count = 0
+        self.requests_per_key: Dict[str, int] = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "StubWeatherServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-weatherapi", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "StubWeatherServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def _respond(self, query: dict) -> tuple:
+        """Returns `(status_code, body)` for a `current.json` query."""
+        with self._lock:
+            self.request_count += 1
+            key = query.get("key") or ""
+            self.requests_per_key[key] = self.requests_per_key.get(key, 0) + 1
+            inject_error = self._rng.random() < self.error_rate
+            if inject_error:
+                self.error_count += 1
+        if self.api_keys is not None and key not in self.api_keys:
+            return 401, {"error": {"code": 2006, "message": "API key is invalid."}}
+        city = (query.get("q") or "").strip()
+        if not city:
+            return 400, {"error": {"code": 1003, "message": "Parameter q is missing."}}
+        if inject_error:
+            return 500, {"error": {"code": 9999, "message": "Internal application error."}}
+        if city.lower() in self.unknown_cities:
+            return 400, {"error": {"code": 1006, "message": "No matching location found."}}
+        return 200, fake_current_weather(city)
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1" # keep-alive, so client connection pooling is exercised
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path.rstrip("/") != "/v1/current.json":
+                    status, body = 404, {"error": {"code": 1005, "message": "API request url is invalid."}}
+                else:
+                    query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                    status, body = stub._respond(query)
+                if stub.latency_seconds:
+                    time.sleep(stub.latency_seconds)
+                payload = json.dumps(body).encode("utf-8")
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                except ConnectionError:
+                    self.close_connection = True # The client gave up (e.g. a cancelled hedged request)
+
+            def log_message(self, format, *args):
+                pass # keep benchmark output clean
+
+        return Handler
@@ -1,218 +1,844 @@
 import os
+import asyncio
+import threading
+import httpx
 import requests
 import logging
+from typing import Optional, Tuple
 from google.adk.tools.tool_context import ToolContext
-from .config import WEATHER_API_KEY 
+from .cache import TTLCache, normalize_city
+from .singleflight import AsyncSingleFlight, SingleFlight
+from .http_client import async_timeout, get_async_client, get_sync_session, sync_timeout
+from .resilience import AdaptiveTimeout, CircuitBreaker, CircuitOpenError, ResilientCaller
+from .key_pool import ApiKeyPool, ApiKeyUnavailable
+from .prefetch import DecayedFrequencySketch, PrefetchScheduler
+from .response_cache import response_cache
+from .tracing import traced
+from .log import SAMPLED
+from .config import (
+    WEATHER_API_KEYS,
+    WEATHER_API_BASE_URL,
+    WEATHER_CACHE_TTL_SECONDS,
+    WEATHER_CACHE_STALE_SECONDS,
+    WEATHER_CACHE_MAX_ENTRIES,
+    WEATHER_CACHE_FALLBACK_SECONDS,
+    WEATHER_HTTP_READ_TIMEOUT_SECONDS,
+    WEATHER_KEY_RATE_PER_SECOND,
+    WEATHER_KEY_BURST,
+    WEATHER_KEY_DAILY_QUOTA,
+    WEATHER_KEY_WAIT_TIMEOUT_SECONDS,
+    WEATHER_TIMEOUT_ADAPTIVE,
+    WEATHER_TIMEOUT_MIN_SECONDS,
+    WEATHER_TIMEOUT_P99_MULTIPLIER,
+    WEATHER_RETRY_MAX_ATTEMPTS,
+    WEATHER_RETRY_BACKOFF_BASE_SECONDS,
+    WEATHER_RETRY_BACKOFF_MAX_SECONDS,
+    WEATHER_HEDGE_ENABLED,
+    WEATHER_BREAKER_FAILURE_THRESHOLD,
+    WEATHER_BREAKER_RESET_SECONDS,
+    WEATHER_BATCH_MAX_CONCURRENCY,
+    WEATHER_BATCH_MAX_CITIES,
+    GAZETTEER_ENABLED,
+    GAZETTEER_STRICT,
+    PREFETCH_ENABLED,
+    PREFETCH_INTERVAL_SECONDS,
+    PREFETCH_LEAD_SECONDS,
+    PREFETCH_MAX_REQUESTS_PER_MINUTE,
+    PREFETCH_TOP_K,
+    PREFETCH_MIN_SCORE,
+    PREFETCH_HALF_LIFE_SECONDS,
+    RESPONSE_CACHE_ENABLED,
+)
+
+logger = logging.getLogger(__name__)
+
+WEATHER_API_URL = f"{WEATHER_API_BASE_URL.rstrip('/')}/current.json" # <<< WeatherAPI URL
+
+# --- Response Cache --- #
+# Only the raw `data["current"]` payload is cached (keyed by canonical place), so
+# Celsius and Fahrenheit users share the same entry; the report is rendered per call.
+weather_cache = TTLCache(
+    max_entries=WEATHER_CACHE_MAX_ENTRIES,
+    ttl_seconds=WEATHER_CACHE_TTL_SECONDS,
+    stale_seconds=WEATHER_CACHE_STALE_SECONDS,
+    fallback_seconds=WEATHER_CACHE_FALLBACK_SECONDS,
+)
+_refreshing_keys = set() # Cache keys with a background refresh in flight
+_refreshing_lock = threading.Lock()
+_background_tasks = set() # Strong references to in-flight async refresh tasks
+
+# --- In-flight Request Deduplication --- #
+# Concurrent cache misses for the same normalized city share one upstream fetch.
+_inflight = SingleFlight()
+_inflight_async = AsyncSingleFlight()
+
+# --- Upstream Resilience --- #
+# The sync and async clients share one latency window and one circuit breaker.
+_upstream_timeouts = AdaptiveTimeout(
+    default_seconds=WEATHER_HTTP_READ_TIMEOUT_SECONDS,
+    min_seconds=WEATHER_TIMEOUT_MIN_SECONDS,
+    p99_multiplier=WEATHER_TIMEOUT_P99_MULTIPLIER,
+    adaptive=WEATHER_TIMEOUT_ADAPTIVE,
+)
+_upstream_breaker = CircuitBreaker(
+    failure_threshold=WEATHER_BREAKER_FAILURE_THRESHOLD,
+    reset_seconds=WEATHER_BREAKER_RESET_SECONDS,
+)
+_retry_settings = {
+    "max_attempts": WEATHER_RETRY_MAX_ATTEMPTS,
+    "backoff_base_seconds": WEATHER_RETRY_BACKOFF_BASE_SECONDS,
+    "backoff_max_seconds": WEATHER_RETRY_BACKOFF_MAX_SECONDS,
+}
+weather_upstream = ResilientCaller(
+    _upstream_timeouts,
+    _upstream_breaker,
+    retry_exceptions=(requests.exceptions.ConnectionError, requests.exceptions.Timeout),
+    hedge=False, # Hedging needs a second thread per slow request; only the async path hedges
+    **_retry_settings,
+)
+weather_upstream_async = ResilientCaller(
+    _upstream_timeouts,
+    _upstream_breaker,
+    retry_exceptions=(httpx.TransportError,),
+    hedge=WEATHER_HEDGE_ENABLED,
+    **_retry_settings,
+)
+_CIRCUIT_OPEN_RESULT = {"status": "error", "error_message": "The weather service is temporarily unavailable. Please try again in a moment."}
+
+# --- API Key Pool --- #
+# Every request (retries and hedges included) takes a token from one of the
+# configured keys; keys WeatherAPI rejects are dropped and the request resent.
+weather_key_pool = ApiKeyPool(
+    WEATHER_API_KEYS,
+    rate_per_second=WEATHER_KEY_RATE_PER_SECOND,
+    burst=WEATHER_KEY_BURST,
+    daily_quota=WEATHER_KEY_DAILY_QUOTA,
+)
+
+
+def _key_rejected(key: str, status_code: int) -> bool:
+    """Reports `status_code` for `key`; True if the key was refused and another one is left to try."""
+    weather_key_pool.report(key, status_code)
+    return status_code in (401, 403) and weather_key_pool.has_usable_keys()
+
+
+def _key_unavailable_result() -> dict:
+    if not weather_key_pool.has_usable_keys():
+        logger.warning("No usable WeatherAPI key left (all rejected or out of quota)")
+        return {"status": "error", "error_message": "There was an authentication issue with the weather service. Please check the API key."}
+    logger.warning("Timed out waiting for WeatherAPI rate-limit capacity")
+    return {"status": "error", "error_message": "The weather service is busy right now. Please try again in a moment."}
+
+
+def _parse_weather_response(city: str, status_code: int, response_json) -> Tuple[Optional[dict], Optional[dict]]:
+    """Maps a WeatherAPI.com HTTP response onto `(current_data, error_result)`.
+
+    Shared by the sync and async clients. `response_json` is a zero-argument
+    callable returning the decoded body (raising ValueError if it isn't JSON).
+    """
+    if status_code < 400:
+        # --- Process Successful Response ---
+        data = response_json()
+        logger.debug("API response data (partial): %.200s", data, extra=SAMPLED)
 
-def get_weather(city: str, tool_context: ToolContext) -> dict:
-    """Retrieves the current weather report for a specified city using WeatherAPI.com."""
-    print(f"--- Tool: get_weather called for {city} ---")
+        if data.get("current") and data["current"].get("condition"):
+            return data["current"], None
+        logger.warning("Unexpected API response format from WeatherAPI.com")
+        return None, {"status": "error", "error_message": f"Received unexpected weather data format for '{city}'."}
+
+    # WeatherAPI Error Handling (Consult their docs for specifics)
+    if status_code == 400: # Often used for location not found or bad request
+        try:
+            error_data = response_json()
+            error_message = error_data.get("error", {}).get("message", "request issue")
+            logger.warning("WeatherAPI returned 400: %s", error_message)
+            # Check if it's a location not found error (code 1006)
+            if error_data.get("error", {}).get("code") == 1006:
+                 return None, {"status": "error", "error_message": f"Sorry, I couldn't find weather information for '{city}'."}
+            else:
+                 return None, {"status": "error", "error_message": f"There was a problem with the weather request for '{city}': {error_message}"}
+        except ValueError: # Handle cases where error response isn't JSON
+            logger.warning("WeatherAPI returned 400, but the error response wasn't valid JSON")
+            return None, {"status": "error", "error_message": f"There was an unspecified problem with the weather request for '{city}'."}
 
-    # --- Check for API Key ---
-    if not WEATHER_API_KEY:
-        print("--- Tool Error: WEATHER_API_KEY environment variable not set. ---")
-        return {"status": "error", "error_message": "Weather API key is missing. Cannot fetch weather."}
+    elif status_code == 401 or status_code == 403: # API key issues
+         logger.warning("WeatherAPI returned %s (API key issue)", status_code)
+         return None, {"status": "error", "error_message": "There was an authentication issue with the weather service. Please check the API key."}
+    else:
+        logger.warning("HTTP error occurred (status %s)", status_code)
+        return None, {"status": "error", "error_message": f"An HTTP error occurred while fetching weather for '{city}'. Status: {status_code}"}
 
-    # --- Read temperature preference from state ---
-    preferred_unit_state = tool_context.state.get("user_preference_temperature_unit", "Celsius") # Default to Celsius
-    print(f"--- Tool: Reading state 'user_preference_temperature_unit': {preferred_unit_state} ---")
 
+@traced("http", name="http.weatherapi")
+def _fetch_current_weather(city: str, query: Optional[str] = None) -> Tuple[Optional[dict], Optional[dict]]:
+    """Calls WeatherAPI.com for `city` over the pooled sync session.
+
+    `query` overrides the `q` sent upstream (e.g. the resolved coordinates);
+    `city` is still used in messages.
+
+    Returns:
+        tuple: `(current_data, None)` on success, or `(None, error_result)` where
+        `error_result` is the tool's error dict.
+    """
+    params = {
+        "q": query or city,
+        # The 'key' parameter is filled in per request from the key pool
+        # No 'units' parameter needed for WeatherAPI, it returns both C/F
+    }
+
+    def send(timeout: float):
+        # The first attempt's key was taken before the call so queueing for it isn't timed as latency
+        key = first_key.pop() if first_key else weather_key_pool.acquire(WEATHER_KEY_WAIT_TIMEOUT_SECONDS)
+        while True:
+            response = get_sync_session().get(WEATHER_API_URL, params={**params, "key": key}, timeout=sync_timeout(timeout))
+            if not _key_rejected(key, response.status_code):
+                return response
+            key = weather_key_pool.acquire(WEATHER_KEY_WAIT_TIMEOUT_SECONDS)
+
+    first_key = []
+    try:
+        first_key.append(weather_key_pool.acquire(WEATHER_KEY_WAIT_TIMEOUT_SECONDS))
+        logger.debug("Calling WeatherAPI.com for %s", city)
+        response = weather_upstream.call(send)
+        return _parse_weather_response(city, response.status_code, response.json)
+    except ApiKeyUnavailable:
+        return None, _key_unavailable_result()
+    except CircuitOpenError:
+        logger.warning("WeatherAPI circuit is open; failing fast")
+        return None, dict(_CIRCUIT_OPEN_RESULT)
+    except requests.exceptions.ConnectionError as conn_err:
+        logger.warning("Connection error occurred: %s", conn_err)
+        return None, {"status": "error", "error_message": f"Could not connect to the weather service to get information for '{city}'."}
+    except requests.exceptions.Timeout as timeout_err:
+        logger.warning("Request timed out: %s", timeout_err)
+        return None, {"status": "error", "error_message": f"The request to the weather service timed out for '{city}'."}
+    except requests.exceptions.RequestException as req_err:
+        # Catch any other request-related errors
+        logger.warning("An ambiguous request error occurred: %s", req_err)
+        return None, {"status": "error", "error_message": f"An error occurred while requesting weather data for '{city}'."}
+    finally:
+        if first_key: # Never sent (e.g. the circuit was open): the token goes back to the pool
+            weather_key_pool.release(first_key.pop())
+
+
+@traced("http", name="http.weatherapi")
+async def _fetch_current_weather_async(city: str, query: Optional[str] = None) -> Tuple[Optional[dict], Optional[dict]]:
+    """Async counterpart of `_fetch_current_weather` using the shared pooled `httpx` client."""
+    params = {"q": query or city}
+
+    async def send(timeout: float):
+        key = first_key.pop() if first_key else await weather_key_pool.acquire_async(WEATHER_KEY_WAIT_TIMEOUT_SECONDS)
+        while True:
+            response = await get_async_client().get(WEATHER_API_URL, params={**params, "key": key}, timeout=async_timeout(timeout))
+            if not _key_rejected(key, response.status_code):
+                return response
+            key = await weather_key_pool.acquire_async(WEATHER_KEY_WAIT_TIMEOUT_SECONDS)
+
+    first_key = []
+    try:
+        first_key.append(await weather_key_pool.acquire_async(WEATHER_KEY_WAIT_TIMEOUT_SECONDS))
+        logger.debug("Calling WeatherAPI.com (async) for %s", city)
+        response = await weather_upstream_async.call_async(send)
+        return _parse_weather_response(city, response.status_code, response.json)
+    except ApiKeyUnavailable:
+        return None, _key_unavailable_result()
+    except CircuitOpenError:
+        logger.warning("WeatherAPI circuit is open; failing fast")
+        return None, dict(_CIRCUIT_OPEN_RESULT)
+    except httpx.TimeoutException as timeout_err:
+        logger.warning("Request timed out: %r", timeout_err)
+        return None, {"status": "error", "error_message": f"The request to the weather service timed out for '{city}'."}
+    except httpx.TransportError as conn_err:
+        logger.warning("Connection error occurred: %r", conn_err)
+        return None, {"status": "error", "error_message": f"Could not connect to the weather service to get information for '{city}'."}
+    except httpx.HTTPError as req_err:
+        logger.warning("An ambiguous request error occurred: %r", req_err)
+        return None, {"status": "error", "error_message": f"An error occurred while requesting weather data for '{city}'."}
+    finally:
+        if first_key: # Never sent (e.g. the circuit was open): the token goes back to the pool
+            weather_key_pool.release(first_key.pop())
+
+
+def _claim_refresh(cache_key: str) -> bool:
+    """Marks `cache_key` as being refreshed; False if a refresh is already in flight."""
+    with _refreshing_lock:
+        if cache_key in _refreshing_keys:
+            return False
+        _refreshing_keys.add(cache_key)
+        return True
+
+
+def _refresh_in_background(city: str, query: str, cache_key: str) -> None:
+    """Revalidates a stale cache entry on a daemon thread (at most one per key)."""
+    if not _claim_refresh(cache_key):
+        return
+
+    def _refresh():
+        try:
+            current_data, _ = _fetch_current_weather(city, query)
+            if current_data is not None:
+                weather_cache.set(cache_key, current_data)
+                logger.debug("Refreshed cached weather for '%s'", cache_key)
+        except Exception:
+            logger.exception("Background weather cache refresh failed")
+        finally:
+            with _refreshing_lock:
+                _refreshing_keys.discard(cache_key)
+
+    threading.Thread(target=_refresh, name=f"weather-refresh-{cache_key}", daemon=True).start()
+
+
+async def _refresh_claimed_async(city: str, query: str, cache_key: str) -> None:
+    """Refetches `cache_key` into the cache; the caller must have claimed it with `_claim_refresh`."""
+    try:
+        current_data, _ = await _fetch_current_weather_async(city, query)
+        if current_data is not None:
+            weather_cache.set(cache_key, current_data)
+            logger.debug("Refreshed cached weather for '%s'", cache_key)
+    except Exception:
+        logger.exception("Background weather cache refresh failed")
+    finally:
+        with _refreshing_lock:
+            _refreshing_keys.discard(cache_key)
+
+
+def _refresh_in_background_async(city: str, query: str, cache_key: str) -> None:
+    """Revalidates a stale cache entry as a task on the running loop (at most one per key)."""
+    if not _claim_refresh(cache_key):
+        return
+    task = asyncio.get_running_loop().create_task(_refresh_claimed_async(city, query, cache_key))
+    _background_tasks.add(task) # Keep a reference so the task isn't garbage collected
+    task.add_done_callback(_background_tasks.discard)
+
+
+# --- Hot-City Prefetch --- #
+# Async lookups are counted per cache key; the hottest entries are refreshed in
+# the background shortly before they expire, so their next lookup is a hit.
+_prefetch_enabled = PREFETCH_ENABLED and WEATHER_CACHE_TTL_SECONDS > 0
+hot_cities = DecayedFrequencySketch(top_k=PREFETCH_TOP_K, half_life_seconds=PREFETCH_HALF_LIFE_SECONDS)
+
+
+async def _prefetch(cache_key: str, target: Tuple[str, str]) -> None:
+    city, query = target
+    if _claim_refresh(cache_key): # Skip keys a stale-while-revalidate refresh is already fetching
+        await _refresh_claimed_async(city, query, cache_key)
+
+
+prefetcher = PrefetchScheduler(
+    hot_cities,
+    time_to_expiry=weather_cache.time_to_expiry,
+    refresh=_prefetch,
+    interval_seconds=PREFETCH_INTERVAL_SECONDS,
+    lead_seconds=PREFETCH_LEAD_SECONDS,
+    max_requests_per_minute=PREFETCH_MAX_REQUESTS_PER_MINUTE,
+    min_score=PREFETCH_MIN_SCORE,
+)
+
+
+def _resolve_city(city: str) -> Tuple[str, str, Optional[dict]]:
+    """Canonicalizes `city` against the gazetteer.
+
+    Returns:
+        tuple: `(query, cache_key, error_result)`. A known place is queried by
+        its coordinates and cached under its canonical key, so "london" and
+        "London, UK" share one entry. An unknown name is passed through as
+        typed, or rejected (`error_result`) when GAZETTEER_STRICT is set.
+        Misspellings ("Londn") are only corrected in strict mode: otherwise a
+        real place missing from the gazetteer ("Nome") would be swapped for a
+        similarly spelled one ("Rome").
+    """
+    if not GAZETTEER_ENABLED:
+        return city, normalize_city(city), None
+
+    from .gazetteer import get_gazetteer
+
+    resolution = get_gazetteer().resolve(city)
+    place = _accepted_place(resolution)
+    if place is None and resolution.place is not None:
+        logger.debug("'%s' is not in the gazetteer (closest: %s); passing it through as typed", city, resolution.place.display_name)
+    if place is not None:
+        logger.debug("Resolved '%s' to %s (%s match, over %d other(s))", city, place.display_name, resolution.match, len(resolution.alternatives))
+        return place.query, place.key, None
+    if not GAZETTEER_STRICT:
+        return city, normalize_city(city), None
+
+    logger.info("'%s' is not in the gazetteer; skipping the WeatherAPI call", city)
+    error_message = f"Sorry, I couldn't find weather information for '{city}'."
+    if resolution.suggestions:
+        error_message += f" Did you mean {' or '.join(place.display_name for place in resolution.suggestions)}?"
+    return city, normalize_city(city), {"status": "error", "error_message": error_message}
+
+
+def _accepted_place(resolution):
+    """The resolved place, unless it is only a fuzzy guess outside strict mode."""
+    if resolution.match == "fuzzy" and not GAZETTEER_STRICT:
+        return None
+    return resolution.place
+
+
+def _canonical_key(city: str) -> str:
+    """The cache key `_resolve_city` would use for `city` (without logging the resolution)."""
+    if GAZETTEER_ENABLED:
+        from .gazetteer import get_gazetteer
+
+        place = _accepted_place(get_gazetteer().resolve(city))
+        if place is not None:
+            return place.key
+    return normalize_city(city)
+
+
+def _fallback_to_expired(cache_key: str, error_result: dict) -> Tuple[Optional[dict], Optional[dict]]:
+    """Serves an expired cached payload instead of `error_result` when one is still kept (stale-if-error)."""
+    current_data, age = weather_cache.peek(cache_key)
+    if current_data is None:
+        return None, error_result
+    logger.warning("WeatherAPI lookup failed; serving %.0fs old cached weather for '%s'", age, cache_key)
+    return current_data, None
+
+
+def _get_current_weather(city: str) -> Tuple[Optional[dict], Optional[dict]]:
+    """Returns the `current` payload for `city`, serving from the cache when possible."""
+    query, cache_key, error_result = _resolve_city(city)
+    if error_result is not None:
+        return None, error_result
+    current_data, is_stale = weather_cache.get(cache_key)
+    if current_data is not None:
+        logger.debug("Cache %s for '%s'", "stale hit" if is_stale else "hit", cache_key)
+        if is_stale:
+            _refresh_in_background(city, query, cache_key)
+        return current_data, None
+
+    logger.debug("Cache miss for '%s'", cache_key)
+
+    def _fetch_and_store():
+        current_data, error_result = _fetch_current_weather(city, query)
+        if current_data is not None:
+            weather_cache.set(cache_key, current_data)
+            return current_data, None
+        return _fallback_to_expired(cache_key, error_result)
+
+    return _inflight.do(cache_key, _fetch_and_store)
+
+
+async def _get_current_weather_async(city: str) -> Tuple[Optional[dict], Optional[dict]]:
+    """Async counterpart of `_get_current_weather`; never blocks the event loop on I/O."""
+    query, cache_key, error_result = _resolve_city(city)
+    if error_result is not None:
+        return None, error_result
+    if _prefetch_enabled:
+        hot_cities.add(cache_key, (city, query))
+        prefetcher.ensure_started()
+    current_data, is_stale = weather_cache.get(cache_key)
+    if current_data is not None:
+        logger.debug("Cache %s for '%s'", "stale hit" if is_stale else "hit", cache_key)
+        if is_stale:
+            _refresh_in_background_async(city, query, cache_key)
+        return current_data, None
+
+    logger.debug("Cache miss for '%s'", cache_key)
+
+    async def _fetch_and_store():
+        current_data, error_result = await _fetch_current_weather_async(city, query)
+        if current_data is not None:
+            weather_cache.set(cache_key, current_data)
+            return current_data, None
+        return _fallback_to_expired(cache_key, error_result)
+
+    return await _inflight_async.do(cache_key, _fetch_and_store)
+
+
+def _build_report(city: str, current_data: dict, preferred_unit_state: str) -> str:
+    """Renders the detailed weather report for `current_data` in the preferred unit."""
     # Determine the temperature symbol based on preference
     if preferred_unit_state == "Fahrenheit":
         temp_symbol = "°F"
     else: # Default to Celsius
         temp_symbol = "°C"
 
-    # --- Call WeatherAPI.com API ---
-    base_url = "http://api.weatherapi.com/v1/current.json" # <<< WeatherAPI URL
-    params = {
-        "q": city,
-        "key": WEATHER_API_KEY, # <<< WeatherAPI uses 'key'
-        # No 'units' parameter needed for WeatherAPI, it returns both C/F
-    }
+    condition_data = current_data["condition"]
+    description = condition_data.get("text", "N/A")
+    temp_c = current_data.get("temp_c")
+    temp_f = current_data.get("temp_f")
+    feelslike_c = current_data.get("feelslike_c")
+    feelslike_f = current_data.get("feelslike_f")
+    humidity = current_data.get("humidity")
+    wind_kph = current_data.get("wind_kph")
+    wind_mph = current_data.get("wind_mph")
+    wind_dir = current_data.get("wind_dir")
+    uv_index = current_data.get("uv")
+    pressure_mb = current_data.get("pressure_mb")
+    pressure_in = current_data.get("pressure_in")
+    precip_mm = current_data.get("precip_mm")
+    precip_in = current_data.get("precip_in")
+    vis_km = current_data.get("vis_km")
+    vis_miles = current_data.get("vis_miles")
+    gust_kph = current_data.get("gust_kph")
+    gust_mph = current_data.get("gust_mph")
+    windchill_c = current_data.get("windchill_c") # May not always be present/relevant
+    windchill_f = current_data.get("windchill_f")
+    heatindex_c = current_data.get("heatindex_c") # May not always be present/relevant
+    heatindex_f = current_data.get("heatindex_f")
+    dewpoint_c = current_data.get("dewpoint_c")
+    dewpoint_f = current_data.get("dewpoint_f")
+    last_updated = current_data.get("last_updated")
+
+    # Select temperature and units based on state preference
+    if preferred_unit_state == "Fahrenheit":
+        temp = temp_f
+        feels_like_temp = feelslike_f
+        wind_speed = wind_mph
+        wind_unit = "mph"
+        pressure = pressure_in
+        pressure_unit = "inHg"
+        precip = precip_in
+        precip_unit = "in"
+        visibility = vis_miles
+        visibility_unit = "miles"
+        gust_speed = gust_mph
+        wind_chill_temp = windchill_f
+        heat_index_temp = heatindex_f
+        dew_point_temp = dewpoint_f
+    else: # Default to Celsius
+        temp = temp_c
+        feels_like_temp = feelslike_c
+        wind_speed = wind_kph
+        wind_unit = "kph"
+        pressure = pressure_mb
+        pressure_unit = "mb"
+        precip = precip_mm
+        precip_unit = "mm"
+        visibility = vis_km
+        visibility_unit = "km"
+        gust_speed = gust_kph
+        wind_chill_temp = windchill_c
+        heat_index_temp = heatindex_c
+        dew_point_temp = dewpoint_c
+
+    # Build the report string piece by piece
+    report_parts = []
+
+    # Main condition and temp
+    if temp is not None:
+         report_parts.append(f"The weather in {city.capitalize()} is {description} with a temperature of {temp:.1f}{temp_symbol}.")
+    else:
+         report_parts.append(f"The weather in {city.capitalize()} is {description}.")
+         logger.warning("Temperature data (temp_c/temp_f) missing in API response")
+
+    # Feels like temp
+    if feels_like_temp is not None:
+        report_parts.append(f"It feels like {feels_like_temp:.1f}{temp_symbol}.")
+
+    # Humidity
+    if humidity is not None:
+        report_parts.append(f"Humidity is at {humidity}%." )
+
+    # Wind
+    if wind_speed is not None and wind_dir:
+        report_parts.append(f"Wind is blowing from the {wind_dir} at {wind_speed:.1f} {wind_unit}.")
+    elif wind_speed is not None:
+         report_parts.append(f"Wind speed is {wind_speed:.1f} {wind_unit}.")
+
+    # UV Index
+    if uv_index is not None:
+         report_parts.append(f"The UV index is {uv_index}.")
+
+    # Pressure
+    if pressure is not None:
+        report_parts.append(f"Pressure is {pressure:.2f} {pressure_unit}.")
+
+    # Precipitation
+    if precip is not None:
+        report_parts.append(f"Precipitation is {precip:.2f} {precip_unit}.")
+
+    # Visibility
+    if visibility is not None:
+        report_parts.append(f"Visibility is {visibility:.1f} {visibility_unit}.")
+
+    # Wind Gust
+    if gust_speed is not None:
+         report_parts.append(f"Wind gusts up to {gust_speed:.1f} {wind_unit}.")
+
+    # Dew Point
+    if dew_point_temp is not None:
+         report_parts.append(f"Dew point is {dew_point_temp:.1f}{temp_symbol}.")
+
+    # Wind Chill (only if significantly different from temp and feels_like)
+    if wind_chill_temp is not None and feels_like_temp is not None and wind_chill_temp < feels_like_temp - 1: # Heuristic condition
+         report_parts.append(f"Wind chill makes it feel like {wind_chill_temp:.1f}{temp_symbol}.")
+
+    # Heat Index (only if significantly different from temp and feels_like)
+    if heat_index_temp is not None and feels_like_temp is not None and heat_index_temp > feels_like_temp + 1: # Heuristic condition
+         report_parts.append(f"Heat index makes it feel like {heat_index_temp:.1f}{temp_symbol}.")
+
+    # Last Updated
+    if last_updated:
+        report_parts.append(f"(Last updated: {last_updated})")
+
+    # Join the parts into a single report string
+    return " ".join(report_parts)
+
+
+# --- Field Projection --- #
+# Compact, per-field output so the model doesn't have to read (and we don't pay
+# tokens for) the full prose report when the user asked about a single detail.
+# Each field maps to (metric key, imperial key, unit kind, number format).
+WEATHER_FIELDS = {
+    "condition": (None, None, None, None),
+    "temperature": ("temp_c", "temp_f", "temp", ".1f"),
+    "feels_like": ("feelslike_c", "feelslike_f", "temp", ".1f"),
+    "humidity": ("humidity", "humidity", "percent", ""),
+    "wind": ("wind_kph", "wind_mph", "speed", ".1f"),
+    "gust": ("gust_kph", "gust_mph", "speed", ".1f"),
+    "uv": ("uv", "uv", None, ""),
+    "pressure": ("pressure_mb", "pressure_in", "pressure", ".2f"),
+    "precipitation": ("precip_mm", "precip_in", "precip", ".2f"),
+    "visibility": ("vis_km", "vis_miles", "distance", ".1f"),
+    "dew_point": ("dewpoint_c", "dewpoint_f", "temp", ".1f"),
+    "wind_chill": ("windchill_c", "windchill_f", "temp", ".1f"),
+    "heat_index": ("heatindex_c", "heatindex_f", "temp", ".1f"),
+    "last_updated": ("last_updated", "last_updated", None, ""),
+}
+_FIELD_ALIASES = {
+    "temp": "temperature",
+    "feelslike": "feels_like",
+    "wind_speed": "wind",
+    "wind_gust": "gust",
+    "gusts": "gust",
+    "uv_index": "uv",
+    "precip": "precipitation",
+    "rain": "precipitation",
+    "dewpoint": "dew_point",
+    "windchill": "wind_chill",
+    "heatindex": "heat_index",
+    "conditions": "condition",
+    "description": "condition",
+}
+_UNIT_SUFFIXES = {
+    "Celsius": {"temp": "°C", "percent": "%", "speed": " kph", "pressure": " mb", "precip": " mm", "distance": " km"},
+    "Fahrenheit": {"temp": "°F", "percent": "%", "speed": " mph", "pressure": " inHg", "precip": " in", "distance": " miles"},
+}
+
+
+def _normalize_fields(fields: list[str]) -> Tuple[list, list]:
+    """Splits requested field names into (known canonical fields, unknown names)."""
+    known, unknown = [], []
+    for field in fields:
+        name = field.strip().lower().replace(" ", "_").replace("-", "_")
+        name = _FIELD_ALIASES.get(name, name)
+        if name in WEATHER_FIELDS:
+            if name not in known:
+                known.append(name)
+        else:
+            unknown.append(field)
+    return known, unknown
+
+
+def _project_fields(current_data: dict, preferred_unit_state: str, fields: list) -> dict:
+    """Returns only the requested fields as compact, unit-suffixed strings."""
+    imperial = preferred_unit_state == "Fahrenheit"
+    suffixes = _UNIT_SUFFIXES["Fahrenheit" if imperial else "Celsius"]
+    data = {}
+    for field in fields:
+        if field == "condition":
+            data[field] = current_data.get("condition", {}).get("text")
+            continue
+        metric_key, imperial_key, unit_kind, number_format = WEATHER_FIELDS[field]
+        value = current_data.get(imperial_key if imperial else metric_key)
+        if value is None:
+            data[field] = None
+            continue
+        text = format(value, number_format) + suffixes.get(unit_kind, "")
+        if field == "wind" and current_data.get("wind_dir"):
+            text = f"{text} from the {current_data['wind_dir']}"
+        data[field] = text
+    return data
+
+
+def _read_unit_preference(tool_context: ToolContext) -> str:
+    """Reads the user's temperature unit preference from session state."""
+    preferred_unit_state = tool_context.state.get("user_preference_temperature_unit", "Celsius") # Default to Celsius
+    logger.debug("Reading state 'user_preference_temperature_unit': %s", preferred_unit_state)
+    return preferred_unit_state
 
-    try:
-        print(f"--- Tool: Calling WeatherAPI.com API for {city} ---")
-        response = requests.get(base_url, params=params, timeout=10)
-        response.raise_for_status() # Raise an exception for bad status codes (4xx or 5xx)
 
-        # --- Process Successful Response ---
-        data = response.json()
-        print(f"--- Tool: API Response Data (partial): {str(data)[:200]}... ---")
+def _render_result(city: str, current_data: dict, preferred_unit_state: str, fields: Optional[list[str]]) -> dict:
+    """Renders either the compact projection of `fields` or, if none are requested, the full report."""
+    known_fields, unknown_fields = _normalize_fields(fields or [])
+    if known_fields:
+        result = {
+            "status": "success",
+            "city": city,
+            "unit": preferred_unit_state,
+            "data": _project_fields(current_data, preferred_unit_state, known_fields),
+        }
+    else:
+        result = {"status": "success", "report": _build_report(city, current_data, preferred_unit_state)}
+    if unknown_fields:
+        result["unknown_fields"] = unknown_fields
+    return result
 
-        if data.get("current") and data["current"].get("condition"):
-            current_data = data["current"]
-            condition_data = current_data["condition"]
-            description = condition_data.get("text", "N/A")
-            temp_c = current_data.get("temp_c")
-            temp_f = current_data.get("temp_f")
-            feelslike_c = current_data.get("feelslike_c")
-            feelslike_f = current_data.get("feelslike_f")
-            humidity = current_data.get("humidity")
-            wind_kph = current_data.get("wind_kph")
-            wind_mph = current_data.get("wind_mph")
-            wind_dir = current_data.get("wind_dir")
-            uv_index = current_data.get("uv")
-            pressure_mb = current_data.get("pressure_mb")
-            pressure_in = current_data.get("pressure_in")
-            precip_mm = current_data.get("precip_mm")
-            precip_in = current_data.get("precip_in")
-            vis_km = current_data.get("vis_km")
-            vis_miles = current_data.get("vis_miles")
-            gust_kph = current_data.get("gust_kph")
-            gust_mph = current_data.get("gust_mph")
-            windchill_c = current_data.get("windchill_c") # May not always be present/relevant
-            windchill_f = current_data.get("windchill_f")
-            heatindex_c = current_data.get("heatindex_c") # May not always be present/relevant
-            heatindex_f = current_data.get("heatindex_f")
-            dewpoint_c = current_data.get("dewpoint_c")
-            dewpoint_f = current_data.get("dewpoint_f")
-            last_updated = current_data.get("last_updated")
-
-            # Select temperature and units based on state preference
-            if preferred_unit_state == "Fahrenheit":
-                temp = temp_f
-                feels_like_temp = feelslike_f
-                wind_speed = wind_mph
-                wind_unit = "mph"
-                pressure = pressure_in
-                pressure_unit = "inHg"
-                precip = precip_in
-                precip_unit = "in"
-                visibility = vis_miles
-                visibility_unit = "miles"
-                gust_speed = gust_mph
-                wind_chill_temp = windchill_f
-                heat_index_temp = heatindex_f
-                dew_point_temp = dewpoint_f
-            else: # Default to Celsius
-                temp = temp_c
-                feels_like_temp = feelslike_c
-                wind_speed = wind_kph
-                wind_unit = "kph"
-                pressure = pressure_mb
-                pressure_unit = "mb"
-                precip = precip_mm
-                precip_unit = "mm"
-                visibility = vis_km
-                visibility_unit = "km"
-                gust_speed = gust_kph
-                wind_chill_temp = windchill_c
-                heat_index_temp = heatindex_c
-                dew_point_temp = dewpoint_c
-
-            # Build the report string piece by piece
-            report_parts = []
-
-            # Main condition and temp
-            if temp is not None:
-                 report_parts.append(f"The weather in {city.capitalize()} is {description} with a temperature of {temp:.1f}{temp_symbol}.")
-            else:
-                 report_parts.append(f"The weather in {city.capitalize()} is {description}.")
-                 print("--- Tool Warning: Temperature data (temp_c/temp_f) missing in API response. ---")
 
-            # Feels like temp
-            if feels_like_temp is not None:
-                report_parts.append(f"It feels like {feels_like_temp:.1f}{temp_symbol}.")
+def _note_snapshot(tool_context: ToolContext, city: str, current_data: Optional[dict], last_city: Optional[str] = None) -> None:
+    """Tells the response cache which weather data this turn's answer is built from (None: a failed lookup)."""
+    if RESPONSE_CACHE_ENABLED:
+        last_updated = current_data.get("last_updated") if current_data else None
+        response_cache.note_lookup(tool_context.invocation_id, _canonical_key(city), last_updated, city, last_city)
 
-            # Humidity
-            if humidity is not None:
-                report_parts.append(f"Humidity is at {humidity}%." )
 
-            # Wind
-            if wind_speed is not None and wind_dir:
-                report_parts.append(f"Wind is blowing from the {wind_dir} at {wind_speed:.1f} {wind_unit}.")
-            elif wind_speed is not None:
-                 report_parts.append(f"Wind speed is {wind_speed:.1f} {wind_unit}.")
+def _weather_result(city: str, current_data: dict, preferred_unit_state: str, tool_context: ToolContext, fields: Optional[list[str]] = None) -> dict:
+    """Builds the tool result for a successful lookup and records it in session state."""
+    result = _render_result(city, current_data, preferred_unit_state, fields)
+    logger.debug("Generated %s report in %s. Result: %s", "compact" if "data" in result else "full", preferred_unit_state, result, extra=SAMPLED)
 
-            # UV Index
-            if uv_index is not None:
-                 report_parts.append(f"The UV index is {uv_index}.")
+    # Update state (optional)
+    tool_context.state["last_city_checked"] = city # Updated key name slightly
+    logger.debug("Updated state 'last_city_checked': %s", city)
+    _note_snapshot(tool_context, city, current_data, last_city=city)
+    return result
 
-            # Pressure
-            if pressure is not None:
-                report_parts.append(f"Pressure is {pressure:.2f} {pressure_unit}.")
 
-            # Precipitation
-            if precip is not None:
-                report_parts.append(f"Precipitation is {precip:.2f} {precip_unit}.")
+def _missing_api_key_result() -> dict:
+    logger.error("WEATHER_API_KEY environment variable not set")
+    return {"status": "error", "error_message": "Weather API key is missing. Cannot fetch weather."}
 
-            # Visibility
-            if visibility is not None:
-                report_parts.append(f"Visibility is {visibility:.1f} {visibility_unit}.")
 
-            # Wind Gust
-            if gust_speed is not None:
-                 report_parts.append(f"Wind gusts up to {gust_speed:.1f} {wind_unit}.")
+def _unexpected_error_result(city: str, tool_name: str, e: Exception) -> dict:
+    # Catch any other unexpected errors during processing
+    logger.exception("Unexpected error in %s tool: %s", tool_name, e) # Logs the full traceback for debugging
+    return {"status": "error", "error_message": f"An unexpected error occurred while processing the weather request for '{city}'."}
 
-            # Dew Point
-            if dew_point_temp is not None:
-                 report_parts.append(f"Dew point is {dew_point_temp:.1f}{temp_symbol}.")
 
-            # Wind Chill (only if significantly different from temp and feels_like)
-            if wind_chill_temp is not None and feels_like_temp is not None and wind_chill_temp < feels_like_temp - 1: # Heuristic condition
-                 report_parts.append(f"Wind chill makes it feel like {wind_chill_temp:.1f}{temp_symbol}.")
+def get_weather(city: str, tool_context: ToolContext, fields: Optional[list[str]] = None) -> dict:
+    """Retrieves the current weather report for a specified city using WeatherAPI.com.
 
-            # Heat Index (only if significantly different from temp and feels_like)
-            if heat_index_temp is not None and feels_like_temp is not None and heat_index_temp > feels_like_temp + 1: # Heuristic condition
-                 report_parts.append(f"Heat index makes it feel like {heat_index_temp:.1f}{temp_symbol}.")
+    Args:
+        city (str): The city to look up.
+        fields (list[str], optional): Only return these details, in compact form.
+            Supported: condition, temperature, feels_like, humidity, wind, gust,
+            uv, pressure, precipitation, visibility, dew_point, wind_chill,
+            heat_index, last_updated. Omit for the full detailed report.
+    """
+    logger.info("get_weather called for %s", city)
 
-            # Last Updated
-            if last_updated:
-                report_parts.append(f"(Last updated: {last_updated})")
+    # --- Check for API Key ---
+    if not WEATHER_API_KEYS:
+        return _missing_api_key_result()
 
-            # Join the parts into a single report string
-            report = " ".join(report_parts)
+    # --- Read temperature preference from state ---
+    preferred_unit_state = _read_unit_preference(tool_context)
 
-            result = {"status": "success", "report": report}
-            print(f"--- Tool: Generated report in {preferred_unit_state}. Result: {result} ---")
+    try:
+        # --- Get current conditions (cache first, then WeatherAPI.com) ---
+        current_data, error_result = _get_current_weather(city)
+        if error_result is not None:
+            _note_snapshot(tool_context, city, None)
+            return error_result
+        return _weather_result(city, current_data, preferred_unit_state, tool_context, fields)
+    except Exception as e:
+        return _unexpected_error_result(city, "get_weather", e)
 
-            # Update state (optional)
-            tool_context.state["last_city_checked"] = city # Updated key name slightly
-            print(f"--- Tool: Updated state 'last_city_checked': {city} ---")
-            return result
-        else:
-            print("--- Tool Error: Unexpected API response format from WeatherAPI.com. ---")
-            return {"status": "error", "error_message": f"Received unexpected weather data format for '{city}'."}
-
-    except requests.exceptions.HTTPError as http_err:
-        status_code = response.status_code
-        # WeatherAPI Error Handling (Consult their docs for specifics)
-        if status_code == 400: # Often used for location not found or bad request
-            try:
-                error_data = response.json()
-                error_message = error_data.get("error", {}).get("message", "request issue")
-                print(f"--- Tool Error: WeatherAPI returned 400: {error_message} ---")
-                # Check if it's a location not found error (code 1006)
-                if error_data.get("error", {}).get("code") == 1006:
-                     return {"status": "error", "error_message": f"Sorry, I couldn't find weather information for '{city}'."}
-                else:
-                     return {"status": "error", "error_message": f"There was a problem with the weather request for '{city}': {error_message}"}
-            except ValueError: # Handle cases where error response isn't JSON
-                print(f"--- Tool Error: WeatherAPI returned 400, but error response wasn't valid JSON. ---")
-                return {"status": "error", "error_message": f"There was an unspecified problem with the weather request for '{city}'."}
-
-        elif status_code == 401 or status_code == 403: # API key issues
-             print(f"--- Tool Error: WeatherAPI returned {status_code} (API key issue). ---")
-             return {"status": "error", "error_message": "There was an authentication issue with the weather service. Please check the API key."}
-        else:
-            print(f"--- Tool Error: HTTP error occurred: {http_err} (Status: {status_code}) ---")
-            return {"status": "error", "error_message": f"An HTTP error occurred while fetching weather for '{city}'. Status: {status_code}"}
-    except requests.exceptions.ConnectionError as conn_err:
-        print(f"--- Tool Error: Connection error occurred: {conn_err} ---")
-        return {"status": "error", "error_message": f"Could not connect to the weather service to get information for '{city}'."}
-    except requests.exceptions.Timeout as timeout_err:
-        print(f"--- Tool Error: Request timed out: {timeout_err} ---")
-        return {"status": "error", "error_message": f"The request to the weather service timed out for '{city}'."}
-    except requests.exceptions.RequestException as req_err:
-        # Catch any other request-related errors
-        print(f"--- Tool Error: An ambiguous request error occurred: {req_err} ---")
-        return {"status": "error", "error_message": f"An error occurred while requesting weather data for '{city}'."}
+
+async def get_weather_async(city: str, tool_context: ToolContext, fields: Optional[list[str]] = None) -> dict:
+    """Retrieves the current weather report for a specified city using WeatherAPI.com.
+
+    Non-blocking variant of `get_weather` for use inside `Runner.run_async`: the
+    upstream call goes through a shared, pooled async HTTP client so concurrent
+    turns on the same event loop overlap their I/O.
+
+    Args:
+        city (str): The city to look up.
+        fields (list[str], optional): Only return these details, in compact form.
+            Supported: condition, temperature, feels_like, humidity, wind, gust,
+            uv, pressure, precipitation, visibility, dew_point, wind_chill,
+            heat_index, last_updated. Omit for the full detailed report.
+    """
+    logger.info("get_weather_async called for %s", city)
+
+    # --- Check for API Key ---
+    if not WEATHER_API_KEYS:
+        return _missing_api_key_result()
+
+    # --- Read temperature preference from state ---
+    preferred_unit_state = _read_unit_preference(tool_context)
+
+    try:
+        # --- Get current conditions (cache first, then WeatherAPI.com) ---
+        current_data, error_result = await _get_current_weather_async(city)
+        if error_result is not None:
+            _note_snapshot(tool_context, city, None)
+            return error_result
+        return _weather_result(city, current_data, preferred_unit_state, tool_context, fields)
     except Exception as e:
-        # Catch any other unexpected errors during processing
-        print(f"--- Tool Error: An unexpected error occurred in get_weather: {e} ---")
-        logging.exception("Unexpected error in get_weather tool") # Log the full traceback for debugging
-        return {"status": "error", "error_message": f"An unexpected error occurred while processing the weather request for '{city}'."}
+        return _unexpected_error_result(city, "get_weather_async", e)
+
+async def get_weather_batch(cities: list[str], tool_context: ToolContext, fields: Optional[list[str]] = None) -> dict:
+    """Retrieves the current weather reports for several cities in one call.
+
+    Use this instead of calling the weather tool repeatedly when the user asks
+    about (or wants to compare) more than one city. All cities are fetched
+    concurrently with bounded parallelism.
+
+    Args:
+        cities (list[str]): The city names to look up.
+        fields (list[str], optional): Only return these details for each city,
+            in compact form (same names as the single-city weather tool).
+
+    Returns:
+        dict: `status` plus a `results` list with one entry per city, each
+        holding that city's `status` and either its `report` (or compact
+        `data`) or `error_message`.
+    """
+    logger.info("get_weather_batch called for %s", cities)
+
+    # --- Check for API Key ---
+    if not WEATHER_API_KEYS:
+        return _missing_api_key_result()
+
+    # Drop blanks and duplicates (by canonical place), keeping the user's order
+    unique_cities = []
+    seen_keys = set()
+    for city in cities:
+        cache_key = normalize_city(city) and _canonical_key(city)
+        if cache_key and cache_key not in seen_keys:
+            seen_keys.add(cache_key)
+            unique_cities.append(city)
+
+    if not unique_cities:
+        return {"status": "error", "error_message": "No city names were provided."}
+    if len(unique_cities) > WEATHER_BATCH_MAX_CITIES:
+        return {"status": "error", "error_message": f"Too many cities requested at once. Please ask about at most {WEATHER_BATCH_MAX_CITIES} cities."}
+
+    # --- Read temperature preference from state ---
+    preferred_unit_state = _read_unit_preference(tool_context)
+    semaphore = asyncio.Semaphore(WEATHER_BATCH_MAX_CONCURRENCY)
+    fetched = {}
+
+    async def _lookup(city: str) -> dict:
+        try:
+            async with semaphore:
+                current_data, error_result = await _get_current_weather_async(city)
+            fetched[city] = current_data
+            _note_snapshot(tool_context, city, current_data)
+            if error_result is not None:
+                return {"city": city, **error_result}
+            return {"city": city, **_render_result(city, current_data, preferred_unit_state, fields)}
+        except Exception as e:
+            _note_snapshot(tool_context, city, None)
+            return {"city": city, **_unexpected_error_result(city, "get_weather_batch", e)}
+
+    results = await asyncio.gather(*(_lookup(city) for city in unique_cities))
+    succeeded = [result["city"] for result in results if result["status"] == "success"]
+    logger.debug("get_weather_batch fetched %d/%d cities in %s", len(succeeded), len(results), preferred_unit_state)
+
+    if not succeeded:
+        return {"status": "error", "error_message": "Could not get weather information for any of the requested cities.", "results": results}
+
+    # Update state (optional)
+    tool_context.state["last_city_checked"] = succeeded[-1]
+    logger.debug("Updated state 'last_city_checked': %s", succeeded[-1])
+    _note_snapshot(tool_context, succeeded[-1], fetched[succeeded[-1]], last_city=succeeded[-1])
+    return {"status": "success", "results": results}
+
 
 def say_hello(name: str = "there") -> str:
     """Provides a simple greeting, optionally addressing the user by name.
@@ -223,10 +849,10 @@ def say_hello(name: str = "there") -> str:
     Returns:
         str: A friendly greeting message.
     """
-    print(f"--- Tool: say_hello called with name: {name} ---")
+    logger.info("say_hello called with name: %s", name)
     return f"Hello, {name}!"
 
 def say_goodbye() -> str:
     """Provides a simple farewell message to conclude the conversation."""
-    print(f"--- Tool: say_goodbye called ---")
+    logger.info("say_goodbye called")
     return "Goodbye! Have a great day."
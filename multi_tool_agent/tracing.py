@@ -0,0 +1,246 @@
+"""Per-turn latency tracing built on OpenTelemetry (already a dependency of ADK).
+
+Our own spans cover each turn, each `before_model_callback`, each WeatherAPI
+request and each session-store flush/read; ADK's spans cover the model call
+(`call_llm`, which includes the callbacks) and each tool invocation
+(`execute_tool`). Every finished span is recorded in a per-phase latency
+histogram, and can additionally be exported to a JSON Lines file or kept in
+memory.
+
+Tracing is off unless `setup_tracing()` is called (see TRACING_ENABLED); until
+then every span is a no-op.
+"""
+import functools
+import inspect
+import json
+import logging
+import math
+import threading
+from typing import Dict, Optional
+
+from opentelemetry import trace
+from opentelemetry.sdk.trace import ReadableSpan, SpanProcessor, TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    SimpleSpanProcessor,
+    SpanExporter,
+    SpanExportResult,
+)
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+logger = logging.getLogger(__name__)
+
+tracer = trace.get_tracer("multi_tool_agent")
+
+# Span attribute naming the latency phase a span is recorded under
+PHASE_ATTRIBUTE = "weather_agent.phase"
+
+# ADK span name prefixes mapped onto our phases
+_ADK_SPAN_PHASES = (
+    ("call_llm", "model"),
+    ("execute_tool", "tool"),
+    ("invoke_agent", "agent"),
+)
+
+
+class LatencyHistogram:
+    """A thread-safe latency histogram with log-spaced buckets.
+
+    Memory is constant no matter how many samples are recorded; percentiles
+    are accurate to within one bucket (about 5%).
+    """
+
+    GROWTH = 1.05
+    MIN_SECONDS = 1e-5
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets: Dict[int, int] = {}
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def _bucket(self, seconds: float) -> int:
+        if seconds <= self.MIN_SECONDS:
+            return 0
+        return int(math.ceil(math.log(seconds / self.MIN_SECONDS, self.GROWTH)))
+
+    def record(self, seconds: float) -> None:
+        bucket = self._bucket(seconds)
+        with self._lock:
+            self._buckets[bucket] = self._buckets.get(bucket, 0) + 1
+            self.count += 1
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+
+    def percentile(self, fraction: float) -> float:
+        """Returns the latency (seconds) below which `fraction` of samples fall."""
+        with self._lock:
+            if not self.count:
+                return 0.0
+            rank = max(1, math.ceil(fraction * self.count))
+            seen = 0
+            for bucket in sorted(self._buckets):
+                seen += self._buckets[bucket]
+                if seen >= rank:
+                    return min(self.MIN_SECONDS * self.GROWTH ** bucket, self.max_seconds)
+            return self.max_seconds
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": (self.total_seconds / self.count * 1000) if self.count else 0.0,
+            "p50_ms": self.percentile(0.50) * 1000,
+            "p95_ms": self.percentile(0.95) * 1000,
+            "p99_ms": self.percentile(0.99) * 1000,
+            "max_ms": self.max_seconds * 1000,
+        }
+
+
+_histograms: Dict[str, LatencyHistogram] = {}
+_histograms_lock = threading.Lock()
+
+
+def record_latency(phase: str, seconds: float) -> None:
+    """Records a latency sample for `phase` (also used for non-span timings)."""
+    histogram = _histograms.get(phase)
+    if histogram is None:
+        with _histograms_lock:
+            histogram = _histograms.setdefault(phase, LatencyHistogram())
+    histogram.record(seconds)
+
+
+def _phase_for(span: ReadableSpan) -> Optional[str]:
+    phase = (span.attributes or {}).get(PHASE_ATTRIBUTE)
+    if phase:
+        return phase
+    for prefix, mapped_phase in _ADK_SPAN_PHASES:
+        if span.name.startswith(prefix):
+            return mapped_phase
+    return None
+
+
+class PhaseLatencyProcessor(SpanProcessor):
+    """Feeds the duration of every finished span into its phase's histogram."""
+
+    def on_end(self, span: ReadableSpan) -> None:
+        phase = _phase_for(span)
+        if phase and span.start_time and span.end_time:
+            record_latency(phase, (span.end_time - span.start_time) / 1e9)
+
+
+class JsonLinesSpanExporter(SpanExporter):
+    """Appends finished spans to a local file, one compact JSON object per line."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans) -> SpanExportResult:
+        lines = [json.dumps(json.loads(span.to_json())) for span in spans]
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        pass
+
+
+_memory_exporter: Optional[InMemorySpanExporter] = None
+_configured = False
+
+
+def setup_tracing(export_path: Optional[str] = None) -> Optional[InMemorySpanExporter]:
+    """Installs the latency processor and an exporter on the global tracer provider.
+
+    Args:
+        export_path (str, optional): Write spans to this JSON Lines file. If
+            omitted, spans are kept in memory (see `get_finished_spans()`).
+
+    Returns:
+        The in-memory exporter, or None when exporting to a file.
+    """
+    global _memory_exporter, _configured
+    if _configured:
+        return _memory_exporter
+    _configured = True
+
+    provider = trace.get_tracer_provider()
+    if not isinstance(provider, TracerProvider):
+        provider = TracerProvider()
+        trace.set_tracer_provider(provider)
+
+    provider.add_span_processor(PhaseLatencyProcessor())
+    if export_path:
+        provider.add_span_processor(BatchSpanProcessor(JsonLinesSpanExporter(export_path)))
+        logger.info("Exporting spans to %s", export_path)
+        return None
+    _memory_exporter = InMemorySpanExporter()
+    provider.add_span_processor(SimpleSpanProcessor(_memory_exporter))
+    logger.info("Keeping spans in memory")
+    return _memory_exporter
+
+
+def get_finished_spans() -> list:
+    """Returns the spans collected by the in-memory exporter (empty if not in use)."""
+    return list(_memory_exporter.get_finished_spans()) if _memory_exporter else []
+
+
+def latency_summary() -> dict:
+    """Returns `{phase: {count, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}}`."""
+    with _histograms_lock:
+        histograms = dict(_histograms)
+    return {phase: histogram.summary() for phase, histogram in sorted(histograms.items())}
+
+
+def dump_latency_summary(path: Optional[str] = None) -> str:
+    """Returns the latency summary as JSON, also writing it to `path` if given."""
+    text = json.dumps(latency_summary(), indent=2)
+    if path:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+    return text
+
+
+def render_prometheus() -> str:
+    """Renders the latency histograms in the Prometheus text format (summary type)."""
+    lines = [
+        "# HELP weather_agent_phase_latency_seconds Latency per turn phase.",
+        "# TYPE weather_agent_phase_latency_seconds summary",
+    ]
+    with _histograms_lock:
+        histograms = dict(_histograms)
+    for phase, histogram in sorted(histograms.items()):
+        for quantile in (0.5, 0.95, 0.99):
+            lines.append(
+                f'weather_agent_phase_latency_seconds{{phase="{phase}",quantile="{quantile}"}} {histogram.percentile(quantile):.6f}'
+            )
+        lines.append(f'weather_agent_phase_latency_seconds_sum{{phase="{phase}"}} {histogram.total_seconds:.6f}')
+        lines.append(f'weather_agent_phase_latency_seconds_count{{phase="{phase}"}} {histogram.count}')
+    return "\n".join(lines) + "\n"
+
+
+def traced(phase: str, name: Optional[str] = None):
+    """Decorator that runs a sync or async function inside a span for `phase`.
+
+    `functools.wraps` keeps the signature and docstring intact, so decorated
+    callbacks are introspected by ADK exactly like the originals.
+    """
+    def decorator(fn):
+        span_name = name or f"{phase}.{fn.__name__}"
+        attributes = {PHASE_ATTRIBUTE: phase}
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with tracer.start_as_current_span(span_name, attributes=attributes):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with tracer.start_as_current_span(span_name, attributes=attributes):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    return decorator
@@ -1,19 +1,26 @@
+"""Standalone debugging helper: fetch raw WeatherAPI.com data for a city.
+
+Run with `python -m multi_tool_agent.weather [city]`. Importing this module has
+no side effects (no network call, nothing printed).
+"""
+import logging
 import os
+import sys
 import requests
-from dotenv import load_dotenv 
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
 
-load_dotenv() 
-api_key = os.getenv("WEATHER_API_KEY")
-print(f"Debug: API Key loaded as: {api_key}")   
 
-def get_weather(city):
+def get_weather(city, api_key=None):
+    api_key = api_key or os.getenv("WEATHER_API_KEY")
     if not api_key:
         return {"error": "WEATHER_API_KEY not found in environment."}
 
     # Use WeatherAPI.com endpoint and 'key' parameter
-    url = f"http://api.weatherapi.com/v1/current.json?key={api_key}&q={city}"
+    url = "http://api.weatherapi.com/v1/current.json"
     try:
-        response = requests.get(url, timeout=10)
+        response = requests.get(url, params={"key": api_key, "q": city}, timeout=10)
         response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
         data = response.json()
         return data
@@ -22,15 +29,19 @@ def get_weather(city):
         try:
             error_data = response.json()
         except ValueError:
-            error_data = {"error": {"message": f"HTTP Error: {http_err}", "code": response.status_code}}
-        print(f"HTTP error occurred: {http_err} - {response.status_code}")
+            error_data = {"error": {"message": f"HTTP Error (status {response.status_code})", "code": response.status_code}}
+        logger.warning("HTTP error occurred: status %s", response.status_code)
         return error_data # Return API error message if available
     except requests.exceptions.RequestException as req_err:
-        print(f"Request error occurred: {req_err}")
-        return {"error": f"Request Error: {req_err}"}
+        # Exception messages can include the request URL, so don't echo them (it carries the key)
+        logger.warning("Request error occurred: %s", type(req_err).__name__)
+        return {"error": f"Request Error: {type(req_err).__name__}"}
     except Exception as e:
-        print(f"An unexpected error occurred: {e}")
-        return {"error": f"Unexpected Error: {e}"}
+        logger.warning("An unexpected error occurred: %s", type(e).__name__)
+        return {"error": f"Unexpected Error: {type(e).__name__}"}
 
 
-print(get_weather("New York"))
+if __name__ == "__main__":
+    load_dotenv()
+    print("Debug: API Key loaded." if os.getenv("WEATHER_API_KEY") else "Debug: WEATHER_API_KEY is not set.")
+    print(get_weather(sys.argv[1] if len(sys.argv) > 1 else "New York"))